@@ -0,0 +1,300 @@
+"""Headless HTTP submission API.
+
+Lets partner systems (e.g. the student council portal) submit clubs without a
+Streamlit session. Requests go through the same validation, formatting,
+image processing and outbox as the form.
+
+    python api.py --port 8000
+
+Endpoints:
+    POST /clubs          new club, JSON shaped like EXAMPLE_CLUB
+    POST /clubs/update   {"club_identifier": "...", "update": {...}}
+    GET  /jobs/<id>      delivery status of a queued email
+    GET  /metrics        span timings of the API and the app processes, in Prometheus
+                         text format (?format=json for JSON)
+    GET  /health
+
+Span timings are collected only when profiling is switched on with the
+``PROFILING`` environment variable or secret. Each process with profiling on
+exports its timings to ``METRICS_PATH`` every few seconds. ``/metrics`` adds
+those of every live app process, labelled by process, to the API's own.
+
+POST bodies may be ``application/json`` or ``multipart/form-data`` with the
+JSON in a ``data`` field and the background picture in an ``image`` field.
+Line breaks or other control characters in a single-line field (the club
+name, or the club identifier of an update) are refused with 400; other
+invalid values with 422.
+If the ``API_TOKEN`` secret is set, requests must send
+``Authorization: Bearer <token>``. Without a token the API is open, so
+submissions are rate limited per client IP like the form (429 when exceeded);
+either way at most ``MAX_IN_FLIGHT_SUBMISSIONS`` are processed at once and a
+full queue answers 503. Both set ``Retry-After``.
+"""
+import argparse
+import hmac
+import io
+import json
+import math
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import streamlit as st
+
+from profiling import read_exports, span
+from ratelimit import SubmissionRejected
+from renderer import field_label
+from validation import SINGLE_LINE_FIELDS, check, message
+from main import (
+    MAX_FILE_SIZE,
+    admit_submission,
+    delivery_configured,
+    get_delivery_status,
+    get_profiler,
+    metrics_path,
+    metrics_process,
+    process_background_image,
+    submit_club_info,
+    submit_update_info,
+    validate_club_info,
+    validate_update_info,
+)
+
+# Largest request body accepted: a full-size picture plus the form fields
+MAX_BODY_SIZE = MAX_FILE_SIZE + 1024 * 1024
+
+
+class RequestError(Exception):
+    """A client error that becomes a JSON response with the given HTTP status"""
+
+    def __init__(self, status, *errors):
+        super().__init__(errors[0])
+        self.status = status
+        self.errors = list(errors)
+
+
+def parse_multipart(content_type, body):
+    """Split a multipart/form-data body into ({field: text}, {field: bytes}) for text and file parts"""
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    if not message.is_multipart():
+        raise RequestError(400, "Malformed multipart body.")
+    fields, files = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True) or b""
+        if part.get_filename() is not None:
+            files[name] = payload
+        else:
+            fields[name] = payload.decode(part.get_content_charset() or "utf-8")
+    return fields, files
+
+
+def process_image(image_bytes):
+    """Transcode an uploaded picture in the shared image pool, or return None if there is none"""
+    if image_bytes is None:
+        return None
+    image, image_error = process_background_image(io.BytesIO(image_bytes))
+    if image_error:
+        raise RequestError(422, image_error)
+    return image
+
+
+def reject_control_characters(record, club_identifier=None):
+    """Answer 400 to line breaks or other control characters in single-line fields, before anything else runs
+
+    Club names and identifiers go into email subjects, and without API_TOKEN anyone can send them.
+    """
+    values = [(field_label(key), record.get(key)) for key in SINGLE_LINE_FIELDS] if isinstance(record, dict) else []
+    if club_identifier is not None:
+        values.append(("Club Name or Unique Identifier", club_identifier))
+    errors = [message("single_line", label, value) for label, value in values
+              if isinstance(value, str) and not check("single_line", value)]
+    if errors:
+        raise RequestError(400, *errors)
+
+
+def new_club_request(payload, image_bytes):
+    reject_control_characters(payload)
+    errors = validate_club_info(payload)
+    if errors:
+        raise RequestError(422, *errors)
+    return submit_club_info(payload, process_image(image_bytes))
+
+
+def update_request(payload, image_bytes):
+    club_identifier = payload.get("club_identifier")
+    update_data = payload.get("update")
+    reject_control_characters(update_data, club_identifier)
+    if image_bytes is not None and isinstance(update_data, dict):
+        update_data = dict(update_data, background_image=True)
+    errors = validate_update_info(club_identifier, update_data)
+    if errors:
+        raise RequestError(422, *errors)
+    return submit_update_info(club_identifier, update_data, process_image(image_bytes))
+
+
+ROUTES = {
+    "/clubs": new_club_request,
+    "/clubs/update": update_request,
+}
+
+
+class SubmissionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "ClubInfoAPI/1.0"
+    # Headers and body go out as separate writes; without TCP_NODELAY keep-alive
+    # clients stall on delayed ACKs for every response
+    disable_nagle_algorithm = True
+    quiet = True
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=()):
+        self.send_body(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8", headers)
+
+    def send_body(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def api_token(self):
+        return st.secrets["API_TOKEN"] if "API_TOKEN" in st.secrets else None
+
+    def authorized(self):
+        token = self.api_token()
+        if not token:
+            return True
+        return hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {token}")
+
+    def read_submission(self):
+        """Return (JSON payload, image bytes or None) from a JSON or multipart body"""
+        try:
+            length = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            raise RequestError(411, "Content-Length is required.")
+        if length > MAX_BODY_SIZE:
+            raise RequestError(413, "File size exceeds the maximum limit of 30 MB.")
+        body = self.rfile.read(length)
+
+        content_type = self.headers.get("Content-Type", "application/json")
+        image = None
+        if content_type.startswith("multipart/form-data"):
+            fields, files = parse_multipart(content_type, body)
+            raw = fields.get("data", "")
+            image = files.get("image")
+        elif content_type.startswith("application/json"):
+            raw = body
+        else:
+            raise RequestError(415, "Send application/json or multipart/form-data.")
+
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            raise RequestError(400, "Request body is not valid JSON.")
+        if not isinstance(payload, dict):
+            raise RequestError(400, "Request body must be a JSON object.")
+        if image is not None and len(image) > MAX_FILE_SIZE:
+            raise RequestError(413, "File size exceeds the maximum limit of 30 MB.")
+        return payload, image or None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif url.path.startswith("/jobs/") or url.path == "/metrics":
+            if not self.authorized():
+                self.send_json(401, {"errors": ["Missing or invalid API token."]})
+            elif url.path == "/metrics":
+                self.send_metrics(parse_qs(url.query).get("format", ["prometheus"])[0])
+            else:
+                with span("api.job_status"):
+                    job = get_delivery_status(url.path[len("/jobs/"):])
+                if job is None:
+                    self.send_json(404, {"errors": ["Unknown job."]})
+                else:
+                    self.send_json(200, job)
+        else:
+            self.send_json(404, {"errors": ["Not found."]})
+
+    def send_metrics(self, fmt):
+        profiler = get_profiler()
+        process = metrics_process()
+        # The app processes' timings, from the files they export
+        others = read_exports(metrics_path(), exclude=process)
+        if fmt == "json":
+            self.send_json(200, {"enabled": profiler.enabled, "spans": profiler.snapshot(), "processes": others})
+        else:
+            self.send_body(200, profiler.prometheus(process=process, others=others).encode("utf-8"),
+                           "text/plain; version=0.0.4; charset=utf-8")
+
+    def do_POST(self):
+        with span(f"api.POST {self.path}" if self.path in ROUTES else "api.POST"):
+            self.handle_submission()
+
+    def handle_submission(self):
+        handler = ROUTES.get(self.path)
+        try:
+            if handler is None:
+                raise RequestError(404, "Not found.")
+            if not self.authorized():
+                raise RequestError(401, "Missing or invalid API token.")
+            payload, image_bytes = self.read_submission()
+
+            if not delivery_configured():
+                raise RequestError(503, "Email credentials not found. Please set EMAIL_USER and EMAIL_PASSWORD in Streamlit secrets.")
+            # Partners holding the API token are trusted; an open API is limited per client IP
+            client_ip = None if self.api_token() else self.client_address[0]
+            with admit_submission(client_ip=client_ip):
+                success, message, job_id = handler(payload, image_bytes)
+        except RequestError as e:
+            # The body may not have been read; don't try to reuse the connection
+            if e.status in (411, 413):
+                self.close_connection = True
+            self.send_json(e.status, {"errors": e.errors})
+            return
+        except SubmissionRejected as e:
+            self.send_json(
+                429 if e.reason == "rate_limited" else 503,
+                {"errors": [str(e)]},
+                [("Retry-After", str(math.ceil(e.retry_after)))]
+            )
+            return
+
+        if success and job_id is None:
+            self.send_json(200, {"status": "unchanged", "job_id": None, "message": message})
+        elif success:
+            self.send_json(202, {"status": "queued", "job_id": job_id, "message": message})
+        else:
+            self.send_json(503, {"errors": [message]})
+
+
+def serve(host="127.0.0.1", port=8000, verbose=False):
+    SubmissionHandler.quiet = not verbose
+    get_profiler()
+    server = ThreadingHTTPServer((host, port), SubmissionHandler)
+    server.daemon_threads = True
+    print(f"Club submission API listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless HTTP API for club submissions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.verbose)
@@ -0,0 +1,6 @@
+"""Performance benchmarks for the club information collector.
+
+``python -m benchmarks`` runs the full suite (see ``benchmarks.suite``) and
+records a JSON report; individual modules such as ``benchmarks.mime_memory``
+and ``benchmarks.render`` can also be run directly.
+"""
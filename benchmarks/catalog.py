@@ -0,0 +1,71 @@
+"""Time to build the static club catalog, and to refresh it after one submission.
+
+Stores ``--clubs`` distinct corpus clubs (one in ``--image-every`` with a
+background picture in a scratch blob store), then times a full export into an
+empty directory, a rebuild with nothing changed, and a rebuild after one club
+is updated, as the app does after each submission.
+
+    python -m benchmarks.catalog --clubs 500
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.corpus import generate_corpus, make_image
+from blobs import BlobStore
+from catalog import CatalogExporter
+from store import SubmissionStore
+
+
+def run(clubs=500, image_every=4, repeat=5, seed=0):
+    with tempfile.TemporaryDirectory() as directory:
+        store = SubmissionStore(os.path.join(directory, "clubs.db"))
+        blobs = BlobStore(os.path.join(directory, "blobs"))
+        pictures = [blobs.put(make_image(64 * 1024, seed + n)) for n in range(4)]
+        submissions = []
+        for n, submission in enumerate(generate_corpus(clubs, seed=seed)):
+            form_data = dict(submission["form_data"], club_name=f"{submission['form_data']['club_name']} {n}")
+            if n % image_every == 0:
+                form_data["background_image"] = pictures[n // image_every % len(pictures)]
+            submissions.append((form_data, None))
+        store.record_clubs(submissions)
+
+        exporter = CatalogExporter(os.path.join(directory, "site"), blobs=blobs)
+        full = exporter.export(store.records())
+        unchanged = [exporter.export(store.records())["seconds"] for _ in range(repeat)]
+        one_changed = []
+        for n in range(repeat):
+            form_data, _ = submissions[n]
+            store.record_update(form_data["club_name"], {"meeting_location": {"old": "", "new": f"Room {n}"}})
+            began = time.perf_counter()
+            stats = exporter.export(store.records())
+            one_changed.append(time.perf_counter() - began)
+        return {
+            "clubs": full["clubs"],
+            "full_s": full["seconds"],
+            "full_files": full["written"],
+            "pictures": full["images"],
+            "unchanged_s": statistics.median(unchanged),
+            "one_changed_s": statistics.median(one_changed),
+            "one_changed_files": stats["written"],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clubs", type=int, default=500, help="clubs in the catalog")
+    parser.add_argument("--image-every", type=int, default=4, help="every n-th club has a background picture")
+    parser.add_argument("--repeat", type=int, default=5, help="rebuilds timed (medians are reported)")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    args = parser.parse_args()
+    results = run(args.clubs, args.image_every, args.repeat, args.seed)
+    print(f"full export      {results['full_s'] * 1000:7.1f} ms  ({results['clubs']} clubs, "
+          f"{results['full_files']} files, {results['pictures']} pictures)")
+    print(f"nothing changed  {results['unchanged_s'] * 1000:7.1f} ms")
+    print(f"one club changed {results['one_changed_s'] * 1000:7.1f} ms  ({results['one_changed_files']} files written)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Synthetic club submissions shaped like ``EXAMPLE_CLUB``.
+
+Everything is driven by a seeded ``random.Random`` so a corpus can be
+regenerated exactly for comparing results between releases.
+
+    from benchmarks.corpus import generate_corpus
+    for submission in generate_corpus(100, seed=1):
+        ...
+"""
+import datetime
+import io
+import random
+
+from main import CLUB_CATEGORIES
+
+# (Chinese, pinyin) pairs used to build matching Chinese and English names
+SURNAMES = [
+    ("张", "Zhang"), ("李", "Li"), ("王", "Wang"), ("刘", "Liu"), ("陈", "Chen"), ("杨", "Yang"),
+    ("黄", "Huang"), ("赵", "Zhao"), ("吴", "Wu"), ("周", "Zhou"), ("徐", "Xu"), ("孙", "Sun"),
+    ("马", "Ma"), ("朱", "Zhu"), ("胡", "Hu"), ("郭", "Guo"), ("何", "He"), ("林", "Lin"),
+]
+GIVEN_NAMES = [
+    ("明", "Ming"), ("华", "Hua"), ("伟", "Wei"), ("芳", "Fang"), ("静", "Jing"), ("磊", "Lei"),
+    ("洋", "Yang"), ("婷", "Ting"), ("浩然", "Haoran"), ("子涵", "Zihan"), ("雨桐", "Yutong"),
+    ("欣怡", "Xinyi"), ("梓轩", "Zixuan"), ("思远", "Siyuan"), ("嘉怡", "Jiayi"), ("一诺", "Yinuo"),
+]
+ENGLISH_NAMES = [
+    "Alice", "Bob", "Cathy", "David", "Emma", "Frank", "Grace", "Henry", "Ivy", "Jack",
+    "Kevin", "Lily", "Mia", "Nathan", "Olivia", "Peter", "Ryan", "Sophia", "Tony", "Zoe",
+]
+CLUB_TOPICS = [
+    ("Coding", "💻"), ("Robotics", "🤖"), ("Chess", "♟️"), ("Debate", "🗣️"), ("Drama", "🎭"),
+    ("Photography", "📷"), ("Basketball", "🏀"), ("Calligraphy", "🖌️"), ("Astronomy", "🔭"),
+    ("Model UN", "🌐"), ("Guitar", "🎸"), ("Volunteering", "🤝"), ("Japanese", "🇯🇵"),
+    ("Math Olympiad", "➗"), ("Film", "🎬"), ("Environmental", "🌱"), ("书法", "✒️"), ("动漫", "🎌"),
+]
+CLUB_SUFFIXES = ["Club", "Society", "Team", "社", "俱乐部", "Workshop"]
+FREQUENCIES = ["Weekly", "Bi-weekly", "Monthly", "Twice a week", "每周一次"]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+LOCATIONS = ["Room 213", "Computer Lab 2", "Gym", "Library", "Art Studio", "多功能厅", "Music Room 1"]
+PHRASES = [
+    "Basic programming knowledge is helpful but not required",
+    "Learn to collaborate on long-term projects with classmates",
+    "Students who enjoy logical thinking and problem solving",
+    "Hosted a workshop for the whole grade",
+    "培养团队合作精神和领导能力",
+    "Participated in the regional competition and won second place",
+    "Build an impressive portfolio for university applications",
+    "每学期组织一次校外参观活动",
+    "Commitment to attend regular meetings",
+    "Connect with like-minded peers and industry professionals",
+]
+
+# Background picture sizes in bytes and how often each appears
+IMAGE_SIZES = [0, 200 * 1024, 2 * 1024 * 1024, 8 * 1024 * 1024, 30 * 1024 * 1024]
+IMAGE_WEIGHTS = [30, 30, 25, 10, 5]
+
+UPDATE_SECTIONS = [
+    "club_name", "club_emoji", "club_category", "establishment_date", "presidents",
+    "vice_presidents", "meeting_schedule", "requirements", "learning_objectives",
+    "for_whom", "past_activities", "benefits", "background_image",
+]
+
+
+def make_leader(rng):
+    surname, surname_pinyin = rng.choice(SURNAMES)
+    given, given_pinyin = rng.choice(GIVEN_NAMES)
+    english = rng.choice([f"{given_pinyin} {surname_pinyin}", f"{rng.choice(ENGLISH_NAMES)} {surname_pinyin}"])
+    handle = english.lower().replace(" ", ".")
+    return {
+        "chinese_name": surname + given,
+        "english_name": english,
+        "class": f"G{rng.randint(9, 12)}.{rng.randint(1, 6)}",
+        "email": f"{handle}{rng.randint(1, 99)}@example.com",
+        "wechat": f"{handle.replace('.', '_')}{rng.randint(2000, 2030)}"
+    }
+
+
+def make_items(rng, max_items):
+    items = [
+        " ".join(rng.sample(PHRASES, rng.randint(1, 3)))
+        for _ in range(rng.randint(1, max_items))
+    ]
+    # Users often leave a trailing box empty
+    if rng.random() < 0.2:
+        items.append("")
+    return items
+
+
+def make_club(rng):
+    """One new-club ``form_data`` dict with the same keys as ``EXAMPLE_CLUB``"""
+    topic, emoji = rng.choice(CLUB_TOPICS)
+    established = datetime.date(2015, 1, 1) + datetime.timedelta(days=rng.randint(0, 3650))
+    return {
+        "club_name": f"{topic} {rng.choice(CLUB_SUFFIXES)}",
+        "club_emoji": emoji,
+        "club_category": rng.choice(CLUB_CATEGORIES),
+        "establishment_date": established.strftime("%B %d, %Y"),
+        "presidents": [make_leader(rng) for _ in range(rng.randint(1, 5))],
+        "vice_presidents": [make_leader(rng) for _ in range(rng.randint(0, 5))],
+        "meeting_frequency": rng.choice(FREQUENCIES),
+        "meeting_day_time": f"{rng.choice(DAYS)} P{rng.randint(1, 10)}",
+        "meeting_location": rng.choice(LOCATIONS),
+        "requirements": make_items(rng, 10),
+        "learning_objectives": make_items(rng, 10),
+        "for_whom": make_items(rng, 5),
+        "past_activities": make_items(rng, 10),
+        "benefits": make_items(rng, 10)
+    }
+
+
+def make_update(rng, club):
+    """An ``update_data`` dict touching a random subset of sections, as the update page builds it"""
+    update_data = {}
+    for section in rng.sample(UPDATE_SECTIONS, rng.randint(1, 5)):
+        if section == "meeting_schedule":
+            for key in ("meeting_frequency", "meeting_day_time", "meeting_location"):
+                update_data[key] = club[key]
+        elif section == "establishment_date":
+            update_data[section] = datetime.date(2020, 9, 1) + datetime.timedelta(days=rng.randint(0, 1000))
+        elif section == "background_image":
+            update_data[section] = "[upload]"
+        else:
+            update_data[section] = club[section]
+    return update_data
+
+
+def make_image(size, seed=0):
+    """A decodable JPEG of roughly ``size`` bytes (noise compresses poorly, so size tracks pixels)"""
+    if not size:
+        return None
+    from PIL import Image
+
+    # Noise at quality 95 costs about 0.9 bytes per pixel
+    pixels = max(64 * 64, int(size / 0.9))
+    width = int((pixels * 4 / 3) ** 0.5)
+    height = max(1, pixels // width)
+    img = Image.effect_noise((width, height), 64 + seed % 32).convert("RGB")
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=95)
+    return out.getvalue()
+
+
+def generate_corpus(count, seed=0, with_images=False):
+    """Yield ``count`` submissions: dicts with form_data, update_data and image size/bytes"""
+    rng = random.Random(seed)
+    for n in range(count):
+        club = make_club(rng)
+        image_size = rng.choices(IMAGE_SIZES, IMAGE_WEIGHTS)[0]
+        yield {
+            "form_data": club,
+            "club_identifier": club["club_name"],
+            "update_data": make_update(rng, club),
+            "image_size": image_size,
+            "image": make_image(image_size, seed + n) if with_images else None,
+        }
@@ -0,0 +1,157 @@
+"""Headless browser sessions for a running ``streamlit run`` server.
+
+Speaks the frontend's side of the websocket protocol, just enough to fill and
+submit the form pages: each ``run()`` sends the widget values set so far (and
+any button click) and waits for the script to finish, keeping the elements it
+drew. Uploads go through the server's upload endpoint, as in a browser.
+Auto-reruns (``st.fragment(run_every=...)``) are not followed.
+
+    session = HeadlessSession("http://127.0.0.1:8501").run()
+    session.click("New Club").run()
+    session.set("club_name", "Chess Club")
+    session.click("Submit").run()
+    print(session.alerts())
+    session.close()
+"""
+import itertools
+
+import requests
+from websockets.sync.client import connect
+
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import UploadedFileInfo
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+# Widget element type -> WidgetState field the frontend fills in
+VALUE_FIELDS = {
+    "text_input": "string_value",
+    "text_area": "string_value",
+    "selectbox": "string_value",
+    "number_input": "double_value",
+    "checkbox": "bool_value",
+}
+
+
+class HeadlessSession:
+    """One browser tab's session, driven synchronously from the calling thread"""
+
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session_id = None
+        self.elements = []   # (element type, element proto) drawn by the last run
+        self._widgets = {}   # widget key, or label for widgets without one -> (element type, element proto)
+        self._states = {}    # widget id -> WidgetState sent with every run, as the frontend does
+        self._triggers = []  # WidgetStates sent with the next run only
+        self._request_ids = itertools.count()
+        # The health check hands out the XSRF cookie that uploads must echo back
+        health = requests.get(self.base_url + "/_stcore/health", timeout=timeout)
+        health.raise_for_status()
+        self._xsrf = health.cookies.get("_streamlit_xsrf", "")
+        self._ws = connect(
+            self.base_url.replace("http", "ws", 1) + "/_stcore/stream",
+            subprotocols=["streamlit"],
+            max_size=None,
+            open_timeout=timeout,
+        )
+
+    def close(self):
+        self._ws.close()
+
+    def _receive(self):
+        msg = ForwardMsg()
+        msg.ParseFromString(self._ws.recv(self.timeout))
+        return msg
+
+    def _widget(self, name):
+        try:
+            return self._widgets[name]
+        except KeyError:
+            raise KeyError(f"no widget {name!r} in the last run") from None
+
+    def run(self):
+        """Rerun the script with the current widget values and wait for it to finish"""
+        msg = BackMsg()
+        msg.rerun_script.widget_states.widgets.extend(list(self._states.values()) + self._triggers)
+        self._triggers = []
+        self._ws.send(msg.SerializeToString())
+        self.elements, self._widgets = [], {}
+        while True:
+            msg = self._receive()
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = msg.new_session.initialize.session_id
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element_type = msg.delta.new_element.WhichOneof("type")
+                element = getattr(msg.delta.new_element, element_type)
+                self.elements.append((element_type, element))
+                widget_id = getattr(element, "id", "")
+                if widget_id.startswith("$$ID-"):
+                    key = widget_id.split("-", 2)[2]
+                    self._widgets[getattr(element, "label", key) if key == "None" else key] = (element_type, element)
+            elif kind == "script_finished" and msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        # Like the frontend, forget the values of widgets that are gone
+        drawn = {element.id for _, element in self._widgets.values()}
+        self._states = {widget_id: state for widget_id, state in self._states.items() if widget_id in drawn}
+        return self
+
+    def has(self, name):
+        return name in self._widgets
+
+    def set(self, key, value):
+        """Set a text, number, checkbox, selectbox (by option label) or date widget drawn by the last run"""
+        element_type, element = self._widget(key)
+        state = WidgetState(id=element.id)
+        if element_type == "date_input":
+            state.string_array_value.data.append(value.isoformat())
+        else:
+            setattr(state, VALUE_FIELDS[element_type], value)
+        self._states[element.id] = state
+        return self
+
+    def click(self, name):
+        """Press a button (by key, or by label if it has none) on the next run"""
+        _, element = self._widget(name)
+        self._triggers.append(WidgetState(id=element.id, trigger_value=True))
+        return self
+
+    def upload(self, key, filename, data, mime_type="application/octet-stream"):
+        """Upload a file to a file uploader, as the frontend does before the next run"""
+        _, element = self._widget(key)
+        msg = BackMsg()
+        msg.file_urls_request.request_id = request_id = str(next(self._request_ids))
+        msg.file_urls_request.file_names.append(filename)
+        msg.file_urls_request.session_id = self.session_id
+        self._ws.send(msg.SerializeToString())
+        while True:
+            reply = self._receive()
+            if reply.WhichOneof("type") == "file_urls_response" and reply.file_urls_response.response_id == request_id:
+                break
+        if reply.file_urls_response.error_msg:
+            raise RuntimeError(reply.file_urls_response.error_msg)
+        file_urls = reply.file_urls_response.file_urls[0]
+        response = requests.put(
+            self.base_url + file_urls.upload_url if file_urls.upload_url.startswith("/") else file_urls.upload_url,
+            files={"file": (filename, data, mime_type)},
+            cookies={"_streamlit_xsrf": self._xsrf},
+            headers={"X-Xsrftoken": self._xsrf},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        state = WidgetState(id=element.id)
+        state.file_uploader_state_value.uploaded_file_info.append(
+            UploadedFileInfo(file_id=file_urls.file_id, name=filename, size=len(data), file_urls=file_urls)
+        )
+        self._states[element.id] = state
+        return self
+
+    def alerts(self):
+        """(format, body) of each st.error/warning/info/success drawn by the last run, e.g. ("SUCCESS", "...")"""
+        return [(Alert.Format.Name(element.format), element.body) for element_type, element in self.elements if element_type == "alert"]
+
+    def exceptions(self):
+        """(type, message) of each exception shown by the last run"""
+        return [(element.type, element.message) for element_type, element in self.elements if element_type == "exception"]
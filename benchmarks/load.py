@@ -0,0 +1,355 @@
+"""Concurrent users submitting the forms through the real app, with mail going to a local SMTP sink.
+
+Starts ``streamlit run main.py`` headless and connects one ``HeadlessSession``
+per simulated user, each in its own thread, so the users share the outbox,
+SMTP pool, image workers and admission control of one server process, as
+they would in production. Users alternate between the new-club and update
+pages, filled from the synthetic corpus; some upload background pictures of
+up to ``--max-image-mb``.
+
+The server runs in a temporary directory with its own
+``.streamlit/secrets.toml``: mail goes to an ``SMTPSink`` on localhost, the
+outbox, store and blob store are scratch files, and the per-session and per-IP
+rate limits are lifted. Nothing reaches the real mail provider.
+
+With ``--replicas`` several servers run side by side in the same directory,
+sharing the outbox, store and (through ``SHARED_STATE_PATH``) rate limits and
+recent submissions, with users spread across them as a load balancer would.
+One of them holds the outbox lease and delivers everything.
+
+Reports submissions per second, p50/p99 latency of the submit rerun, how the
+submissions ended, the largest server's peak RSS, and the SMTP connections,
+logins and messages seen by the sink once the outbox has drained. Messages the
+sink got beyond the jobs marked sent are duplicates; queued submissions with no
+outbox job are lost.
+
+    python -m benchmarks.load --users 8 --submissions 5
+    python -m benchmarks.load --users 16 --submissions 5 --replicas 4
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks.corpus import generate_corpus, make_image
+from benchmarks.headless import HeadlessSession
+from benchmarks.smtp_sink import SMTPSink
+from main import (
+    LEADER_LIMITS, LIST_LIMITS, MAX_FILE_SIZE, MAX_IN_FLIGHT_SUBMISSIONS, MEETING_FIELDS,
+    leader_inputs, list_inputs, new_club_values
+)
+from outbox import STATUS_QUEUED, STATUS_SENDING, STATUS_SENT, Outbox
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+UNLIMITED = 1000000
+PAGE_BUTTONS = {"new_club": "New Club", "update_club": "Update Old Club"}
+SUBMIT_BUTTONS = {"new_club": "Submit", "update_club": "Submit Update"}
+BACK_BUTTONS = {"new_club": "new_club_back_btn", "update_club": "update_back_btn"}
+
+
+def write_secrets(directory, smtp_port, in_flight, waiting, shared_state=False):
+    """Point the app at the sink and at scratch files in ``directory``, with the rate limits lifted"""
+    secrets = {
+        "EMAIL_USER": "load@example.com",
+        "EMAIL_PASSWORD": "load",
+        "RECIPIENT_EMAIL": "recipient@example.com",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": smtp_port,
+        "OUTBOX_PATH": os.path.join(directory, "outbox.db"),
+        "STORE_PATH": os.path.join(directory, "clubs.db"),
+        "BLOB_PATH": os.path.join(directory, "blobs"),
+        "DIGEST_PATH": os.path.join(directory, "digest.db"),
+        "DIGEST_MODE": False,
+        "SUBMIT_SESSION_BURST": UNLIMITED,
+        "SUBMIT_IP_BURST": UNLIMITED,
+        "MAX_IN_FLIGHT_SUBMISSIONS": in_flight,
+        "MAX_WAITING_SUBMISSIONS": waiting,
+    }
+    if shared_state:
+        secrets["SHARED_STATE_PATH"] = os.path.join(directory, "shared.db")
+    os.makedirs(os.path.join(directory, ".streamlit"), exist_ok=True)
+    with open(os.path.join(directory, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        for key, value in secrets.items():
+            f.write(f"{key} = {json.dumps(value)}\n")
+    return secrets
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(directory, timeout, log_name="server.log"):
+    """Run the app headless with ``directory`` as its working directory; return (process, base URL)"""
+    port = free_port()
+    log_path = os.path.join(directory, log_name)
+    with open(log_path, "wb") as log:
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", SCRIPT,
+                "--server.headless", "true",
+                "--server.address", "127.0.0.1",
+                "--server.port", str(port),
+                "--browser.gatherUsageStats", "false",
+            ],
+            cwd=directory, stdout=log, stderr=subprocess.STDOUT
+        )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while server.poll() is None and time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + "/_stcore/health", timeout=1).ok:
+                return server, base_url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        raise RuntimeError(f"Streamlit server did not start:\n{f.read()}")
+
+
+def stop_server(server):
+    """Stop the server and return its peak RSS in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    server.terminate()
+    try:
+        server.wait(10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def fit_limits(club):
+    """The corpus can produce one list item more than the form allows"""
+    return dict(club, **{key: club[key][:max_count] for key, max_count in LIST_LIMITS.items()})
+
+
+def update_values(update_data):
+    """(ticked sections, {widget key: value}) filling the update page's inputs with ``update_data``"""
+    sections, values = [], {}
+    for field, value in update_data.items():
+        if field in MEETING_FIELDS:
+            section = "meeting_schedule"
+            values[f"update_{field}"] = value
+        elif field in LEADER_LIMITS:
+            section = field
+            values[f"update_{field}_count"] = max(1, len(value))
+            for i, leader in enumerate(value):
+                _, left, right = leader_inputs(field, i, "update_")
+                values.update({key: leader[name] for name, _, key in left + right})
+        elif field in LIST_LIMITS:
+            section = field
+            items = value[:LIST_LIMITS[field]] or [""]
+            values[f"update_{field}_count"] = len(items)
+            values.update({key: item for (_, key), item in zip(list_inputs(field, len(items), "update_"), items)})
+        else:
+            section = field
+            values[f"update_{field}"] = value
+        if section not in sections:
+            sections.append(section)
+    return sections, values
+
+
+def make_upload(size, seed, max_bytes):
+    """A background picture of about ``size`` bytes, regenerated smaller until it is within ``max_bytes``"""
+    image = make_image(size, seed)
+    while len(image) > max_bytes:
+        size = int(size * max_bytes / len(image) * 0.98)
+        image = make_image(size, seed)
+    return image
+
+
+def build_plan(users, submissions, seed, max_image_bytes):
+    """Per user, a list of (page, {widget key: value}, uploader key or None, image bytes or None)"""
+    rng = random.Random(seed)
+    corpus = generate_corpus(users * submissions, seed=seed)
+    plans = [[] for _ in range(users)]
+    for n, submission in enumerate(corpus):
+        user = n % users
+        size = min(submission["image_size"], max_image_bytes)
+        image = make_upload(size, seed + n, max_image_bytes) if size else None
+        if (n // users + user) % 2 == 0:
+            values = new_club_values(fit_limits(submission["form_data"]))
+            plans[user].append(("new_club", values, "background_image" if image else None, image))
+        else:
+            update_data = dict(submission["update_data"])
+            if update_data.pop("background_image", None) is None:
+                image = None
+            sections, values = update_values(update_data)
+            if image is not None:
+                sections.append("background_image")
+            if not sections:
+                sections.append("club_emoji")
+                values["update_club_emoji"] = submission["form_data"]["club_emoji"]
+            values["update_club_query"] = rng.choice([submission["club_identifier"], submission["form_data"]["club_emoji"]])
+            values.update({f"update_section_{section}": True for section in sections})
+            plans[user].append(("update_club", values, "update_background_image" if image else None, image))
+    return plans
+
+
+def fill(session, values):
+    """Set every widget in ``values`` the page draws, rerunning as counts and checkboxes reveal more"""
+    pending = dict(values)
+    while True:
+        ready = [key for key in pending if session.has(key)]
+        for key in ready:
+            session.set(key, pending.pop(key))
+        if not ready or not pending:
+            return
+        session.run()
+
+
+def outcome(session):
+    alerts = session.alerts()
+    if any(kind == "SUCCESS" and "queued for delivery" in body for kind, body in alerts):
+        return "queued"
+    if any(kind == "WARNING" and "nothing was sent" in body for kind, body in alerts):
+        return "rejected"
+    if session.exceptions() or any(kind == "ERROR" for kind, _ in alerts):
+        return "error"
+    return "unchanged"
+
+
+def run_user(base_url, plan, timeout, start, results):
+    """Play one user's plan: open each page from the landing page, fill it, then submit and time the rerun"""
+    session = HeadlessSession(base_url, timeout).run()
+    try:
+        start.wait()
+        page = None
+        for next_page, values, uploader, image in plan:
+            if page is not None:
+                session.click(BACK_BUTTONS[page]).run()
+            page = next_page
+            session.click(PAGE_BUTTONS[page]).run()
+            fill(session, values)
+            if uploader:
+                session.upload(uploader, f"{uploader}.jpg", image, "image/jpeg")
+            session.click(SUBMIT_BUTTONS[page])
+            began = time.perf_counter()
+            session.run()
+            results.append((page, time.perf_counter() - began, outcome(session), len(image or b"")))
+    finally:
+        session.close()
+
+
+def wait_for_outbox(path, timeout):
+    """Wait until the outbox has nothing queued or being sent; return the final counts by status"""
+    outbox = Outbox(path, deliver=None)
+    deadline = time.monotonic() + timeout
+    while True:
+        counts = outbox.counts()
+        if not counts.get(STATUS_QUEUED) and not counts.get(STATUS_SENDING) or time.monotonic() > deadline:
+            return counts
+        time.sleep(0.2)
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def run(users=8, submissions=5, seed=0, max_image_mb=30, in_flight=MAX_IN_FLIGHT_SUBMISSIONS,
+        smtp_latency=0.0, timeout=120, drain_timeout=300, replicas=1):
+    max_image_bytes = min(int(max_image_mb * 1024 * 1024), MAX_FILE_SIZE)
+    plans = build_plan(users, submissions, seed, max_image_bytes)
+    sink = SMTPSink(latency=smtp_latency).start()
+    with tempfile.TemporaryDirectory() as directory:
+        secrets = write_secrets(directory, sink.port, in_flight, users, shared_state=replicas > 1)
+        servers = []
+        try:
+            for n in range(replicas):
+                servers.append(start_server(directory, timeout, f"server-{n}.log"))
+            results = []
+            start = threading.Barrier(users + 1, timeout=timeout)
+            threads = [
+                threading.Thread(target=run_user, args=(servers[n % replicas][1], plan, timeout, start, results),
+                                 name=f"user-{n}")
+                for n, plan in enumerate(plans)
+            ]
+            for thread in threads:
+                thread.start()
+            start.wait()
+            began = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - began
+            outbox = wait_for_outbox(secrets["OUTBOX_PATH"], drain_timeout)
+            drained = time.perf_counter() - began
+        finally:
+            peak_rss_mb = max([stop_server(server) for server, _ in servers] or [0])
+            sink.stop()
+
+    latencies = sorted(seconds for _, seconds, _, _ in results)
+    outcomes = {}
+    for page, _, result, _ in results:
+        outcomes.setdefault(page, {}).setdefault(result, 0)
+        outcomes[page][result] += 1
+    queued = sum(counts.get("queued", 0) for counts in outcomes.values())
+    return {
+        "users": users,
+        "replicas": replicas,
+        "submissions": len(results),
+        "images": sum(1 for *_, size in results if size),
+        "image_mb": sum(size for *_, size in results) / 1024 / 1024,
+        "elapsed_s": elapsed,
+        "submissions_per_second": len(results) / elapsed,
+        "submit_p50_ms": percentile(latencies, 0.5) * 1000,
+        "submit_p99_ms": percentile(latencies, 0.99) * 1000,
+        "submit_max_ms": latencies[-1] * 1000,
+        "submit_mean_ms": statistics.mean(latencies) * 1000,
+        "outcomes": outcomes,
+        "outbox": outbox,
+        "lost": max(0, queued - sum(outbox.values())),
+        "duplicates": max(0, sink.stats()["messages"] - outbox.get(STATUS_SENT, 0)),
+        "drained_s": drained,
+        "smtp": sink.stats(),
+        "server_peak_rss_mb": peak_rss_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--submissions", type=int, default=5, help="submissions per user")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    parser.add_argument("--max-image-mb", type=float, default=30, help="largest background picture uploaded")
+    parser.add_argument("--in-flight", type=int, default=MAX_IN_FLIGHT_SUBMISSIONS, help="MAX_IN_FLIGHT_SUBMISSIONS for the run")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="seconds the sink waits after each message")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per script run")
+    parser.add_argument("--replicas", type=int, default=1, help="app servers sharing the outbox, store and shared state")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.users, args.submissions, args.seed, args.max_image_mb, args.in_flight, args.smtp_latency,
+                  args.timeout, replicas=args.replicas)
+    print(f"{results['users']} users on {results['replicas']} server(s), {results['submissions']} submissions "
+          f"({results['images']} with pictures, {results['image_mb']:.1f} MB) in {results['elapsed_s']:.1f} s")
+    print(f"  throughput     {results['submissions_per_second']:.2f} submissions/s")
+    print(f"  submit latency p50 {results['submit_p50_ms']:.0f} ms  p99 {results['submit_p99_ms']:.0f} ms  "
+          f"max {results['submit_max_ms']:.0f} ms")
+    for page, counts in results["outcomes"].items():
+        print(f"  {page:<12}   " + "  ".join(f"{result} {count}" for result, count in sorted(counts.items())))
+    smtp = results["smtp"]
+    print(f"  outbox         {results['outbox']} after {results['drained_s']:.1f} s, "
+          f"{results['lost']} lost, {results['duplicates']} duplicates")
+    print(f"  SMTP sink      {smtp['connections']} connections, {smtp['logins']} logins, "
+          f"{smtp['messages']} messages, {smtp['bytes'] / 1024 / 1024:.1f} MB")
+    print(f"  server RSS     {results['server_peak_rss_mb']:.0f} MB peak (largest server)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
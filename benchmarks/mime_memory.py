@@ -0,0 +1,120 @@
+"""Peak memory of building and sending one email with a large attachment.
+
+Compares the old in-memory path (MIMEMultipart + MIMEImage + send_message
+flattening) with the streaming writer in ``mime_stream``. The SMTP server is a
+stand-in that discards the bytes it receives, so only message construction is
+measured.
+
+    python -m benchmarks.mime_memory --sizes 1 10 30
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from mime_stream import iter_message, send_streamed
+
+BODY = "CLUB INFORMATION\n\nName: Coding Club 💻\n" * 20
+
+
+class DiscardingServer:
+    """Just enough of smtplib.SMTP to complete a transaction and drop the data"""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def mail(self, sender):
+        return 250, b"OK"
+
+    def rcpt(self, recipient):
+        return 250, b"OK"
+
+    def docmd(self, cmd):
+        return 354, b"Go ahead"
+
+    def send(self, data):
+        self.bytes_sent += len(data)
+
+    def getreply(self):
+        return 250, b"OK"
+
+    def sendmail(self, sender, recipients, msg):
+        self.send(msg)
+
+    def send_message(self, msg):
+        # Mirrors smtplib: flatten the whole message to bytes, then send it
+        self.send(msg.as_bytes())
+
+
+def send_in_memory(path):
+    msg = MIMEMultipart()
+    msg["From"] = "sender@example.com"
+    msg["To"] = "recipient@example.com"
+    msg["Subject"] = "New Club Information: Coding Club"
+    msg.attach(MIMEText(BODY, "plain"))
+    with open(path, "rb") as f:
+        image_data = f.read()
+    img = MIMEImage(image_data, _subtype="jpeg")
+    img.add_header("Content-Disposition", "attachment", filename="club_background.jpg")
+    msg.attach(img)
+    DiscardingServer().send_message(msg)
+
+
+def send_streaming(path):
+    send_streamed(
+        DiscardingServer(),
+        "sender@example.com",
+        ["recipient@example.com"],
+        iter_message(
+            "sender@example.com",
+            "recipient@example.com",
+            "New Club Information: Coding Club",
+            BODY,
+            [("club_background.jpg", path)]
+        )
+    )
+
+
+def peak_memory(fn, path):
+    tracemalloc.start()
+    try:
+        fn(path)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes_mb):
+    results = []
+    for size_mb in sizes_mb:
+        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+            f.write(os.urandom(int(size_mb * 1024 * 1024)))
+            path = f.name
+        try:
+            results.append({
+                "attachment_mb": size_mb,
+                "in_memory_peak_mb": peak_memory(send_in_memory, path) / 1024 / 1024,
+                "streaming_peak_mb": peak_memory(send_streaming, path) / 1024 / 1024,
+            })
+        finally:
+            os.remove(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 10, 30], help="attachment sizes in MB")
+    args = parser.parse_args()
+    print(f"{'attachment':>10}  {'in-memory peak':>14}  {'streaming peak':>14}")
+    for row in run(args.sizes):
+        print(f"{row['attachment_mb']:>8.1f}MB  {row['in_memory_peak_mb']:>12.1f}MB  {row['streaming_peak_mb']:>12.2f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Memory and serialization speed of club records as dicts versus ``models.Club``.
+
+Loads ``--count`` corpus clubs the way the store hands them out (each record
+decoded from its own JSON text, so no strings are shared between records) and
+measures the memory they keep alive with ``tracemalloc``: once as ``form_data``
+dicts and once as ``Club`` objects. Then times a JSON round trip of the dicts
+against ``Club.to_json``/``from_json`` and, if ``msgpack`` is installed,
+``to_msgpack``/``from_msgpack``.
+
+    python -m benchmarks.models --count 5000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_corpus
+from models import Club
+
+
+def retained_bytes(build):
+    """Bytes still allocated after ``build()`` returns, while its result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def per_record_us(fn, items, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        began = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - began)
+    return best / len(items) * 1e6
+
+
+def run(count=5000, seed=0):
+    texts = [json.dumps(submission["form_data"], ensure_ascii=False) for submission in generate_corpus(count, seed=seed)]
+    dict_bytes = retained_bytes(lambda: [json.loads(text) for text in texts])
+    model_bytes = retained_bytes(lambda: [Club.from_dict(json.loads(text)) for text in texts])
+
+    dicts = [json.loads(text) for text in texts]
+    clubs = [Club.from_dict(form_data) for form_data in dicts]
+    packed_json = [club.to_json() for club in clubs]
+    results = {
+        "memory": {
+            "records": count,
+            "dict_bytes_per_record": dict_bytes / count,
+            "model_bytes_per_record": model_bytes / count,
+            "saving": 1 - model_bytes / dict_bytes,
+        },
+        "json": {
+            "dict_bytes": sum(len(text.encode("utf-8")) for text in texts) / count,
+            "model_bytes": sum(len(text.encode("utf-8")) for text in packed_json) / count,
+            "dict_dump_us": per_record_us(lambda form_data: json.dumps(form_data, ensure_ascii=False), dicts),
+            "model_dump_us": per_record_us(Club.to_json, clubs),
+            "dict_load_us": per_record_us(json.loads, texts),
+            "model_load_us": per_record_us(Club.from_json, packed_json),
+        },
+    }
+    try:
+        packed_msgpack = [club.to_msgpack() for club in clubs]
+    except ImportError:
+        return results
+    results["msgpack"] = {
+        "model_bytes": sum(map(len, packed_msgpack)) / count,
+        "model_dump_us": per_record_us(Club.to_msgpack, clubs),
+        "model_load_us": per_record_us(Club.from_msgpack, packed_msgpack),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000, help="club records built")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    args = parser.parse_args()
+    results = run(args.count, args.seed)
+    memory = results["memory"]
+    print(f"{memory['records']} records in memory: dicts {memory['dict_bytes_per_record']:.0f} B each, "
+          f"Club {memory['model_bytes_per_record']:.0f} B each ({memory['saving']:.0%} less)")
+    for name in ("json", "msgpack"):
+        if name not in results:
+            print(f"{name:<8} skipped (pip install {name} to include it)")
+            continue
+        row = results[name]
+        line = f"{name:<8} Club {row['model_bytes']:.0f} B, dump {row['model_dump_us']:.1f} us, load {row['model_load_us']:.1f} us"
+        if "dict_bytes" in row:
+            line += (f"  (dict {row['dict_bytes']:.0f} B, dump {row['dict_dump_us']:.1f} us, "
+                     f"load {row['dict_load_us']:.1f} us)")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
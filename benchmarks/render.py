@@ -0,0 +1,210 @@
+"""Micro-benchmark of the precompiled renderer against the original formatters.
+
+The original ``format_club_info``/``format_update_info`` bodies are kept here
+verbatim as the reference: the benchmark first checks that the text renderer
+produces identical output, then times both on a large submission.
+
+    python -m benchmarks.render --leaders 10 --items 10
+"""
+import argparse
+import datetime
+import timeit
+
+from renderer import get_renderer
+
+
+def legacy_format_club_info(form_data):
+    """Original string-concatenating implementation of main.format_club_info"""
+    text = f"""
+CLUB INFORMATION
+
+Name: {form_data['club_name']} {form_data['club_emoji']}
+Category: {form_data['club_category']}
+Date of Establishment: {form_data['establishment_date']}
+
+LEADERSHIP
+"""
+    
+    # Add presidents
+    for i, president in enumerate(form_data['presidents']):
+        text += f"""
+President {i+1}:
+- Chinese Name: {president['chinese_name']}
+- English Name: {president['english_name']}
+- Class: {president['class']}
+- Email: {president['email']}
+- WeChat ID: {president['wechat']}
+"""
+    
+    # Add vice-presidents
+    for i, vp in enumerate(form_data['vice_presidents']):
+        text += f"""
+Vice-President {i+1}:
+- Chinese Name: {vp['chinese_name']}
+- English Name: {vp['english_name']}
+- Class: {vp['class']}
+- Email: {vp['email']}
+- WeChat ID: {vp['wechat']}
+"""
+    
+    # Meeting information
+    text += f"""
+MEETING SCHEDULE
+- Frequency: {form_data['meeting_frequency']}
+- Day and Time: {form_data['meeting_day_time']}
+- Location: {form_data['meeting_location']}
+
+REQUIREMENTS
+"""
+    
+    for i, req in enumerate(form_data['requirements']):
+        if req.strip():
+            text += f"- {req}\n"
+    
+    text += f"""
+LEARNING OBJECTIVES
+"""
+    
+    for i, obj in enumerate(form_data['learning_objectives']):
+        if obj.strip():
+            text += f"- {obj}\n"
+    
+    text += f"""
+FOR WHOM
+"""
+    
+    for i, whom in enumerate(form_data['for_whom']):
+        if whom.strip():
+            text += f"- {whom}\n"
+    
+    text += f"""
+EXAMPLES OF PAST ACTIVITIES/PROJECTS
+"""
+    
+    for i, activity in enumerate(form_data['past_activities']):
+        if activity.strip():
+            text += f"- {activity}\n"
+    
+    text += f"""
+BENEFITS OF JOINING
+"""
+    
+    for i, benefit in enumerate(form_data['benefits']):
+        if benefit.strip():
+            text += f"{i+1}. {benefit}\n"
+    
+    return text
+
+def legacy_format_update_info(club_identifier, update_data):
+    """Original string-concatenating implementation of main.format_update_info"""
+    text = f"""
+CLUB UPDATE REQUEST
+
+Club Identifier: {club_identifier}
+
+Updated Fields:
+"""
+    for key, value in update_data.items():
+        if key == "background_image":
+            text += f"- Background Image: [Attached if present]\n"
+        elif key == "presidents":
+            text += "- Presidents:\n"
+            for i, president in enumerate(value):
+                text += f"  President {i+1}:\n"
+                for k, v in president.items():
+                    text += f"    {k.replace('_', ' ').title()}: {v}\n"
+        elif key == "vice_presidents":
+            text += "- Vice-Presidents:\n"
+            for i, vp in enumerate(value):
+                text += f"  Vice-President {i+1}:\n"
+                for k, v in vp.items():
+                    text += f"    {k.replace('_', ' ').title()}: {v}\n"
+        elif isinstance(value, list):
+            text += f"- {key.replace('_', ' ').title()}:\n"
+            for i, item in enumerate(value):
+                text += f"    {i+1}. {item}\n"
+        else:
+            text += f"- {key.replace('_', ' ').title()}: {value}\n"
+    return text
+
+
+def large_submission(leaders, items):
+    """A new-club form and a matching update with every list filled in"""
+    def leader(role, i):
+        return {
+            "chinese_name": f"张{role}{i}",
+            "english_name": f"{role.title()} {i} Zhang",
+            "class": f"G{10 + i % 3}.{i % 4 + 1}",
+            "email": f"{role}.{i}@example.com",
+            "wechat": f"{role}_{i}_wx"
+        }
+
+    def sentences(topic):
+        return [f"{topic} sentence number {i+1} describing the club in some detail." for i in range(items)]
+
+    form_data = {
+        "club_name": "Robotics & AI Club",
+        "club_emoji": "🤖",
+        "club_category": "Academic clubs",
+        "establishment_date": "September 15, 2022",
+        "presidents": [leader("president", i) for i in range(leaders)],
+        "vice_presidents": [leader("vp", i) for i in range(leaders)],
+        "meeting_frequency": "Weekly",
+        "meeting_day_time": "Wednesday P8",
+        "meeting_location": "Computer Lab 2",
+        "requirements": sentences("Requirement") + ["   "],
+        "learning_objectives": sentences("Objective"),
+        "for_whom": sentences("For whom"),
+        "past_activities": sentences("Activity"),
+        "benefits": [""] + sentences("Benefit")
+    }
+    update_data = {
+        "club_name": "Robotics Club",
+        "club_category": "Academic clubs",
+        "establishment_date": datetime.date(2022, 9, 15),
+        "presidents": form_data["presidents"],
+        "vice_presidents": form_data["vice_presidents"],
+        "meeting_frequency": "Bi-weekly",
+        "requirements": form_data["requirements"],
+        "benefits": form_data["benefits"],
+        "background_image": object()
+    }
+    return form_data, update_data
+
+
+def run(leaders=10, items=10, number=2000):
+    form_data, update_data = large_submission(leaders, items)
+    text = get_renderer("text")
+    assert text.club_info(form_data) == legacy_format_club_info(form_data)
+    assert text.update_info("Robotics", update_data) == legacy_format_update_info("Robotics", update_data)
+
+    cases = {
+        "format_club_info": (
+            lambda: legacy_format_club_info(form_data),
+            lambda: text.club_info(form_data)
+        ),
+        "format_update_info": (
+            lambda: legacy_format_update_info("Robotics", update_data),
+            lambda: text.update_info("Robotics", update_data)
+        ),
+    }
+    results = {}
+    for name, (legacy, compiled) in cases.items():
+        legacy_us = min(timeit.repeat(legacy, number=number, repeat=5)) / number * 1e6
+        compiled_us = min(timeit.repeat(compiled, number=number, repeat=5)) / number * 1e6
+        results[name] = {"legacy_us": legacy_us, "renderer_us": compiled_us, "speedup": legacy_us / compiled_us}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--leaders", type=int, default=10, help="presidents and vice-presidents each")
+    parser.add_argument("--items", type=int, default=10, help="items in every list section")
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    args = parser.parse_args()
+    for name, row in run(args.leaders, args.items, args.number).items():
+        print(f"{name:<20} legacy {row['legacy_us']:8.1f} us  renderer {row['renderer_us']:8.1f} us  x{row['speedup']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Rerun wall time of the form pages when one count changes.
+
+Before the sections became fragments, changing any count reran the whole
+page script. With fragments, Streamlit reruns only the section that holds the
+count. ``AppTest`` always performs full runs, so a section rerun is timed by
+running just that section's fragment function as the whole script, with the
+same session state. Both numbers include AppTest's own fixed cost per run,
+which is reported separately as ``empty_ms``.
+
+Every count is set to its maximum first (5 presidents, 5 vice-presidents and
+every list full), the worst case for a full rerun.
+
+    python -m benchmarks.rerun --repeat 20
+"""
+import argparse
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from main import LEADER_LIMITS, LIST_LIMITS, UPDATE_SECTIONS
+
+
+def empty_script():
+    pass
+
+
+def section_script(name, *args):
+    import main
+    getattr(main, name)(*args)
+
+
+def median_rerun_ms(at, repeat, key=None, values=None):
+    """Median wall time of a rerun, caused by setting the number input ``key`` to each of ``values`` in turn"""
+    times = []
+    for i in range(repeat):
+        if key is not None:
+            at.number_input(key=key).set_value(values[i % len(values)])
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def fill_counts(at, key_prefix=""):
+    for key, (_, max_count) in LEADER_LIMITS.items():
+        at.number_input(key=f"{key_prefix}{key}_count").set_value(max_count).run()
+    for key, max_count in LIST_LIMITS.items():
+        at.number_input(key=f"{key_prefix}{key}_count").set_value(max_count).run()
+
+
+def new_club_page(timeout):
+    at = AppTest.from_file("../main.py", default_timeout=timeout).run()
+    at.button[0].click().run()
+    fill_counts(at)
+    return at
+
+
+def update_page(timeout):
+    at = AppTest.from_file("../main.py", default_timeout=timeout).run()
+    at.button[1].click().run()
+    for section in UPDATE_SECTIONS:
+        if section != "background_image":
+            at.checkbox(key=f"update_section_{section}").check().run()
+    fill_counts(at, "update_")
+    return at
+
+
+def section_alone(at, name, args, timeout):
+    """An AppTest running only one section function, with a copy of ``at``'s counts and section checkboxes"""
+    section = AppTest.from_function(section_script, args=(name, *args), default_timeout=timeout)
+    keys = [f"{prefix}{key}_count" for prefix in ("", "update_") for key in (*LEADER_LIMITS, *LIST_LIMITS)]
+    keys += [f"update_section_{key}" for key in UPDATE_SECTIONS]
+    for key in keys:
+        if key in at.session_state:
+            section.session_state[key] = at.session_state[key]
+    return section.run()
+
+
+def run(repeat=20, timeout=30):
+    empty = AppTest.from_function(empty_script, default_timeout=timeout).run()
+    results = {"empty_ms": median_rerun_ms(empty, repeat)}
+
+    cases = {
+        "new_club_benefits": (new_club_page, "list_section", ("benefits",), "benefits_count"),
+        "new_club_presidents": (new_club_page, "leader_section", ("presidents",), "presidents_count"),
+        "update_benefits": (update_page, "update_section", ("benefits",), "update_benefits_count"),
+    }
+    for name, (page, section, args, key) in cases.items():
+        at = page(timeout)
+        max_count = at.number_input(key=key).max
+        full_ms = median_rerun_ms(at, repeat, key, (max_count - 1, max_count))
+        alone = section_alone(at, section, args, timeout)
+        section_ms = median_rerun_ms(alone, repeat, key, (max_count - 1, max_count))
+        results[name] = {"full_rerun_ms": full_ms, "section_rerun_ms": section_ms, "speedup": full_ms / section_ms}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="reruns timed per case")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds allowed per script run")
+    args = parser.parse_args()
+    results = run(args.repeat, args.timeout)
+    print(f"AppTest overhead per run: {results.pop('empty_ms'):.1f} ms")
+    for name, row in results.items():
+        print(f"{name:<22} full page {row['full_rerun_ms']:7.1f} ms  section {row['section_rerun_ms']:6.1f} ms  x{row['speedup']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""A local SMTP stand-in that accepts and discards mail.
+
+Speaks just enough ESMTP for ``smtplib`` (EHLO, AUTH PLAIN, MAIL, RCPT, DATA,
+RSET, NOOP, QUIT) and counts connections, messages and bytes so benchmarks can
+run without touching the real provider.
+
+    sink = SMTPSink().start()
+    ... send to ("127.0.0.1", sink.port) ...
+    print(sink.stats())
+    sink.stop()
+"""
+import socketserver
+import threading
+import time
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        sink = self.server.sink
+        sink._count("connections")
+        self.reply("220 smtp-sink ESMTP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.reply("250-smtp-sink")
+                self.reply("250-AUTH PLAIN")
+                self.reply("250 8BITMIME")
+            elif command == b"AUTH":
+                sink._count("logins")
+                self.reply("235 2.7.0 Authentication successful")
+            elif command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                    size += len(data_line)
+                if sink.latency:
+                    time.sleep(sink.latency)
+                sink._count("messages")
+                sink._count("bytes", size)
+                self.reply("250 2.0.0 Ok: queued")
+            elif command == b"QUIT":
+                self.reply("221 2.0.0 Bye")
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self.reply("250 2.0.0 Ok")
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SMTPSink:
+    """Threaded SMTP server on localhost; ``latency`` adds a delay after each DATA"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._counters = {"connections": 0, "logins": 0, "messages": 0, "bytes": 0}
+        self._server = _ThreadingServer((host, port), _SinkHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+        self._thread = None
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._counters[key] += amount
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
@@ -0,0 +1,115 @@
+"""Cold start of the app: importing it, and the first page a new replica serves.
+
+``import`` times ``import main`` in a fresh interpreter, with Streamlit
+already imported so only the app's own modules count (the server has Streamlit
+loaded before it runs the script). ``-X importtime`` names the app's slowest
+imports.
+
+``first paint`` starts ``streamlit run main.py`` headless in an empty
+directory and times how long it takes until the server answers its health
+check, then the first script run of the first session (the landing page;
+this run imports the app), the same page in a second session, and the first
+visit to the new-club form. Each cold start uses a new server process.
+
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.headless import HeadlessSession
+from benchmarks.load import SCRIPT, start_server, stop_server
+
+IMPORT_SNIPPET = "import streamlit, time; began = time.perf_counter(); import main; print(time.perf_counter() - began)"
+
+
+def import_ms(cwd):
+    """Wall time of ``import main`` in a new interpreter, Streamlit excluded"""
+    result = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=cwd, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1]) * 1000
+
+
+def slowest_imports(cwd, top):
+    """(module, cumulative ms) of the slowest top-level imports made by ``main``, outside Streamlit"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import streamlit; import main"],
+        cwd=cwd, capture_output=True, text=True, check=True
+    )
+    rows = []
+    # A module is listed after everything it imports, one level further indented
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            if name.strip() == "main":
+                break
+            rows = []
+        elif depth == 1 and cumulative.strip().isdigit():
+            rows.append((name.strip(), int(cumulative) / 1000))
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+
+
+def timed_run(session):
+    began = time.perf_counter()
+    session.run()
+    return (time.perf_counter() - began) * 1000
+
+
+def first_paint(timeout):
+    """Times in ms of one cold start, from launching the server to the first form page"""
+    with tempfile.TemporaryDirectory() as directory:
+        began = time.perf_counter()
+        server, base_url = start_server(directory, timeout)
+        times = {"server_ready_ms": (time.perf_counter() - began) * 1000}
+        try:
+            first = HeadlessSession(base_url, timeout)
+            times["first_run_ms"] = timed_run(first)
+            times["first_paint_ms"] = (time.perf_counter() - began) * 1000
+            second = HeadlessSession(base_url, timeout)
+            times["second_session_ms"] = timed_run(second)
+            first.click("New Club")
+            times["new_club_page_ms"] = timed_run(first)
+            first.close()
+            second.close()
+        finally:
+            stop_server(server)
+    return times
+
+
+def run(repeat=5, timeout=60, top=8):
+    cwd = os.path.dirname(SCRIPT)
+    imports = [import_ms(cwd) for _ in range(repeat)]
+    starts = [first_paint(timeout) for _ in range(repeat)]
+    results = {"import_ms": statistics.median(imports)}
+    for key in starts[0]:
+        results[key] = statistics.median(start[key] for start in starts)
+    results["slowest_imports"] = slowest_imports(cwd, top)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="cold starts timed (medians are reported)")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds allowed for the server to start and each run")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports listed")
+    args = parser.parse_args()
+    results = run(args.repeat, args.timeout, args.top)
+    print(f"import main           {results['import_ms']:7.1f} ms")
+    print(f"server ready          {results['server_ready_ms']:7.1f} ms")
+    print(f"first run (landing)   {results['first_run_ms']:7.1f} ms")
+    print(f"first paint           {results['first_paint_ms']:7.1f} ms after launch")
+    print(f"second session        {results['second_session_ms']:7.1f} ms")
+    print(f"new club page         {results['new_club_page_ms']:7.1f} ms")
+    print("slowest imports:")
+    for name, ms in results["slowest_imports"]:
+        print(f"  {name:<20} {ms:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Benchmark suite for the submission pipeline, with results recorded as JSON.
+
+Times formatting, MIME construction, image transcoding and SMTP delivery to a
+local sink over a synthetic corpus, then writes a JSON report. Pass
+``--compare`` with an earlier report to print the change for every metric.
+
+    python -m benchmarks --count 200 --output results.json
+    python -m benchmarks --compare results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_corpus, make_image
+from benchmarks.smtp_sink import SMTPSink
+from images import transcode_image
+from main import format_club_info, format_update_info
+from mime_stream import iter_message, send_streamed
+from smtp_pool import SMTPPool
+
+SENDER = "bench@example.com"
+RECIPIENT = "recipient@example.com"
+
+
+def timed(fn, items, repeat=3):
+    """Best-of-``repeat`` wall time for calling ``fn`` on every item"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def per_call(seconds, calls):
+    return {"calls": calls, "total_s": seconds, "mean_us": seconds / calls * 1e6, "per_second": calls / seconds}
+
+
+def bench_formatting(corpus):
+    forms = [s["form_data"] for s in corpus]
+    updates = [(s["club_identifier"], s["update_data"]) for s in corpus]
+    return {
+        "format_club_info": per_call(timed(format_club_info, forms), len(forms)),
+        "format_update_info": per_call(timed(lambda u: format_update_info(*u), updates), len(updates)),
+    }
+
+
+def write_attachments(sizes, directory):
+    """Spool one JPEG per size to disk, as the outbox does, returning {size: path}"""
+    paths = {}
+    for size in sizes:
+        path = os.path.join(directory, f"image-{size}.jpg")
+        with open(path, "wb") as f:
+            f.write(make_image(size))
+        paths[size] = path
+    return paths
+
+
+def bench_mime(corpus, attachment_paths):
+    """Time building each message (consumed into a null writer) for every attachment size"""
+    results = {}
+    bodies = [format_club_info(s["form_data"]) for s in corpus[:50]]
+    for size, path in sorted(attachment_paths.items()):
+        attachments = [("club_background.jpg", path)] if path else []
+
+        def build(body):
+            for chunk in iter_message(SENDER, RECIPIENT, "New Club Information", body, attachments):
+                pass
+
+        seconds = timed(build, bodies, repeat=1 if size > 8 * 1024 * 1024 else 3)
+        results[f"mime_{size // 1024}kb"] = per_call(seconds, len(bodies))
+    return results
+
+
+def bench_images(attachment_paths):
+    """Transcode one upload of every size with the default settings"""
+    results = {}
+    for size, path in sorted(attachment_paths.items()):
+        if not path:
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        start = time.perf_counter()
+        image = transcode_image(data)
+        seconds = time.perf_counter() - start
+        results[f"transcode_{size // 1024}kb"] = {
+            "seconds": seconds,
+            "original_bytes": image.original_bytes,
+            "output_bytes": image.output_bytes,
+            "ratio": image.original_bytes / image.output_bytes,
+        }
+    return results
+
+
+def bench_smtp(corpus, attachment_paths, messages):
+    """Deliver ``messages`` emails through the connection pool to a local sink"""
+    sink = SMTPSink().start()
+    pool = SMTPPool(sink.host, sink.port, "bench", "bench", size=2)
+    small = [("club_background.jpg", attachment_paths[min(p for p in attachment_paths if p)])]
+    try:
+        start = time.perf_counter()
+        for n in range(messages):
+            submission = corpus[n % len(corpus)]
+            attachments = small if submission["image_size"] else []
+            pool.run(lambda server: send_streamed(
+                server, SENDER, [RECIPIENT],
+                iter_message(SENDER, RECIPIENT, "New Club Information", format_club_info(submission["form_data"]), attachments)
+            ))
+        seconds = time.perf_counter() - start
+    finally:
+        pool.close()
+        sink.stop()
+    result = per_call(seconds, messages)
+    result.update({f"sink_{key}": value for key, value in sink.stats().items()})
+    result.update({f"pool_{key}": value for key, value in pool.stats().items()})
+    return {"smtp_delivery": result}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Print each timing next to the baseline's; ratios above 1 are slowdowns"""
+    for name, metrics in report["results"].items():
+        old = baseline["results"].get(name)
+        if not old:
+            continue
+        for key in ("mean_us", "seconds"):
+            if key in metrics and key in old:
+                ratio = metrics[key] / old[key]
+                flag = "  REGRESSION" if ratio > 1.1 else ""
+                print(f"{name:<28} {key:<8} {old[key]:>12.1f} -> {metrics[key]:>12.1f}  x{ratio:.2f}{flag}")
+
+
+def run(count=200, seed=0, max_image_mb=30, smtp_messages=200):
+    corpus = list(generate_corpus(count, seed=seed))
+    sizes = [size for size in sorted({0, 200 * 1024, 2 * 1024 * 1024, 8 * 1024 * 1024, 30 * 1024 * 1024})
+             if size <= max_image_mb * 1024 * 1024]
+
+    results = {}
+    results.update(bench_formatting(corpus))
+    with tempfile.TemporaryDirectory() as directory:
+        attachment_paths = write_attachments([s for s in sizes if s], directory)
+        attachment_paths[0] = None
+        results.update(bench_mime(corpus, attachment_paths))
+        results.update(bench_images(attachment_paths))
+        results.update(bench_smtp(corpus, attachment_paths, smtp_messages))
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "count": count,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200, help="submissions in the synthetic corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-image-mb", type=float, default=30, help="largest attachment size to benchmark")
+    parser.add_argument("--smtp-messages", type=int, default=200, help="emails to deliver to the local sink")
+    parser.add_argument("--output", help="where to write the JSON report (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    report = run(args.count, args.seed, args.max_image_mb, args.smtp_messages)
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), "results", datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, metrics in report["results"].items():
+        summary = ", ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}" for key, value in metrics.items())
+        print(f"{name:<28} {summary}")
+    print(f"Report written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """Content-addressed file store for uploaded pictures.
+
+    Blobs are named by the SHA-256 of their bytes, so storing the same picture
+    twice keeps one copy. Each blob carries a reference count (the clubs whose
+    current record uses it), and for each club the last email it was attached to.
+    ``aliases`` map other keys, such as the hash of an original upload plus
+    the transcoding settings, to a stored blob and its metadata. When the
+    files outgrow ``max_bytes``, unreferenced blobs are evicted least recently
+    used first.
+    """
+
+    def __init__(self, path, max_bytes=1024 * 1024 * 1024):
+        self.path = path
+        self.objects_dir = os.path.join(path, "objects")
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    refcount INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS blobs_evictable ON blobs (refcount, last_used);
+
+                CREATE TABLE IF NOT EXISTS blob_jobs (
+                    digest TEXT NOT NULL,
+                    club TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    sent_at REAL NOT NULL,
+                    PRIMARY KEY (digest, club)
+                );
+
+                CREATE TABLE IF NOT EXISTS aliases (
+                    key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    meta TEXT NOT NULL
+                );
+            """)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Yield this thread's connection, kept open so each call skips connect and WAL checkpoint costs"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.path, "blobs.db"), timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def _file(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def put(self, data, digest=None):
+        """Store bytes if they aren't stored yet and return their SHA-256 digest"""
+        digest = digest or sha256(data)
+        path = self._file(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write under a unique name and rename, so readers never see half a file
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO blobs (digest, size, created_at, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (digest) DO UPDATE SET last_used = excluded.last_used",
+                (digest, len(data), now, now)
+            )
+        self.evict()
+        return digest
+
+    def get(self, digest):
+        """Return the stored bytes for a digest, or None if it isn't stored (or was evicted)"""
+        try:
+            with open(self._file(digest), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        with self._connect() as conn:
+            conn.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+        return data
+
+    def __contains__(self, digest):
+        return os.path.exists(self._file(digest))
+
+    def incref(self, digest):
+        """Record one more club using this blob; referenced blobs are never evicted"""
+        with self._connect() as conn:
+            conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE digest = ?", (digest,))
+
+    def decref(self, digest):
+        with self._connect() as conn:
+            conn.execute("UPDATE blobs SET refcount = MAX(refcount - 1, 0) WHERE digest = ?", (digest,))
+        self.evict()
+
+    def set_job(self, digest, club, job_id, subject):
+        """Remember the email job (and its subject) that carried this blob as an attachment for ``club``"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO blob_jobs (digest, club, job_id, subject, sent_at) VALUES (?, ?, ?, ?, ?)",
+                (digest, club, job_id, subject, time.time())
+            )
+
+    def job(self, digest, club):
+        """The last email job this blob was attached to for ``club``, as a dict with job_id, subject and sent_at, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT job_id, subject, sent_at FROM blob_jobs WHERE digest = ? AND club = ?", (digest, club)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def set_alias(self, key, digest, meta=None):
+        """Point ``key`` at a stored blob, with JSON metadata to return from ``alias``"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO aliases (key, digest, meta) VALUES (?, ?, ?)",
+                (key, digest, json.dumps(meta or {}))
+            )
+
+    def alias(self, key):
+        """Return (digest, meta) for an alias whose blob is still stored, else None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT digest, meta FROM aliases WHERE key = ?", (key,)).fetchone()
+        if row is None or row["digest"] not in self:
+            return None
+        return row["digest"], json.loads(row["meta"])
+
+    def evict(self):
+        """Delete unreferenced blobs, least recently used first, until the store fits in ``max_bytes``"""
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            freed = 0
+            for row in conn.execute(
+                "SELECT digest, size FROM blobs WHERE refcount = 0 ORDER BY last_used"
+            ).fetchall():
+                if total - freed <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self._file(row["digest"]))
+                except FileNotFoundError:
+                    pass
+                conn.execute("DELETE FROM blobs WHERE digest = ?", (row["digest"],))
+                conn.execute("DELETE FROM aliases WHERE digest = ?", (row["digest"],))
+                conn.execute("DELETE FROM blob_jobs WHERE digest = ?", (row["digest"],))
+                freed += row["size"]
+        return freed
+
+    def stats(self):
+        """Number of blobs, their total size and how many are referenced"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refcount > 0), 0) FROM blobs"
+            ).fetchone()
+        return {"blobs": row[0], "bytes": row[1], "referenced": row[2], "max_bytes": self.max_bytes}
@@ -0,0 +1,462 @@
+"""Bulk import of new clubs from a spreadsheet.
+
+Reads CSV, JSONL or XLSX rows, validates them all in one batch, formats the
+valid ones across a process pool (transcoding any background pictures there
+too) and emails them with a bounded number of concurrent SMTP sessions (or
+another delivery backend, see ``--backend``). Rows that were sent are recorded
+in a checkpoint file next to the input, so re-running the same command after
+a failure only sends what is left. Sent clubs are saved to the submission
+store like form submissions, with their pictures in the blob store.
+
+    python bulk_import.py clubs.csv
+    python bulk_import.py clubs.xlsx --dry-run
+    python bulk_import.py --template > clubs.csv
+
+CSV and XLSX columns use the ``form_data`` keys (``club_name``,
+``meeting_location``, ...; headers like "Club Name" work too). Leaders go in
+numbered columns such as ``president_1_email`` or ``vice_president_2_wechat``.
+List sections are either one cell with an item per line or numbered columns
+such as ``benefits_1``. An optional ``background_image`` column holds a
+picture path relative to the input file. JSONL lines are ``form_data``
+objects shaped like ``EXAMPLE_CLUB``.
+"""
+import argparse
+import collections
+import concurrent.futures
+import csv
+import datetime
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+from images import transcode_image
+from main import (
+    DELIVERY_FSYNC_BATCH,
+    DELIVERY_FSYNC_INTERVAL,
+    DELIVERY_PATHS,
+    IMAGE_FORMAT,
+    IMAGE_MAX_SIZE,
+    IMAGE_QUALITY,
+    MAX_FILE_SIZE,
+    SMTP_MAX_IDLE,
+    SMTP_MAX_MESSAGES_PER_CONNECTION,
+    delivery_backend_name,
+    format_club_info,
+    get_blob_store,
+    get_email_config,
+    get_store,
+    retain_background_image,
+    smtp_server,
+)
+from delivery import BACKENDS, SMTPBackend, create_backend
+from models import Club
+from schema import CLUB_TEXT_FIELDS, LEADER_FIELDS, LEADER_LIMITS, LIST_LIMITS
+from validation import validate_batch
+from smtp_pool import SMTPPool
+
+# Numbered leader columns: president_1_email, vice_president_2_chinese_name, ...
+LEADER_COLUMN = re.compile(r"^(president|vice_president)s?_?(\d+)_(.+)$")
+# Numbered list columns: requirements_1, benefits_3, ...
+LIST_COLUMN = re.compile(r"^(" + "|".join(LIST_LIMITS) + r")_?(\d+)$")
+
+
+class ImportRow:
+    """One input row after validation, formatting and image processing"""
+
+    __slots__ = ("number", "key", "club_name", "errors", "club", "subject", "body", "attachment")
+
+    def __init__(self, number, key, club_name, errors, club=None, subject=None, body=None, attachment=None):
+        self.number = number
+        self.key = key
+        self.club_name = club_name
+        self.errors = errors
+        self.club = club  # models.Club, smaller than form_data to pickle back from a worker and hold until sent
+        self.subject = subject
+        self.body = body
+        self.attachment = attachment
+
+
+def normalize_header(header):
+    """'Club Name' -> 'club_name', 'Vice-President 1 Email' -> 'vice_president_1_email'"""
+    return re.sub(r"[\s\-]+", "_", str(header or "").strip().lower())
+
+
+def normalize_date(value):
+    """Write dates the way the form does ("September 15, 2022")"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%B %d, %Y")
+    try:
+        return datetime.date.fromisoformat(value.strip()).strftime("%B %d, %Y")
+    except (AttributeError, ValueError):
+        return value
+
+
+def cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def row_to_form_data(row):
+    """Map a flat spreadsheet row ({header: cell}) onto the ``form_data`` schema.
+
+    Returns (form_data, background image path or None).
+    """
+    form_data = {key: "" for key in CLUB_TEXT_FIELDS}
+    leaders = {key: collections.defaultdict(dict) for key in LEADER_LIMITS}
+    numbered_items = {key: {} for key in LIST_LIMITS}
+    lists = {}
+    image_path = None
+
+    for header, value in row.items():
+        column = normalize_header(header)
+        if column in CLUB_TEXT_FIELDS:
+            form_data[column] = value if column == "establishment_date" and not isinstance(value, str) else cell_text(value)
+        elif column in LIST_LIMITS:
+            lists[column] = [line.strip() for line in cell_text(value).splitlines() if line.strip()]
+        elif column == "background_image":
+            image_path = cell_text(value) or None
+        elif LEADER_COLUMN.match(column):
+            role, n, field = LEADER_COLUMN.match(column).groups()
+            if field in LEADER_FIELDS:
+                leaders[role + "s"][int(n)][field] = cell_text(value)
+        elif LIST_COLUMN.match(column):
+            key, n = LIST_COLUMN.match(column).groups()
+            if cell_text(value):
+                numbered_items[key][int(n)] = cell_text(value)
+
+    form_data["establishment_date"] = normalize_date(form_data["establishment_date"])
+    for key, by_number in leaders.items():
+        # Spreadsheets carry columns for the maximum number of leaders; skip empty ones
+        form_data[key] = [
+            {field: by_number[n].get(field, "") for field in LEADER_FIELDS}
+            for n in sorted(by_number) if any(by_number[n].values())
+        ]
+    for key in LIST_LIMITS:
+        form_data[key] = lists.get(key) or [numbered_items[key][n] for n in sorted(numbered_items[key])]
+    return form_data, image_path
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f)
+
+
+def read_xlsx(path):
+    try:
+        import openpyxl
+    except ImportError:
+        raise SystemExit("Reading .xlsx files needs openpyxl: pip install openpyxl")
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = next(rows, ())
+        for values in rows:
+            yield dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(path):
+    """Yield (row number, form_data, image path) for every non-blank row of a CSV, JSONL or XLSX file"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    form_data = json.loads(line)
+                    if not isinstance(form_data, dict):
+                        raise SystemExit(f"{path}:{number}: expected a JSON object")
+                    yield number, form_data, form_data.pop("background_image", None)
+        return
+    if extension == ".csv":
+        rows = read_csv(path)
+    elif extension in (".xlsx", ".xlsm"):
+        rows = read_xlsx(path)
+    else:
+        raise SystemExit(f"Unsupported input file type '{extension}'; use .csv, .jsonl or .xlsx")
+    # Row 1 is the header
+    for number, row in enumerate(rows, 2):
+        if any(cell_text(value) for value in row.values()):
+            yield (number,) + row_to_form_data(row)
+
+
+def row_club_name(form_data):
+    """The row's club name for reports, or blank if it doesn't have a usable one"""
+    return form_data.get("club_name") if isinstance(form_data, dict) and isinstance(form_data.get("club_name"), str) else ""
+
+
+def row_key(form_data, image_path):
+    """Content hash identifying a row in the checkpoint, so edited rows are sent again"""
+    canonical = json.dumps([form_data, image_path], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def prepare_row(task):
+    """Format and process the picture of one valid row (runs in a worker process)"""
+    number, form_data, image_path, key, base_dir, spool_dir = task
+    club_name = form_data["club_name"]
+    attachment = None
+    if image_path:
+        path = os.path.join(base_dir, image_path)
+        try:
+            if os.path.getsize(path) > MAX_FILE_SIZE:
+                return ImportRow(number, key, club_name, ["File size exceeds the maximum limit of 30 MB."])
+            with open(path, "rb") as f:
+                image = transcode_image(f.read(), max_size=IMAGE_MAX_SIZE, quality=IMAGE_QUALITY, fmt=IMAGE_FORMAT)
+        except Exception as e:
+            return ImportRow(number, key, club_name, [f"Could not process the background image: {str(e)}"])
+        spool_path = os.path.join(spool_dir, f"{key}-{image.filename}")
+        with open(spool_path, "wb") as f:
+            f.write(image.data)
+        attachment = (image.filename, spool_path)
+
+    return ImportRow(
+        number, key, club_name, [],
+        club=Club.from_dict(form_data),
+        subject=f"New Club Information: {club_name}",
+        body=format_club_info(form_data),
+        attachment=attachment
+    )
+
+
+class Checkpoint:
+    """Append-only record of the row keys already sent"""
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.done = set()
+        if restart and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.done.update(line.strip() for line in f if line.strip())
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def add(self, key):
+        with self._lock:
+            self.done.add(key)
+            self._file.write(key + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class Progress:
+    """Single-line progress report on stderr"""
+
+    def __init__(self, total, stream=sys.stderr):
+        self.total = total
+        self.stream = stream
+        self.interactive = stream.isatty()
+        self.counts = collections.Counter()
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._last = 0.0
+
+    def update(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+            done = sum(self.counts.values())
+            now = time.perf_counter()
+            if done != self.total and now - self._last < (0.1 if self.interactive else 5.0):
+                return
+            self._last = now
+            elapsed = now - self.started
+            line = (f"[{done}/{self.total}] sent {self.counts['sent']}, invalid {self.counts['invalid']}, "
+                    f"failed {self.counts['failed']} ({done / elapsed if elapsed else 0:.1f} rows/s)")
+            self.stream.write(("\r" + line) if self.interactive else line + "\n")
+            if self.interactive and done == self.total:
+                self.stream.write("\n")
+            self.stream.flush()
+
+
+def send_row(backend, store, blobs, row):
+    """Email one prepared row, then save the club and its picture the way a form submission is saved"""
+    attachments = [row.attachment] if row.attachment else []
+    backend.deliver(row.subject, row.body, attachments)
+    record_data = row.club.to_dict()
+    if row.attachment:
+        with open(row.attachment[1], "rb") as f:
+            record_data["background_image"] = blobs.put(f.read())
+    current = store.current(row.club_name) or {}
+    # Delivered directly rather than through the outbox, so the job is the checkpointed row
+    store.record_club(record_data, f"bulk-import:{row.key}")
+    retain_background_image(current.get("background_image"), record_data.get("background_image"))
+
+
+def run_import(path, workers=None, concurrency=4, dry_run=False, restart=False, checkpoint_path=None,
+               smtp_host=None, smtp_port=None, backend_name=None, delivery_path=None):
+    """Import every row of ``path``, returning a summary dict
+
+    ``smtp_host`` and ``smtp_port`` override the SMTP_SERVER and SMTP_PORT secrets the app uses.
+    """
+    checkpoint = Checkpoint(checkpoint_path or path + ".checkpoint", restart=restart) if not dry_run else set()
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    tasks = []
+    skipped = 0
+    for number, form_data, image_path in read_rows(path):
+        key = row_key(form_data, image_path)
+        if key in checkpoint:
+            skipped += 1
+        else:
+            tasks.append([number, form_data, image_path, key, base_dir])
+    # Validate every row in one pass up front, so only valid rows go to the workers
+    invalid = [
+        (task[0], row_club_name(task[1]), errors)
+        for task, errors in zip(tasks, validate_batch([task[1] for task in tasks])) if errors
+    ]
+    invalid_numbers = {number for number, _, _ in invalid}
+
+    backend = store = blobs = None
+    if not dry_run:
+        backend_name = backend_name or delivery_backend_name()
+        EMAIL_USER, EMAIL_PASSWORD, RECIPIENT_EMAIL = get_email_config()
+        if backend_name == "smtp":
+            if not (EMAIL_USER and EMAIL_PASSWORD):
+                raise SystemExit("Email credentials not found. Please set EMAIL_USER and EMAIL_PASSWORD in Streamlit secrets.")
+            default_host, default_port = smtp_server()
+            pool = SMTPPool(smtp_host or default_host, smtp_port or default_port, EMAIL_USER, EMAIL_PASSWORD, size=concurrency,
+                            max_idle=SMTP_MAX_IDLE, max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION)
+            backend = SMTPBackend(pool, EMAIL_USER, RECIPIENT_EMAIL)
+        else:
+            backend = create_backend(
+                backend_name, EMAIL_USER, RECIPIENT_EMAIL, path=delivery_path or DELIVERY_PATHS.get(backend_name),
+                batch_size=DELIVERY_FSYNC_BATCH, batch_interval=DELIVERY_FSYNC_INTERVAL
+            )
+        store = get_store()
+        blobs = get_blob_store()
+
+    progress = Progress(len(tasks))
+    errors = collections.Counter()
+    problems = []
+    for number, name, row_errors in invalid:
+        errors.update(row_errors)
+        problems.append((number, name, row_errors))
+        progress.update("invalid")
+    valid_tasks = [task for task in tasks if task[0] not in invalid_numbers]
+    # Bounds prepared rows waiting for an SMTP session so large files don't pile up in memory
+    in_flight = threading.BoundedSemaphore(concurrency * 4)
+
+    def on_sent(row, future):
+        in_flight.release()
+        error = future.exception()
+        if error is None:
+            checkpoint.add(row.key)
+            progress.update("sent")
+        else:
+            errors[type(error).__name__ + ": " + str(error)] += 1
+            problems.append((row.number, row.club_name, [f"Sending failed: {error}"]))
+            progress.update("failed")
+
+    with tempfile.TemporaryDirectory(prefix="bulk-import-") as spool_dir, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=workers) as processes, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as senders:
+        chunksize = max(1, len(valid_tasks) // ((workers or os.cpu_count() or 1) * 8))
+        for row in processes.map(prepare_row, [task + [spool_dir] for task in valid_tasks], chunksize=chunksize):
+            if row.errors:
+                errors.update(row.errors)
+                problems.append((row.number, row.club_name, row.errors))
+                progress.update("invalid")
+            elif dry_run:
+                progress.update("sent")
+            else:
+                in_flight.acquire()
+                future = senders.submit(send_row, backend, store, blobs, row)
+                future.add_done_callback(lambda future, row=row: on_sent(row, future))
+        senders.shutdown(wait=True)
+
+    if backend is not None:
+        backend.close()
+    if not dry_run:
+        checkpoint.close()
+
+    elapsed = time.perf_counter() - progress.started
+    return {
+        "rows": len(tasks) + skipped,
+        "skipped": skipped,
+        "sent": progress.counts["sent"],
+        "invalid": progress.counts["invalid"],
+        "failed": progress.counts["failed"],
+        "seconds": elapsed,
+        "rows_per_second": len(tasks) / elapsed if elapsed else 0.0,
+        "errors": errors,
+        "problems": sorted(problems),
+        "dry_run": dry_run,
+    }
+
+
+def print_summary(summary):
+    for number, club_name, row_errors in summary["problems"]:
+        for error in row_errors:
+            print(f"row {number} ({club_name or 'unnamed'}): {error}")
+    if summary["problems"]:
+        print()
+
+    verb = "valid" if summary["dry_run"] else "sent"
+    print(f"{summary['rows']} rows: {summary['sent']} {verb}, {summary['invalid']} invalid, "
+          f"{summary['failed']} failed, {summary['skipped']} already sent")
+    print(f"{summary['seconds']:.2f}s, {summary['rows_per_second']:.1f} rows/s")
+    if summary["errors"]:
+        print("Errors:")
+        for error, count in summary["errors"].most_common():
+            print(f"  {count:>4}  {error}")
+    if summary["failed"]:
+        print("Re-run the same command to retry the rows that failed.")
+
+
+def template_header():
+    """CSV header with every column the importer understands, for the maximum number of leaders and items"""
+    columns = list(CLUB_TEXT_FIELDS)
+    for key, (min_count, max_count) in LEADER_LIMITS.items():
+        columns += [f"{key[:-1]}_{n}_{field}" for n in range(1, max_count + 1) for field in LEADER_FIELDS]
+    columns += list(LIST_LIMITS)
+    columns.append("background_image")
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import new clubs in bulk from a CSV, JSONL or XLSX file")
+    parser.add_argument("input", nargs="?", help="spreadsheet of clubs")
+    parser.add_argument("--dry-run", action="store_true", help="validate and format every row without sending")
+    parser.add_argument("--workers", type=int, help="processes for validation, formatting and pictures (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=4, help="rows sent at once (SMTP sessions with the smtp backend)")
+    parser.add_argument("--checkpoint", help="file recording sent rows (default: <input>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and send every row again")
+    parser.add_argument("--smtp-host", help="mail server (default: the SMTP_SERVER secret, as in the app)")
+    parser.add_argument("--smtp-port", type=int, help="mail server port (default: the SMTP_PORT secret, as in the app)")
+    parser.add_argument("--backend", choices=BACKENDS, help="delivery backend (default: the DELIVERY_BACKEND secret, else smtp)")
+    parser.add_argument("--delivery-path", help="Maildir or JSONL file for those backends")
+    parser.add_argument("--template", action="store_true", help="print a CSV header to fill in and exit")
+    args = parser.parse_args()
+
+    if args.template:
+        csv.writer(sys.stdout).writerow(template_header())
+        return
+    if not args.input:
+        parser.error("an input file is required")
+
+    summary = run_import(
+        args.input, workers=args.workers, concurrency=args.concurrency, dry_run=args.dry_run,
+        restart=args.restart, checkpoint_path=args.checkpoint, smtp_host=args.smtp_host, smtp_port=args.smtp_port,
+        backend_name=args.backend, delivery_path=args.delivery_path
+    )
+    print_summary(summary)
+    sys.exit(1 if summary["invalid"] or summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Static club catalog built from the submission store.
+
+Writes one HTML page and one JSON file per club, a page per category, an
+index page and ``catalog.json`` listing every club, plus the clubs' processed
+background pictures, into a directory any web server can serve:
+
+    index.html  catalog.json  style.css
+    clubs/<club id>.html  clubs/<club id>.json
+    categories/<category>.html
+    images/<picture SHA-256>.jpg
+
+Rebuilds are incremental. ``.manifest.json`` records a content hash for every
+page written, so a rebuild only rewrites the clubs, category pages and index
+whose content changed, and removes what no club needs any more. Every file is
+written under a temporary name and renamed into place, so a reader never
+sees a half-written page. Set the ``CATALOG_PATH`` secret to have the app
+refresh the catalog after every stored submission, or build it by hand:
+
+    python catalog.py site/
+"""
+import argparse
+import contextlib
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+
+from models import Club
+from renderer import get_renderer
+from schema import CLUB_CATEGORIES
+
+# Bump when the page templates change, so the next rebuild rewrites everything
+CATALOG_VERSION = 1
+MANIFEST = ".manifest.json"
+
+STYLE = """body { font-family: system-ui, sans-serif; max-width: 48rem; margin: 2rem auto; padding: 0 1rem; line-height: 1.5; }
+nav { font-size: 0.9rem; margin-bottom: 1rem; }
+.cover { width: 100%; max-height: 20rem; object-fit: cover; border-radius: 0.5rem; }
+ul.clubs { list-style: none; padding: 0; }
+ul.clubs li { margin: 0.25rem 0; }
+"""
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="stylesheet" href="{root}style.css">
+</head>
+<body>
+{body}</body>
+</html>
+"""
+
+
+def slug(text):
+    """File name for a category: lower case, runs of anything but letters and digits as "-" """
+    return re.sub(r"[^a-z0-9]+", "-", text.casefold()).strip("-") or "uncategorized"
+
+
+def _image_name(digest, data):
+    return f"{digest}.webp" if data[:4] == b"RIFF" and data[8:12] == b"WEBP" else f"{digest}.jpg"
+
+
+def _hash(*parts):
+    return hashlib.sha256(json.dumps([CATALOG_VERSION, *parts], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def write_atomic(path, data):
+    """Write ``data`` (bytes or str) to ``path`` via a temporary file and a rename"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_path)
+        raise
+
+
+def _title(club):
+    return f"{club.emoji} {club.name}".strip()
+
+
+class CatalogExporter:
+    """Builds the static catalog in ``path`` from club records, rewriting only what changed.
+
+    ``blobs`` is the ``BlobStore`` holding the processed background pictures;
+    without it, or if a picture has been evicted, the page goes without one.
+    ``export`` runs a rebuild; ``refresh_in_background`` runs one in a thread,
+    folding requests that arrive meanwhile into one more rebuild.
+    """
+
+    def __init__(self, path, blobs=None):
+        self.path = path
+        self.blobs = blobs
+        self.last_export = None  # stats of the last export
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._dirty = False
+        self._thread = None
+        for directory in ("clubs", "categories", "images"):
+            os.makedirs(os.path.join(path, directory), exist_ok=True)
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.path, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return manifest if manifest.get("version") == CATALOG_VERSION else {}
+
+    def _write(self, relative_path, content, content_hash, old_pages, pages, stats):
+        """Write a page unless the manifest says it already holds this content"""
+        pages[relative_path] = content_hash
+        if old_pages.get(relative_path) == content_hash and os.path.exists(os.path.join(self.path, relative_path)):
+            return
+        write_atomic(os.path.join(self.path, relative_path), content() if callable(content) else content)
+        stats["written"] += 1
+
+    def _image(self, digest, images, old_images, stats):
+        """Relative path of a club's picture in the catalog, copying it out of the blob store if needed"""
+        if not digest:
+            return None
+        if digest in images:
+            return f"images/{images[digest]}"
+        name = old_images.get(digest)
+        if name and os.path.exists(os.path.join(self.path, "images", name)):
+            images[digest] = name
+            return f"images/{name}"
+        data = self.blobs.get(digest) if self.blobs is not None else None
+        if data is None:
+            return None
+        name = _image_name(digest, data)
+        write_atomic(os.path.join(self.path, "images", name), data)
+        images[digest] = name
+        stats["images"] += 1
+        return f"images/{name}"
+
+    def _club_page(self, club_id, club, category, image):
+        nav = (f'<nav><a href="../index.html">All clubs</a> · '
+               f'<a href="../categories/{slug(category)}.html">{html.escape(category)}</a></nav>\n')
+        cover = f'<img class="cover" src="../{image}" alt="">\n' if image else ""
+        body = nav + cover + get_renderer("html").club_info(club.to_dict())
+        return PAGE.format(title=html.escape(_title(club)), root="../", body=body)
+
+    def _club_json(self, club_id, club, image):
+        data = club.to_dict()
+        data.pop("background_image", None)
+        return json.dumps({"id": club_id, **data, "background_image": image}, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def _club_list(entries, root):
+        items = "".join(
+            f'<li><a href="{root}clubs/{club_id}.html">{html.escape(title)}</a></li>\n' for club_id, title in entries
+        )
+        return f'<ul class="clubs">\n{items}</ul>\n'
+
+    def _category_page(self, category, entries):
+        body = (f'<nav><a href="../index.html">All clubs</a></nav>\n<h1>{html.escape(category)}</h1>\n'
+                + self._club_list(entries, "../"))
+        return PAGE.format(title=html.escape(category), root="../", body=body)
+
+    def _index_page(self, categories):
+        parts = ["<h1>Clubs</h1>\n"]
+        for category, entries in categories:
+            parts.append(f'<h2><a href="categories/{slug(category)}.html">{html.escape(category)}</a> '
+                         f'({len(entries)})</h2>\n')
+            parts.append(self._club_list(entries, ""))
+        return PAGE.format(title="Clubs", root="", body="".join(parts))
+
+    def export(self, records):
+        """Bring the catalog up to date with ``records`` (club records as ``SubmissionStore.records`` yields them).
+
+        Returns counts of clubs, files written, pictures copied and files removed.
+        """
+        with self._export_lock:
+            began = time.perf_counter()
+            manifest = self._load_manifest()
+            old_pages, old_images = manifest.get("pages", {}), manifest.get("images", {})
+            pages, images = {}, {}
+            stats = {"clubs": 0, "written": 0, "images": 0, "removed": 0}
+
+            by_category, summaries = {}, []
+            for record in records:
+                club_id = record["id"]
+                club = Club.from_dict(record["data"])
+                category = club.category or "Uncategorized"
+                image = self._image(club.background_image, images, old_images, stats)
+                content_hash = _hash(club_id, club.pack(), category, image)
+                self._write(f"clubs/{club_id}.html", lambda: self._club_page(club_id, club, category, image),
+                            content_hash, old_pages, pages, stats)
+                self._write(f"clubs/{club_id}.json", lambda: self._club_json(club_id, club, image),
+                            content_hash, old_pages, pages, stats)
+                by_category.setdefault(category, []).append((club_id, _title(club)))
+                summaries.append({"id": club_id, "name": club.name, "emoji": club.emoji, "category": category,
+                                  "url": f"clubs/{club_id}.html", "data": f"clubs/{club_id}.json",
+                                  "background_image": image, "hash": content_hash})
+                stats["clubs"] += 1
+
+            order = {category: n for n, category in enumerate(CLUB_CATEGORIES)}
+            categories = sorted(by_category.items(), key=lambda item: (order.get(item[0], len(order)), item[0]))
+            for category, entries in categories:
+                entries.sort(key=lambda entry: entry[1].casefold())
+                self._write(f"categories/{slug(category)}.html", lambda: self._category_page(category, entries),
+                            _hash(category, entries), old_pages, pages, stats)
+            self._write("index.html", lambda: self._index_page(categories), _hash(categories), old_pages, pages, stats)
+            summaries.sort(key=lambda summary: summary["id"])
+            self._write("catalog.json", lambda: json.dumps(summaries, ensure_ascii=False, indent=2),
+                        _hash(summaries), old_pages, pages, stats)
+            self._write("style.css", STYLE, _hash(STYLE), old_pages, pages, stats)
+
+            # Remove pages and pictures no club needs any more
+            stale = [path for path in old_pages if path not in pages]
+            stale += [f"images/{name}" for digest, name in old_images.items() if digest not in images]
+            for relative_path in stale:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.path, relative_path))
+                    stats["removed"] += 1
+
+            write_atomic(os.path.join(self.path, MANIFEST), json.dumps(
+                {"version": CATALOG_VERSION, "pages": pages, "images": images}, ensure_ascii=False
+            ))
+            stats["seconds"] = time.perf_counter() - began
+            self.last_export = stats
+            return stats
+
+    def refresh_in_background(self, load_records):
+        """Export ``load_records()`` in a thread; calls made while one runs trigger a single rerun after it"""
+        with self._lock:
+            self._dirty = True
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._refresh, args=(load_records,), name="catalog-export",
+                                            daemon=True)
+            self._thread.start()
+
+    def _refresh(self, load_records):
+        while True:
+            with self._lock:
+                if not self._dirty:
+                    self._thread = None
+                    return
+                self._dirty = False
+            try:
+                self.export(load_records())
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="catalog directory (created if missing)")
+    args = parser.parse_args()
+
+    from main import get_blob_store, get_store
+    stats = CatalogExporter(args.output, blobs=get_blob_store()).export(get_store().records())
+    print(f"{stats['clubs']} clubs: {stats['written']} files written, {stats['images']} pictures copied, "
+          f"{stats['removed']} removed in {stats['seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
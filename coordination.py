@@ -0,0 +1,273 @@
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class _Database:
+    """A SQLite file shared by every process on the host, one connection per thread"""
+
+    def __init__(self, path, schema):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(schema)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Yield this thread's connection, kept open so each call skips connect and WAL checkpoint costs"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Yield a connection inside a write transaction, so processes take turns"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+
+
+class Lease(_Database):
+    """A named lease that at most one process holds at a time, e.g. to elect a single delivery worker.
+
+    The holder calls ``acquire`` every ``ttl / 3`` seconds or so to keep it;
+    if it stops (it crashed, or is stuck), the lease lapses after ``ttl``
+    seconds and the next process to call ``acquire`` takes over.
+    ``on_acquire(conn)`` runs in the same transaction whenever this process
+    takes the lease, which is the place to reclaim work the last holder left
+    unfinished.
+    """
+
+    def __init__(self, path, name, ttl=15.0, on_acquire=None):
+        super().__init__(path, """
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+        self.name = name
+        self.ttl = ttl
+        self.on_acquire = on_acquire
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._held_until = 0.0
+
+    def acquire(self):
+        """Take the lease if it is free or has lapsed, or renew it if it is ours; return whether we hold it"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)).fetchone()
+            if row is not None and row["holder"] != self.holder and row["expires_at"] > now:
+                self._held_until = 0.0
+                return False
+            conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at",
+                (self.name, self.holder, now + self.ttl)
+            )
+            if (row is None or row["holder"] != self.holder) and self.on_acquire is not None:
+                self.on_acquire(conn)
+        self._held_until = now + self.ttl
+        return True
+
+    def held(self):
+        """Whether this process held the lease at its last ``acquire`` and it hasn't lapsed since"""
+        return time.time() < self._held_until
+
+    def holds(self, conn):
+        """Check the lease inside a transaction of the caller's on the same database file"""
+        return conn.execute(
+            "SELECT 1 FROM leases WHERE name = ? AND holder = ? AND expires_at > ?",
+            (self.name, self.holder, time.time())
+        ).fetchone() is not None
+
+    def owner(self):
+        """The current holder's id, or None if the lease is free or has lapsed"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT holder FROM leases WHERE name = ? AND expires_at > ?", (self.name, time.time())
+            ).fetchone()
+        return row["holder"] if row else None
+
+    def release(self):
+        """Give the lease up so another process can take it straight away"""
+        self._held_until = 0.0
+        with contextlib.suppress(sqlite3.Error):
+            with self._connect() as conn:
+                conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+
+
+class SharedRateLimiter(_Database):
+    """``ratelimit.RateLimiter`` with its buckets in a SQLite file, so every process on the host shares them.
+
+    Each ``acquire`` is one short write transaction. Buckets that have
+    refilled completely are deleted now and then, since a missing bucket is
+    a full one.
+    """
+
+    PRUNE_EVERY = 1000  # acquires between clean-ups of refilled buckets
+
+    def __init__(self, path, name, burst, interval):
+        super().__init__(path, """
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                limiter TEXT NOT NULL,
+                key TEXT NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (limiter, key)
+            );
+            CREATE INDEX IF NOT EXISTS rate_buckets_updated ON rate_buckets (limiter, updated_at);
+        """)
+        self.name = name
+        self.burst = burst
+        self.interval = interval
+        self._acquires = 0
+
+    def _tokens(self, conn, key, now):
+        row = conn.execute(
+            "SELECT tokens, updated_at FROM rate_buckets WHERE limiter = ? AND key = ?", (self.name, str(key))
+        ).fetchone()
+        if row is None:
+            return self.burst
+        return min(self.burst, row["tokens"] + max(0.0, now - row["updated_at"]) / self.interval)
+
+    def _save(self, conn, key, tokens, now):
+        conn.execute(
+            "INSERT INTO rate_buckets (limiter, key, tokens, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (limiter, key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+            (self.name, str(key), tokens, now)
+        )
+
+    def acquire(self, key, cost=1):
+        """Take ``cost`` tokens from ``key``'s bucket; return 0 on success, else the seconds until there are enough"""
+        now = time.time()
+        self._acquires += 1
+        with self._transaction() as conn:
+            if self._acquires % self.PRUNE_EVERY == 0:
+                conn.execute(
+                    "DELETE FROM rate_buckets WHERE limiter = ? AND updated_at < ?",
+                    (self.name, now - self.burst * self.interval)
+                )
+            tokens = self._tokens(conn, key, now)
+            if tokens < cost:
+                return (cost - tokens) * self.interval
+            self._save(conn, key, tokens - cost, now)
+        return 0
+
+    def refund(self, key, cost=1):
+        """Give back tokens taken by ``acquire`` for a request that was turned away later"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._save(conn, key, min(self.burst, self._tokens(conn, key, now) + cost), now)
+
+
+class SharedIdempotencyCache(_Database):
+    """``idempotency.IdempotencyCache`` with its entries in a SQLite file, so a repeat sent to another process is caught too.
+
+    Results must be JSON values (lists come back as tuples). While the first
+    submission of a fingerprint runs, its row holds no result; a repeat in any
+    process polls until the result is there, and runs on its own if the first
+    fails or its process dies (the placeholder lapses after ``pending_timeout``).
+    """
+
+    PRUNE_EVERY = 100  # kept results between clean-ups
+
+    def __init__(self, path, ttl, max_entries=10000, pending_timeout=60.0, poll_interval=0.1):
+        super().__init__(path, """
+            CREATE TABLE IF NOT EXISTS idempotency (
+                key TEXT PRIMARY KEY,
+                result TEXT,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idempotency_expiry ON idempotency (expires_at);
+        """)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.pending_timeout = pending_timeout
+        self.poll_interval = poll_interval
+        self.hits = 0
+        self.misses = 0
+        self._kept = 0
+
+    @staticmethod
+    def _decode(text):
+        result = json.loads(text)
+        return tuple(result) if isinstance(result, list) else result
+
+    def get(self, key):
+        """The kept result for ``key``, or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM idempotency WHERE key = ? AND result IS NOT NULL AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return self._decode(row["result"]) if row else None
+
+    def run(self, key, submit, keep=lambda result: True):
+        """Return (result, repeated): a kept result for ``key``, or ``submit()``'s, which is kept if ``keep(result)``"""
+        while True:
+            now = time.time()
+            with self._transaction() as conn:
+                row = conn.execute("SELECT result, expires_at FROM idempotency WHERE key = ?", (key,)).fetchone()
+                if row is not None and row["expires_at"] > now and row["result"] is not None:
+                    self.hits += 1
+                    return self._decode(row["result"]), True
+                if row is None or row["expires_at"] <= now:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO idempotency (key, result, expires_at) VALUES (?, NULL, ?)",
+                        (key, now + self.pending_timeout)
+                    )
+                    self.misses += 1
+                    break
+            # Another thread or process is processing the same submission
+            time.sleep(self.poll_interval)
+        try:
+            result = submit()
+        except BaseException:
+            self._forget(key)
+            raise
+        if not keep(result):
+            self._forget(key)
+            return result, False
+        now = time.time()
+        self._kept += 1
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE idempotency SET result = ?, expires_at = ? WHERE key = ?",
+                (json.dumps(result, ensure_ascii=False), now + self.ttl, key)
+            )
+            if self._kept % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+                conn.execute(
+                    "DELETE FROM idempotency WHERE key IN "
+                    "(SELECT key FROM idempotency ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        return result, False
+
+    def _forget(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM idempotency WHERE key = ? AND result IS NULL", (key,))
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute(
+                "SELECT COUNT(*) FROM idempotency WHERE result IS NOT NULL AND expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+
+from mime_stream import iter_message, send_streamed
+
+# Backends selectable with the DELIVERY_BACKEND secret
+BACKENDS = ("smtp", "maildir", "jsonl", "null")
+
+
+class SMTPBackend:
+    """Streams each message to the mail server over a pooled SMTP session"""
+
+    def __init__(self, pool, sender, recipient):
+        self.pool = pool
+        self.sender = sender
+        self.recipient = recipient
+
+    def deliver(self, subject, body, attachments=()):
+        self.pool.run(lambda server: send_streamed(
+            server,
+            self.sender,
+            [self.recipient],
+            iter_message(self.sender, self.recipient, subject, body, attachments)
+        ))
+
+    def stats(self):
+        return self.pool.stats()
+
+    def close(self):
+        self.pool.close()
+
+
+class _BatchedSync:
+    """fsync bookkeeping shared by the file backends.
+
+    Written files are made durable in groups: once ``batch_size`` messages are
+    waiting, or ``batch_interval`` seconds after the first of them, everything
+    waiting is fsynced at once. Until then a power failure can lose the newest messages,
+    which the outbox has already marked as sent; ``batch_size=1`` syncs every
+    message before ``deliver`` returns.
+    """
+
+    def __init__(self, batch_size, batch_interval):
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._lock = threading.Lock()
+        self._unsynced = {}  # path -> None, in write order
+        self._pending = 0    # messages written since the last sync
+        self._timer = None
+        self._counters = {"messages": 0, "bytes": 0, "syncs": 0}
+
+    def _written(self, paths, size):
+        """Record a message's written files; sync the batch if it is full, else make sure a timer will"""
+        with self._lock:
+            self._counters["messages"] += 1
+            self._counters["bytes"] += size
+            self._unsynced.update(dict.fromkeys(paths))
+            self._pending += 1
+            if self._pending < self.batch_size:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.batch_interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def _sync_paths(self, paths):
+        for path in paths:
+            with open(path, "rb") as f:
+                os.fsync(f.fileno())
+
+    def flush(self):
+        """fsync everything written so far"""
+        with self._lock:
+            paths, self._unsynced, self._pending = list(self._unsynced), {}, 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if paths:
+                self._counters["syncs"] += 1
+        # Outside the lock, so writers carry on with the next batch meanwhile
+        if paths:
+            self._sync_paths(paths)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["unsynced"] = self._pending
+        return stats
+
+    def close(self):
+        self.flush()
+
+
+def _sync_directory(path):
+    """Make renames and new files in a directory durable (not possible on Windows, where it isn't needed)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class MaildirBackend(_BatchedSync):
+    """Writes each message as an ``.eml`` file into a Maildir, for local delivery or inspection.
+
+    Messages are written to ``tmp/`` and renamed into ``new/``, so a mail
+    client or downstream job reading ``new/`` never sees a partial file.
+    """
+
+    def __init__(self, path, sender, recipient, batch_size=32, batch_interval=1.0):
+        super().__init__(batch_size, batch_interval)
+        self.path = path
+        self.sender = sender
+        self.recipient = recipient
+        self._host = socket.gethostname().replace("/", "_").replace(":", "_")
+        for sub in ("tmp", "new", "cur"):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+
+    def deliver(self, subject, body, attachments=()):
+        name = f"{time.time():.6f}.{uuid.uuid4().hex}.{self._host}.eml"
+        tmp_path = os.path.join(self.path, "tmp", name)
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for chunk in iter_message(self.sender, self.recipient, subject, body, attachments):
+                f.write(chunk)
+                size += len(chunk)
+        new_path = os.path.join(self.path, "new", name)
+        os.replace(tmp_path, new_path)
+        self._written([new_path], size)
+
+    def _sync_paths(self, paths):
+        super()._sync_paths(paths)
+        _sync_directory(os.path.join(self.path, "new"))
+
+
+class JSONLBackend(_BatchedSync):
+    """Appends one JSON object per message to a file, for downstream ingestion instead of email.
+
+    Each line holds the sender, recipient, subject and body. Attachments are
+    copied next to the file into ``<path>.attachments/``, named by SHA-256, and
+    referenced by path, so repeated pictures are stored once and lines stay small.
+    """
+
+    def __init__(self, path, sender, recipient, batch_size=32, batch_interval=1.0):
+        super().__init__(batch_size, batch_interval)
+        self.path = path
+        self.attachment_dir = path + ".attachments"
+        self.sender = sender
+        self.recipient = recipient
+        os.makedirs(self.attachment_dir, exist_ok=True)
+        self._file = open(path, "ab")
+        self._write_lock = threading.Lock()
+
+    def _store_attachment(self, filename, spool_path):
+        sha256 = hashlib.sha256()
+        with open(spool_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+        path = os.path.join(self.attachment_dir, digest + os.path.splitext(filename)[1].lower())
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(spool_path, tmp_path)
+            os.replace(tmp_path, path)
+        mime_type, _ = mimetypes.guess_type(filename)
+        return path, {
+            "filename": filename,
+            "content_type": mime_type or "application/octet-stream",
+            "size": os.path.getsize(path),
+            "sha256": digest,
+            "path": path,
+        }
+
+    def deliver(self, subject, body, attachments=()):
+        stored = [self._store_attachment(filename, spool_path) for filename, spool_path in attachments]
+        line = json.dumps({
+            "id": uuid.uuid4().hex,
+            "delivered_at": time.time(),
+            "from": self.sender,
+            "to": self.recipient,
+            "subject": subject,
+            "body": body,
+            "attachments": [info for _, info in stored],
+        }, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._write_lock:
+            self._file.write(line)
+            self._file.flush()
+        self._written([path for path, _ in stored] + [self.path], len(line))
+
+    def _sync_paths(self, paths):
+        super()._sync_paths(paths)
+        _sync_directory(self.attachment_dir)
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class NullBackend:
+    """Accepts every message and throws it away, counting them; for tests and benchmarks without network I/O"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"messages": 0, "bytes": 0}
+
+    def deliver(self, subject, body, attachments=()):
+        size = len(subject.encode("utf-8")) + len(body.encode("utf-8"))
+        size += sum(os.path.getsize(path) for _, path in attachments)
+        with self._lock:
+            self._counters["messages"] += 1
+            self._counters["bytes"] += size
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def close(self):
+        pass
+
+
+def create_backend(name, sender, recipient, path=None, smtp_pool=None, batch_size=32, batch_interval=1.0):
+    """Build the backend called ``name``; ``path`` is the Maildir or JSONL file, ``smtp_pool`` the SMTPPool"""
+    if name == "smtp":
+        return SMTPBackend(smtp_pool, sender, recipient)
+    if name == "maildir":
+        return MaildirBackend(path, sender, recipient, batch_size, batch_interval)
+    if name == "jsonl":
+        return JSONLBackend(path, sender, recipient, batch_size, batch_interval)
+    if name == "null":
+        return NullBackend()
+    raise ValueError(f"Unknown delivery backend {name!r}; choose one of {', '.join(BACKENDS)}")
@@ -0,0 +1,123 @@
+import datetime
+import difflib
+
+# Keys of a club record that hold lists of leaders
+LEADER_ROLES = ("presidents", "vice_presidents")
+
+
+def _clean_list(key, items):
+    """Drop blank items, or leaders with every field blank, from a list section"""
+    if key in LEADER_ROLES:
+        return [
+            {k: v.strip() if isinstance(v, str) else v for k, v in leader.items()}
+            for leader in items
+            if any(str(v).strip() for v in leader.values())
+        ]
+    return [item.strip() for item in items if str(item).strip()]
+
+
+def clean_update(update_data):
+    """Drop the parts of an update request that the form treats as "leave unchanged".
+
+    Blank text fields, blank list items, leaders with every field blank and
+    lists left with nothing in them are removed, and dates are written the way
+    the new-club form writes them.
+    """
+    cleaned = {}
+    for key, value in update_data.items():
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            value = value.strftime("%B %d, %Y")
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, list):
+            value = _clean_list(key, value)
+        if value:
+            cleaned[key] = value
+    return cleaned
+
+
+def leader_key(leader):
+    """Identity of a leader across submissions: Chinese name, else English name, else email"""
+    for field in ("chinese_name", "english_name", "email"):
+        value = str(leader.get(field) or "").strip().casefold()
+        if value:
+            return field, value
+    return None
+
+
+def _diff_sequence(old, new, key=None):
+    """Positional differences between two lists: (removed [[old index, item]], added [[new index, item]], kept pairs)"""
+    old_keys = [key(item) for item in old] if key else old
+    new_keys = [key(item) for item in new] if key else new
+    removed, added, kept = [], [], []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False).get_opcodes():
+        if tag == "equal":
+            kept.extend(zip(range(i1, i2), range(j1, j2)))
+        else:
+            removed.extend([i, old[i]] for i in range(i1, i2))
+            added.extend([j, new[j]] for j in range(j1, j2))
+    return removed, added, kept
+
+
+def diff_update(current, update_data):
+    """Compare an update request with the club's current record and return only what changed.
+
+    The delta maps each changed key to:
+
+    - ``{"old": ..., "new": ...}`` for text fields,
+    - ``{"removed": [[i, item]], "added": [[j, item]]}`` for lists, with
+      indexes into the old and new lists,
+    - the same for leader lists, plus ``"changed": [[j, {field: {"old", "new"}}]]``
+      for leaders (matched by name) whose details changed.
+
+    Keys whose value is the same as the stored one are left out, so an empty
+    delta means the update changes nothing.
+    """
+    current = current or {}
+    delta = {}
+    for key, new in clean_update(update_data).items():
+        if key == "background_image":
+            continue
+        old = current.get(key)
+        if isinstance(new, list):
+            # Stored new-club records keep the form's blank boxes; indexes skip them
+            old = _clean_list(key, old) if isinstance(old, list) else []
+            if key in LEADER_ROLES:
+                removed, added, kept = _diff_sequence(old, new, key=leader_key)
+                changed = []
+                for i, j in kept:
+                    # A blank field keeps the stored value, like blank text fields
+                    fields = {
+                        field: {"old": old[i].get(field), "new": value}
+                        for field, value in new[j].items() if value and old[i].get(field) != value
+                    }
+                    if fields:
+                        changed.append([j, fields])
+                change = {"removed": removed, "added": added, "changed": changed}
+            else:
+                removed, added, _ = _diff_sequence(old, new)
+                change = {"removed": removed, "added": added}
+            change = {k: v for k, v in change.items() if v}
+            if change:
+                delta[key] = change
+        elif new != old:
+            delta[key] = {"old": old, "new": new}
+    return delta
+
+
+def apply_delta(current, delta):
+    """Return a copy of a club record with a delta from ``diff_update`` applied"""
+    record = dict(current or {})
+    for key, change in delta.items():
+        if "new" in change:
+            record[key] = change["new"]
+            continue
+        items = _clean_list(key, record.get(key) or [])
+        removed = {i for i, _ in change.get("removed", ())}
+        items = [item for i, item in enumerate(items) if i not in removed]
+        for j, item in sorted(change.get("added", ()), key=lambda pair: pair[0]):
+            items.insert(j, item)
+        for j, fields in change.get("changed", ()):
+            items[j].update({field: values["new"] for field, values in fields.items()})
+        record[key] = items
+    return record
@@ -0,0 +1,209 @@
+import contextlib
+import datetime
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+STATUS_BATCHED = "batched"
+
+logger = logging.getLogger(__name__)
+
+
+class DigestCollector:
+    """Batches submissions into one combined email per time window or item count.
+
+    ``add`` records a submission and returns immediately. A background thread
+    flushes the batch to the outbox as a single message once the oldest pending
+    item is ``window`` seconds old or ``max_items`` have piled up. Attachments
+    are stored by SHA-256, so a picture submitted several times in one window is
+    attached only once.
+    """
+
+    def __init__(self, path, outbox, window=900.0, max_items=50, poll_interval=5.0):
+        self.path = path
+        self.spool_dir = path + ".spool"
+        self.outbox = outbox
+        self.window = window
+        self.max_items = max_items
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._local = threading.local()
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS digest_items (
+                    id TEXT PRIMARY KEY,
+                    subject TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    attachment_name TEXT,
+                    attachment_hash TEXT,
+                    created_at REAL NOT NULL,
+                    job_id TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS digest_pending ON digest_items (job_id, created_at)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Yield this thread's connection, kept open so each call skips connect and WAL checkpoint costs"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def _spool_path(self, digest, filename):
+        return os.path.join(self.spool_dir, digest + os.path.splitext(filename)[1])
+
+    def add(self, subject, body, attachments=None):
+        """Record a submission for the next digest and return its item id"""
+        item_id = uuid.uuid4().hex
+        attachment_name = attachment_hash = None
+        for filename, data in (attachments or [])[:1]:
+            attachment_name = filename
+            attachment_hash = hashlib.sha256(data).hexdigest()
+
+        # Write inside the transaction so a concurrent flush, here or in another process, can't
+        # delete a spool file this item reuses
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if attachment_hash:
+                spool_path = self._spool_path(attachment_hash, attachment_name)
+                if not os.path.exists(spool_path):
+                    with open(spool_path, "wb") as f:
+                        f.write(data)
+            conn.execute(
+                "INSERT INTO digest_items (id, subject, body, attachment_name, attachment_hash, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (item_id, subject, body, attachment_name, attachment_hash, time.time())
+            )
+            pending = conn.execute("SELECT COUNT(*) FROM digest_items WHERE job_id IS NULL").fetchone()[0]
+            conn.execute("COMMIT")
+        if pending >= self.max_items:
+            self._wakeup.set()
+        return item_id
+
+    def status(self, item_id):
+        """Return the item's status: batched until flushed, then its outbox job status"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM digest_items WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            return None
+        if row["job_id"] is None:
+            return {"id": item_id, "status": STATUS_BATCHED, "attempts": 0, "last_error": None}
+        return self.outbox.status(row["job_id"])
+
+    def _render(self, rows):
+        """Combine pending items into one body with a table of contents"""
+        attachment_names = {}
+        for row in rows:
+            if row["attachment_hash"] and row["attachment_hash"] not in attachment_names:
+                stem, extension = os.path.splitext(row["attachment_name"])
+                attachment_names[row["attachment_hash"]] = f"{stem}-{row['attachment_hash'][:8]}{extension}"
+
+        first = datetime.datetime.fromtimestamp(rows[0]["created_at"]).strftime("%Y-%m-%d %H:%M")
+        last = datetime.datetime.fromtimestamp(rows[-1]["created_at"]).strftime("%Y-%m-%d %H:%M")
+        parts = [
+            "CLUB SUBMISSIONS DIGEST\n",
+            f"{len(rows)} submissions received between {first} and {last}\n",
+            "\nCONTENTS\n",
+        ]
+        parts.extend(f"{i+1}. {row['subject']}\n" for i, row in enumerate(rows))
+
+        for i, row in enumerate(rows):
+            received = datetime.datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            parts.append(f"\n{'=' * 60}\n{i+1}. {row['subject']}\nReceived: {received}\n")
+            if row["attachment_hash"]:
+                parts.append(f"Background Image: {attachment_names[row['attachment_hash']]}\n")
+            parts.append(f"{'=' * 60}\n")
+            parts.append(row["body"])
+
+        attachments = [
+            (name, self._spool_path(digest, name)) for digest, name in attachment_names.items()
+        ]
+        return "".join(parts), attachments
+
+    def flush(self):
+        """Send every pending item as one digest email and return the outbox job id"""
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT * FROM digest_items WHERE job_id IS NULL ORDER BY created_at"
+            ).fetchall()
+            if not rows:
+                conn.execute("COMMIT")
+                return None
+
+            body, attachments = self._render(rows)
+            files = []
+            for filename, spool_path in attachments:
+                with open(spool_path, "rb") as f:
+                    files.append((filename, f.read()))
+            subject = f"Club Submissions Digest: {len(rows)} submissions"
+            job_id = self.outbox.enqueue(subject, body, files)
+
+            conn.executemany(
+                "UPDATE digest_items SET job_id = ? WHERE id = ?",
+                [(job_id, row["id"]) for row in rows]
+            )
+            conn.execute("COMMIT")
+
+        # The outbox now holds its own copy of every attachment; keep any an item added since still uses
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for _, spool_path in attachments:
+                digest = os.path.splitext(os.path.basename(spool_path))[0]
+                if conn.execute("SELECT 1 FROM digest_items WHERE job_id IS NULL AND attachment_hash = ? LIMIT 1",
+                                (digest,)).fetchone() is None:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(spool_path)
+            conn.execute("COMMIT")
+        return job_id
+
+    def _due(self):
+        with self._connect() as conn:
+            count, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM digest_items WHERE job_id IS NULL"
+            ).fetchone()
+        return count >= self.max_items or (count > 0 and time.time() - oldest >= self.window)
+
+    def start(self):
+        """Start the background flushing thread if it isn't running yet"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="digest-flusher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if self._due():
+                    self.flush()
+            except Exception:
+                # The flusher is started once per process, so nothing may end this loop but stop()
+                logger.exception("digest flusher: flushing the batch failed, retrying")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
@@ -0,0 +1,97 @@
+import collections
+import datetime
+import hashlib
+import json
+import threading
+import time
+
+
+def _canonical(value):
+    """A submission as plain JSON values, with surrounding whitespace and date formats normalized"""
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%B %d, %Y")
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    raise TypeError(f"Can't fingerprint a {type(value).__name__}; pass files by their digest")
+
+
+def fingerprint(kind, data, image_digest=None):
+    """SHA-256 of a submission: its kind (e.g. "new" or "update:<club>"), data and picture digest.
+
+    Dict key order, whitespace around values and date objects versus their
+    formatted text don't change the result, so a resubmitted form matches.
+    """
+    canonical = json.dumps([kind, _canonical(data), image_digest],
+                           sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyCache:
+    """Results of recent submissions by fingerprint, so a repeat returns the first result instead of sending again.
+
+    Results are kept for ``ttl`` seconds, and only the ``max_entries`` newest.
+    A repeat that arrives while the first is still being processed waits for
+    it; if the first fails (``keep`` rejects its result) or raises, the repeat
+    runs on its own.
+    """
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # key -> (expires at, result), oldest first
+        self._pending = {}  # key -> threading.Event set when its first run finishes
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._entries:
+            key, (expires, _) = next(iter(self._entries.items()))
+            if expires > now:
+                break
+            del self._entries[key]
+
+    def get(self, key):
+        """The kept result for ``key``, or None"""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def run(self, key, submit, keep=lambda result: True):
+        """Return (result, repeated): a kept result for ``key``, or ``submit()``'s, which is kept if ``keep(result)``"""
+        while True:
+            with self._lock:
+                self._expire(time.monotonic())
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    return entry[1], True
+                done = self._pending.get(key)
+                if done is None:
+                    done = self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
+            done.wait()
+        try:
+            result = submit()
+            with self._lock:
+                if keep(result):
+                    self._entries[key] = (time.monotonic() + self.ttl, result)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            done.set()
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,162 @@
+import collections
+import concurrent.futures
+import hashlib
+import io
+import threading
+
+from PIL import Image, ImageOps
+
+# Output formats the pipeline can produce: PIL format name -> (file extension, MIME subtype)
+OUTPUT_FORMATS = {
+    "JPEG": ("jpg", "jpeg"),
+    "WEBP": ("webp", "webp"),
+}
+
+
+class ProcessedImage:
+    """A transcoded upload ready to attach, plus a small preview thumbnail"""
+
+    __slots__ = ("data", "filename", "mime_subtype", "width", "height", "thumbnail",
+                 "original_bytes", "output_bytes", "digest")
+
+    def __init__(self, data, filename, mime_subtype, width, height, thumbnail, original_bytes):
+        self.data = data
+        self.filename = filename
+        self.mime_subtype = mime_subtype
+        self.width = width
+        self.height = height
+        self.thumbnail = thumbnail
+        self.original_bytes = original_bytes
+        self.output_bytes = len(data)
+        self.digest = hashlib.sha256(data).hexdigest()
+
+
+def _flatten(img, keep_alpha):
+    """Convert palette/alpha images to a mode the encoder accepts"""
+    if img.mode in ("RGB", "L"):
+        return img
+    if keep_alpha and img.mode in ("RGBA", "LA", "P"):
+        return img.convert("RGBA")
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def _encode(img, fmt, quality):
+    out = io.BytesIO()
+    if fmt == "WEBP":
+        img.save(out, "WEBP", quality=quality, method=4)
+    else:
+        img.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def transcode_image(data, max_size=2048, quality=82, fmt="JPEG", thumbnail_size=320, basename="club_background"):
+    """Decode an uploaded picture, fix its orientation, downscale and re-encode it"""
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    extension, mime_subtype = OUTPUT_FORMATS[fmt]
+
+    with Image.open(io.BytesIO(data)) as img:
+        # Let the JPEG decoder skip straight to a reduced scale when the photo is huge
+        img.draft("RGB", (max_size, max_size))
+        img = ImageOps.exif_transpose(img)
+        img = _flatten(img, keep_alpha=fmt == "WEBP")
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        encoded = _encode(img, fmt, quality)
+
+        preview = img.copy()
+        preview.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+        thumbnail = _encode(_flatten(preview, keep_alpha=False), "JPEG", 75)
+
+        return ProcessedImage(
+            encoded,
+            f"{basename}.{extension}",
+            mime_subtype,
+            img.width,
+            img.height,
+            thumbnail,
+            len(data)
+        )
+
+
+class ImageProcessor:
+    """Bounded thread pool that transcodes uploads off the Streamlit script thread.
+
+    Pillow releases the GIL while decoding, resizing and encoding, so a few
+    worker threads keep several large uploads moving at once while ``max_workers``
+    caps how many full-resolution images are in memory together. ``stats()``
+    reports the bytes received and produced for monitoring.
+
+    With a ``blobs.BlobStore``, results are stored by content and remembered
+    under the hash of the upload and the current settings, so uploading the
+    same picture again returns the stored result without transcoding it.
+    """
+
+    def __init__(self, max_workers=2, max_size=2048, quality=82, fmt="JPEG", thumbnail_size=320, blobs=None):
+        self.max_size = max_size
+        self.quality = quality
+        self.fmt = fmt
+        self.thumbnail_size = thumbnail_size
+        self.blobs = blobs
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image")
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+
+    def submit(self, data):
+        """Start transcoding in the pool and return a Future of ProcessedImage"""
+        transcode = self._transcode_cached if self.blobs is not None else transcode_image
+        future = self._executor.submit(
+            transcode, data, self.max_size, self.quality, self.fmt, self.thumbnail_size
+        )
+        future.add_done_callback(self._record)
+        return future
+
+    def _transcode_cached(self, data, *settings):
+        key = "image:" + hashlib.sha256(data).hexdigest() + ":" + ":".join(map(str, settings))
+        found = self.blobs.alias(key)
+        if found is not None:
+            digest, meta = found
+            encoded, thumbnail = self.blobs.get(digest), self.blobs.get(meta["thumbnail"])
+            if encoded is not None and thumbnail is not None:
+                with self._lock:
+                    self._counters["cache_hits"] += 1
+                return ProcessedImage(encoded, meta["filename"], meta["mime_subtype"], meta["width"],
+                                      meta["height"], thumbnail, len(data))
+
+        image = transcode_image(data, *settings)
+        self.blobs.put(image.data, image.digest)
+        meta = {
+            "filename": image.filename,
+            "mime_subtype": image.mime_subtype,
+            "width": image.width,
+            "height": image.height,
+            "thumbnail": self.blobs.put(image.thumbnail),
+        }
+        self.blobs.set_alias(key, image.digest, meta)
+        return image
+
+    def process(self, data, timeout=None):
+        """Transcode an upload in the pool and wait for the result"""
+        return self.submit(data).result(timeout)
+
+    def _record(self, future):
+        with self._lock:
+            if future.exception() is not None:
+                self._counters["failed"] += 1
+                return
+            result = future.result()
+            self._counters["images"] += 1
+            self._counters["original_bytes"] += result.original_bytes
+            self._counters["output_bytes"] += result.output_bytes
+
+    def stats(self):
+        """Return image counts and total bytes before and after transcoding"""
+        with self._lock:
+            return {key: self._counters[key] for key in ("images", "failed", "cache_hits", "original_bytes", "output_bytes")}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,282 @@
+import itertools
+import re
+import threading
+import time
+import unicodedata
+
+# pypinyin.lazy_pinyin, loaded when the first Chinese name is indexed: its dictionaries
+# take longer to import than the rest of the app. False if pypinyin isn't installed
+# (optional: without it Chinese names match by characters only)
+_lazy_pinyin = None
+
+# Candidates scored exactly per query; rarer n-grams are used first to find them
+MAX_CANDIDATES = 200
+
+_CJK = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]")
+_CJK_RUN = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]+")
+_SEPARATORS = re.compile(r"[\s\-_.,·/()（）]+")
+
+
+def normalize(text):
+    """Fold case, width and punctuation so 'Coding-Club' and 'ｃｏｄｉｎｇ club' compare equal"""
+    return _SEPARATORS.sub(" ", unicodedata.normalize("NFKC", str(text)).casefold()).strip()
+
+
+def ngrams(text):
+    """Trigrams of a normalized term padded at the front (so prefixes match), plus single CJK characters"""
+    grams = set()
+    for word in text.split():
+        padded = "  " + word + " "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    grams.update(_CJK.findall(text))
+    return grams
+
+
+def load_pinyin():
+    """Import pypinyin on first use; returns whether it is available"""
+    global _lazy_pinyin
+    if _lazy_pinyin is None:
+        try:
+            from pypinyin import lazy_pinyin
+        except ImportError:
+            lazy_pinyin = False
+        _lazy_pinyin = lazy_pinyin
+    return bool(_lazy_pinyin)
+
+
+def pinyin_terms(text):
+    """(Chinese, pinyin) pairs for each run of Chinese in ``text``: '张明' -> [('张明', 'zhang ming'), ('张明', 'zhangming'), ('张明', 'zm')]"""
+    runs = _CJK_RUN.findall(text)
+    if not runs or not load_pinyin():
+        return []
+    terms = []
+    for run in runs:
+        syllables = _lazy_pinyin(run)
+        terms += [(run, " ".join(syllables)), (run, "".join(syllables)), (run, "".join(s[0] for s in syllables))]
+    return terms
+
+
+class ClubMatch:
+    """A search hit: the club, how well it matched and which name matched"""
+
+    __slots__ = ("club_id", "name", "emoji", "category", "score", "matched")
+
+    def __init__(self, club_id, name, emoji, category, score, matched):
+        self.club_id = club_id
+        self.name = name
+        self.emoji = emoji
+        self.category = category
+        self.score = score
+        self.matched = matched
+
+    @property
+    def label(self):
+        label = f"{self.emoji or ''} {self.name}".strip()
+        if normalize(self.matched) != normalize(self.name):
+            label += f" (matched {self.matched})"
+        return label
+
+
+class _Tables:
+    """The lookup tables; a rebuild fills a fresh set and swaps it in"""
+
+    def __init__(self):
+        self.clubs = {}     # club id -> (name, emoji, category)
+        self.terms = {}     # term id -> (club id, display text, normalized text, n-grams)
+        self.by_club = {}   # club id -> [term ids]
+        self.postings = {}  # n-gram -> set of term ids
+        self.next_term = 0
+
+
+class ClubIndex:
+    """In-memory fuzzy index of club names, emojis and leader names.
+
+    Every searchable string (club name, emoji, each leader's Chinese and
+    English name and, with ``pypinyin`` installed, the pinyin of anything
+    Chinese) is split into trigrams. A query looks up its rarest trigrams
+    first to collect a bounded set of candidates and scores each by trigram
+    overlap, with a bonus for prefix and substring hits, so typos and
+    partial names still find the club.
+
+    ``rebuild`` constructs new tables off to the side and swaps them in, and
+    ``add_club``/``remove_club`` update them in place, so searches never wait
+    for a rebuild (only, briefly, for a single club's update). Changes made while a rebuild is running are replayed onto
+    the new tables.
+    """
+
+    def __init__(self):
+        self._tables = _Tables()
+        self._write_lock = threading.Lock()
+        self._rebuilding = None
+        self._replay = None
+        self._caught_up_at = time.time()
+        self.ready = threading.Event()
+        self.built_at = None  # time.monotonic() of the last completed rebuild
+
+    def __len__(self):
+        return len(self._tables.clubs)
+
+    @staticmethod
+    def _club_terms(club):
+        data = club.get("data") or {}
+        terms = [club.get("name") or data.get("club_name", "")]
+        if club.get("emoji") or data.get("club_emoji"):
+            terms.append(club.get("emoji") or data.get("club_emoji"))
+        for role in ("presidents", "vice_presidents"):
+            for leader in data.get(role) or []:
+                terms += [leader.get("english_name", ""), leader.get("chinese_name", "")]
+        # (text shown as "matched ...", text searched)
+        pairs = [(term, term) for term in terms]
+        for term in terms:
+            pairs += pinyin_terms(term)
+        return [(shown, normalize(text)) for shown, text in dict.fromkeys(pairs) if normalize(text)]
+
+    @staticmethod
+    def _insert(tables, club):
+        club_id = club["id"]
+        data = club.get("data") or {}
+        tables.clubs[club_id] = (
+            club.get("name") or data.get("club_name", ""),
+            club.get("emoji") or data.get("club_emoji"),
+            club.get("category") or data.get("club_category"),
+        )
+        term_ids = []
+        for term, norm in ClubIndex._club_terms(club):
+            grams = frozenset(ngrams(norm) or {norm})
+            term_id = tables.next_term
+            tables.next_term += 1
+            tables.terms[term_id] = (club_id, term, norm, grams)
+            for gram in grams:
+                tables.postings.setdefault(gram, set()).add(term_id)
+            term_ids.append(term_id)
+        tables.by_club[club_id] = term_ids
+
+    @staticmethod
+    def _delete(tables, club_id):
+        for term_id in tables.by_club.pop(club_id, ()):
+            _, _, _, grams = tables.terms.pop(term_id)
+            for gram in grams:
+                posting = tables.postings.get(gram)
+                if posting is not None:
+                    posting.discard(term_id)
+                    if not posting:
+                        del tables.postings[gram]
+        tables.clubs.pop(club_id, None)
+
+    def add_club(self, club):
+        """Index or re-index one club record (a dict with id, name, emoji, category and data, as the store returns)"""
+        with self._write_lock:
+            self._delete(self._tables, club["id"])
+            self._insert(self._tables, club)
+            if self._replay is not None:
+                self._replay.append((club["id"], club))
+
+    def remove_club(self, club_id):
+        with self._write_lock:
+            self._delete(self._tables, club_id)
+            if self._replay is not None:
+                self._replay.append((club_id, None))
+
+    def rebuild(self, clubs):
+        """Replace the index with ``clubs`` (an iterable of club records); searches keep using the old tables until it's done"""
+        with self._write_lock:
+            self._replay = []
+        try:
+            tables = _Tables()
+            for club in clubs:
+                self._insert(tables, club)
+            with self._write_lock:
+                for club_id, club in self._replay:
+                    self._delete(tables, club_id)
+                    if club is not None:
+                        self._insert(tables, club)
+                self._tables = tables
+                self.built_at = time.monotonic()
+        finally:
+            with self._write_lock:
+                self._replay = None
+        self.ready.set()
+
+    def rebuild_in_background(self, load_clubs, max_age=None):
+        """Rebuild from ``load_clubs()`` in a thread unless one is running or the last finished under ``max_age`` seconds ago"""
+        with self._write_lock:
+            if max_age is not None and self.built_at is not None and time.monotonic() - self.built_at < max_age:
+                return
+            if self._rebuilding is not None and self._rebuilding.is_alive():
+                return
+            self._rebuilding = threading.Thread(
+                target=lambda: self.rebuild(load_clubs()), name="club-index-rebuild", daemon=True
+            )
+            self._rebuilding.start()
+
+    def catch_up(self, changed_since, every, overlap=10.0):
+        """Index clubs written since the last catch-up by any process, at most once per ``every`` seconds.
+
+        ``changed_since(timestamp)`` returns the records written at or after a
+        ``time.time()`` timestamp. Each call looks ``overlap`` seconds further
+        back than the last, since a write is stamped before it commits.
+        """
+        now = time.time()
+        with self._write_lock:
+            if now - self._caught_up_at < every:
+                return
+            since, self._caught_up_at = self._caught_up_at, now
+        for club in changed_since(since - overlap):
+            self.add_club(club)
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` ClubMatch results for ``query``, best first"""
+        tables = self._tables
+        q = normalize(query)
+        if not q:
+            return []
+        exact = tables.clubs.get(query.strip())
+        if exact is not None:
+            name, emoji, category = exact
+            return [ClubMatch(query.strip(), name, emoji, category, 1.0, query.strip())]
+
+        q_grams = ngrams(q) or {q}
+        # add_club/remove_club change the posting sets in place, so take copies of the
+        # query's few sets under the write lock and work on those
+        with self._write_lock:
+            postings = {gram: set(tables.postings[gram]) for gram in q_grams if gram in tables.postings}
+        found = sorted((len(posting), gram) for gram, posting in postings.items())
+        if not found:
+            return []
+        # Start from the rarest gram. While that matches too many terms (short or
+        # very common queries), narrow down with the next rarest; then widen with
+        # further grams, as far as the budget allows, so a typo in one part of the
+        # query still leaves the rest to match on
+        candidates = set(postings[found[0][1]])
+        for df, gram in found[1:]:
+            if len(candidates) <= MAX_CANDIDATES:
+                break
+            candidates = (candidates & postings[gram]) or candidates
+        for df, gram in found[1:]:
+            if len(candidates) + df > MAX_CANDIDATES:
+                break
+            candidates |= postings[gram]
+        if len(candidates) > MAX_CANDIDATES:
+            candidates = itertools.islice(candidates, MAX_CANDIDATES)
+
+        best = {}
+        for term_id in candidates:
+            entry = tables.terms.get(term_id)
+            if entry is None:  # removed by a concurrent update
+                continue
+            club_id, term, norm, grams = entry
+            score = 2 * len(q_grams & grams) / (len(q_grams) + len(grams))
+            if norm.startswith(q):
+                score = max(score, 0.9 + 0.1 * len(q) / len(norm))
+            elif q in norm:
+                score = max(score, 0.8 + 0.1 * len(q) / len(norm))
+            if score > best.get(club_id, (0,))[0]:
+                best[club_id] = (score, term)
+
+        ranked = sorted(best.items(), key=lambda item: -item[1][0])[:limit]
+        matches = []
+        for club_id, (score, term) in ranked:
+            club = tables.clubs.get(club_id)
+            if score >= 0.2 and club is not None:
+                matches.append(ClubMatch(club_id, *club, score, term))
+        return matches
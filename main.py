@@ -1,14 +1,42 @@
 import streamlit as st
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
 import datetime
+import contextlib
+import hmac
+import json
+import math
 import os
-import base64
-from PIL import Image
-import io
+import socket
+import threading
+import time
 import uuid
+# Pillow (images), smtplib and email (smtp_pool, delivery) are imported in the getters
+# that first need them, so a cold start doesn't wait for them before the first page
+from outbox import Outbox, STATUS_SENT, STATUS_FAILED
+from digest import DigestCollector, STATUS_BATCHED
+from renderer import get_renderer
+from store import SubmissionStore, name_key
+from catalog import CatalogExporter
+from lookup import ClubIndex
+from delta import clean_update, diff_update
+from blobs import BlobStore
+from profiling import PROFILER, span, timed, truthy
+from coordination import SharedIdempotencyCache, SharedRateLimiter
+from idempotency import IdempotencyCache, fingerprint
+from ratelimit import ConcurrencyGate, RateLimiter, SubmissionRejected
+from validation import FieldValidator, field_checks, validate_club, validate_update
+from schema import (
+    CLUB_CATEGORIES,
+    EXAMPLE_CLUB,
+    LEADER_LABELS,
+    LEADER_LIMITS,
+    LIST_LIMITS,
+    LIST_SECTIONS,
+    MEETING_FIELDS,
+    UPDATE_SECTIONS,
+    UPDATE_TEXT_LABELS,
+    leader_inputs,
+    list_inputs,
+)
 
 # Email configuration from Streamlit secrets
 def get_email_config():
@@ -17,306 +45,872 @@ def get_email_config():
     RECIPIENT_EMAIL = st.secrets["RECIPIENT_EMAIL"] if "RECIPIENT_EMAIL" in st.secrets else "default_recipient@example.com"
     return EMAIL_USER, EMAIL_PASSWORD, RECIPIENT_EMAIL
 
+# Mail server (override with the SMTP_SERVER and SMTP_PORT secrets, e.g. to point at a test server)
 SMTP_SERVER = "smtp.2925.com"
 SMTP_PORT = 25
 
-# Club categories
-CLUB_CATEGORIES = [
-    "Academic clubs",
-    "Arts and creative clubs",
-    "Community Service & Volunteering clubs",
-    "Cultural & Diversity clubs",
-    "Sport & fitness clubs",
-    "Language clubs",
-    "School Teams",
-    "Test Catgory"
-]
+# SMTP connection pool limits
+SMTP_POOL_SIZE = 4
+SMTP_MAX_IDLE = 60  # seconds a pooled session may sit unused
+SMTP_MAX_MESSAGES_PER_CONNECTION = 100
+
+# Where the outbox worker delivers messages (DELIVERY_BACKEND secret): "smtp", "maildir", "jsonl" or "null"
+DELIVERY_BACKEND = "smtp"
+DELIVERY_PATHS = {"maildir": "maildir", "jsonl": "deliveries.jsonl"}  # override with the DELIVERY_PATH secret
+DELIVERY_FSYNC_BATCH = 32      # file backends fsync once this many messages are written...
+DELIVERY_FSYNC_INTERVAL = 1.0  # ...or this many seconds after the first of them
+
+# Default on-disk outbox for queued emails (override with the OUTBOX_PATH secret). Processes sharing
+# it elect one delivery worker with a lease; another takes over this many seconds after it dies
+OUTBOX_PATH = "outbox.db"
+OUTBOX_LEASE_TTL = 15
+
+# Digest mode: batch submissions into one email per window (enable with the DIGEST_MODE secret)
+DIGEST_PATH = "digest.db"
+DIGEST_WINDOW = 15 * 60  # seconds
+DIGEST_MAX_ITEMS = 50
+
+# Persistent record of submissions and current club state (override with the STORE_PATH secret)
+STORE_PATH = "clubs.db"
+
+# Rebuild the club lookup index from the store at most this often (seconds); in between, clubs
+# written by other processes (replicas, bulk imports) are picked up every CLUB_INDEX_CATCH_UP seconds
+CLUB_INDEX_REFRESH = 5 * 60
+CLUB_INDEX_CATCH_UP = 5
+
+# SQLite file through which several app processes on one host (replicas behind a load balancer)
+# share rate limits and recent-submission results; None keeps them in each process (override
+# with the SHARED_STATE_PATH secret)
+SHARED_STATE_PATH = None
+
+# Admission control for submissions from the form and the API (override with secrets of the same names)
+SUBMIT_SESSION_BURST = 5          # submissions one browser session may send back to back,
+SUBMIT_SESSION_INTERVAL = 30      # then one more every this many seconds
+SUBMIT_IP_BURST = 30              # generous, since a whole school may share one address
+SUBMIT_IP_INTERVAL = 2
+MAX_IN_FLIGHT_SUBMISSIONS = 8     # processed at once across all sessions
+MAX_WAITING_SUBMISSIONS = 32      # queued for a slot before further ones are turned away
+SUBMIT_QUEUE_TIMEOUT = 15         # seconds a queued submission waits for a slot
+
+# A repeat of a submission that succeeded within this many seconds returns the first result
+# instead of being sent again (override with secrets of the same names)
+IDEMPOTENCY_WINDOW = 10 * 60
+IDEMPOTENCY_MAX_ENTRIES = 10000
+
+# Span timings shown on the hidden admin page (?page=admin) and the API's /metrics; switch them on
+# with the PROFILING environment variable or secret. The admin page is only served when the
+# ADMIN_TOKEN secret is set, and then needs &token=<ADMIN_TOKEN>
+ADMIN_PAGE = "admin"
+ADMIN_STATS_DAYS = 30    # days of submissions charted
+ADMIN_GAPS_LISTED = 50   # clubs named in each "without vice-presidents / picture" list
+
+# Directory where every process with profiling on (app replicas, the API) writes its span timings
+# every few seconds, so the API's /metrics can serve them all (override with the METRICS_PATH secret)
+METRICS_PATH = "metrics"
+
 
 # Maximum file size (30 MB)
 MAX_FILE_SIZE = 30 * 1024 * 1024  # 30 MB in bytes
 
-# Example club data
-EXAMPLE_CLUB = {
-    "club_name": "Coding Club",
-    "club_emoji": "💻",
-    "club_category": "Academic clubs",
-    "establishment_date": "September 15, 2022",
-    "presidents": [
-        {
-            "chinese_name": "张明",
-            "english_name": "Ming Zhang",
-            "class": "G12.1",
-            "email": "ming.zhang@example.com",
-            "wechat": "mingz2022"
-        }
-    ],
-    "vice_presidents": [
-        {
-            "chinese_name": "李华",
-            "english_name": "Hua Li",
-            "class": "G11.1",
-            "email": "hua.li@example.com",
-            "wechat": "huali_code"
-        }
-    ],
-    "meeting_frequency": "Weekly",
-    "meeting_day_time": "Wednesday P8",
-    "meeting_location": "Computer Lab 2",
-    "requirements": [
-        "Basic programming knowledge is helpful but not required",
-        "Interest in learning to code",
-        "Commitment to attend regular meetings"
-    ],
-    "learning_objectives": [
-        "Learn programming fundamentals in Python and JavaScript",
-        "Build web applications and games",
-        "Understand software development principles"
-    ],
-    "for_whom": [
-        "Students interested in computer science and programming",
-        "Those who want to pursue careers in technology",
-        "Creative problem solvers who enjoy logical thinking"
-    ],
-    "past_activities": [
-        "Developed a school event management app",
-        "Participated in the regional coding competition",
-        "Hosted a workshop on building personal websites"
-    ],
-    "benefits": [
-        "Gain valuable programming skills relevant to many careers",
-        "Build an impressive portfolio of coding projects",
-        "Connect with like-minded peers and industry professionals"
-    ]
-}
-
-def send_email(subject, body, image_data=None):
-    """Send email with the collected information and optional image"""
+# Background picture processing (override size, quality and format with secrets)
+IMAGE_WORKERS = 2
+IMAGE_MAX_SIZE = 2048  # longest edge in pixels
+IMAGE_QUALITY = 82
+IMAGE_FORMAT = "JPEG"  # or "WEBP"
+THUMBNAIL_SIZE = 320
+
+# Static club catalog (see catalog.py), refreshed after every stored submission when the
+# CATALOG_PATH secret names its directory
+CATALOG_PATH = None
+
+# Content-addressed store of processed pictures (override with the BLOB_PATH and BLOB_MAX_BYTES secrets)
+BLOB_PATH = "blobs"
+BLOB_MAX_BYTES = 1024 * 1024 * 1024  # unreferenced pictures are evicted beyond this
+
+
+@timed()
+def deliver_email(subject, body, attachments=()):
+    """Hand a queued email to the delivery backend right away, raising on failure (used by the outbox worker)
+
+    With SMTP the message is streamed to the server: attachments are read from
+    their spool files and base64-encoded chunk by chunk instead of being built in memory.
+    """
+    get_delivery_backend().deliver(subject, body, attachments)
+
+def delivery_backend_name():
+    """Name of the configured delivery backend (DELIVERY_BACKEND secret)"""
+    return st.secrets["DELIVERY_BACKEND"] if "DELIVERY_BACKEND" in st.secrets else DELIVERY_BACKEND
+
+def delivery_configured():
+    """Whether queued emails can be delivered: SMTP needs credentials, the other backends don't"""
+    EMAIL_USER, EMAIL_PASSWORD, RECIPIENT_EMAIL = get_email_config()
+    return bool(EMAIL_USER and EMAIL_PASSWORD) or delivery_backend_name() != "smtp"
+
+@st.cache_resource
+def get_delivery_backend():
+    """Shared delivery backend for the outbox worker, chosen by the DELIVERY_BACKEND secret"""
+    from delivery import create_backend
+    name = delivery_backend_name()
+    EMAIL_USER, EMAIL_PASSWORD, RECIPIENT_EMAIL = get_email_config()
+    return create_backend(
+        name,
+        EMAIL_USER,
+        RECIPIENT_EMAIL,
+        path=st.secrets["DELIVERY_PATH"] if "DELIVERY_PATH" in st.secrets else DELIVERY_PATHS.get(name),
+        smtp_pool=get_smtp_pool() if name == "smtp" else None,
+        batch_size=int(st.secrets["DELIVERY_FSYNC_BATCH"]) if "DELIVERY_FSYNC_BATCH" in st.secrets else DELIVERY_FSYNC_BATCH,
+        batch_interval=float(st.secrets["DELIVERY_FSYNC_INTERVAL"]) if "DELIVERY_FSYNC_INTERVAL" in st.secrets else DELIVERY_FSYNC_INTERVAL
+    )
+
+def smtp_server():
+    """(host, port) of the mail server, from the SMTP_SERVER and SMTP_PORT secrets or the defaults"""
+    return (
+        st.secrets["SMTP_SERVER"] if "SMTP_SERVER" in st.secrets else SMTP_SERVER,
+        int(st.secrets["SMTP_PORT"]) if "SMTP_PORT" in st.secrets else SMTP_PORT
+    )
+
+@st.cache_resource
+def get_smtp_pool():
+    """Shared pool of authenticated SMTP sessions for every session in this process"""
+    from smtp_pool import SMTPPool
     EMAIL_USER, EMAIL_PASSWORD, RECIPIENT_EMAIL = get_email_config()
+    smtp_host, smtp_port = smtp_server()
+    return SMTPPool(
+        smtp_host,
+        smtp_port,
+        EMAIL_USER,
+        EMAIL_PASSWORD,
+        size=int(st.secrets["SMTP_POOL_SIZE"]) if "SMTP_POOL_SIZE" in st.secrets else SMTP_POOL_SIZE,
+        max_idle=SMTP_MAX_IDLE,
+        max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION
+    )
+
+@st.cache_resource
+def get_outbox():
+    """Shared outbox and background delivery worker for every session in this process"""
+    outbox_path = st.secrets["OUTBOX_PATH"] if "OUTBOX_PATH" in st.secrets else OUTBOX_PATH
+    return Outbox(outbox_path, deliver_email, lease_ttl=OUTBOX_LEASE_TTL).start()
+
+@st.cache_resource
+def get_image_processor():
+    """Shared thread pool that transcodes uploaded background pictures"""
+    from images import ImageProcessor
+    return ImageProcessor(
+        max_workers=IMAGE_WORKERS,
+        max_size=int(st.secrets["IMAGE_MAX_SIZE"]) if "IMAGE_MAX_SIZE" in st.secrets else IMAGE_MAX_SIZE,
+        quality=int(st.secrets["IMAGE_QUALITY"]) if "IMAGE_QUALITY" in st.secrets else IMAGE_QUALITY,
+        fmt=st.secrets["IMAGE_FORMAT"] if "IMAGE_FORMAT" in st.secrets else IMAGE_FORMAT,
+        thumbnail_size=THUMBNAIL_SIZE,
+        blobs=get_blob_store()
+    )
+
+@st.cache_resource
+def get_blob_store():
+    """Shared content-addressed store of processed background pictures"""
+    return BlobStore(
+        st.secrets["BLOB_PATH"] if "BLOB_PATH" in st.secrets else BLOB_PATH,
+        max_bytes=int(st.secrets["BLOB_MAX_BYTES"]) if "BLOB_MAX_BYTES" in st.secrets else BLOB_MAX_BYTES
+    )
+
+def earlier_image_email(image, club):
+    """The earlier email (job_id, subject, sent_at) about the same club that carried this exact picture, unless it failed"""
+    sent = get_blob_store().job(image.digest, name_key(club))
+    job = get_delivery_status(sent["job_id"]) if sent else None
+    return sent if job is not None and job["status"] != STATUS_FAILED else None
+
+@timed()
+def process_background_image(uploaded_file):
+    """Transcode an uploaded background picture, returning (image, error message)"""
+    if uploaded_file is None:
+        return None, None
     try:
-        msg = MIMEMultipart()
-        msg['From'] = EMAIL_USER
-        msg['To'] = RECIPIENT_EMAIL
-        msg['Subject'] = subject
-        
-        # Attach plain text content
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # If there's an image, add it to the email
-        if image_data:
-            # Attach the image
-            img = MIMEImage(image_data)
-            img.add_header('Content-Disposition', 'attachment', filename='club_background.jpg')
-            msg.attach(img)
-        
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.login(EMAIL_USER, EMAIL_PASSWORD)
-            server.send_message(msg)
-        
-        return True, "Email sent successfully!"
+        return get_image_processor().process(uploaded_file.getvalue()), None
     except Exception as e:
-        return False, f"Failed to send email: {str(e)}"
+        return None, f"Could not process the background image: {str(e)}"
 
-def format_club_info(form_data):
-    """Format the collected club information into plain text"""
-    text = f"""
-CLUB INFORMATION
+@st.cache_resource
+def get_store():
+    """Shared submission store for every session in this process"""
+    return SubmissionStore(st.secrets["STORE_PATH"] if "STORE_PATH" in st.secrets else STORE_PATH)
 
-Name: {form_data['club_name']} {form_data['club_emoji']}
-Category: {form_data['club_category']}
-Date of Establishment: {form_data['establishment_date']}
+@st.cache_resource
+def get_catalog():
+    """Shared exporter of the static club catalog, or None if CATALOG_PATH isn't set"""
+    path = st.secrets["CATALOG_PATH"] if "CATALOG_PATH" in st.secrets else CATALOG_PATH
+    return CatalogExporter(path, blobs=get_blob_store()) if path else None
 
-LEADERSHIP
-"""
-    
-    # Add presidents
-    for i, president in enumerate(form_data['presidents']):
-        text += f"""
-President {i+1}:
-- Chinese Name: {president['chinese_name']}
-- English Name: {president['english_name']}
-- Class: {president['class']}
-- Email: {president['email']}
-- WeChat ID: {president['wechat']}
-"""
-    
-    # Add vice-presidents
-    for i, vp in enumerate(form_data['vice_presidents']):
-        text += f"""
-Vice-President {i+1}:
-- Chinese Name: {vp['chinese_name']}
-- English Name: {vp['english_name']}
-- Class: {vp['class']}
-- Email: {vp['email']}
-- WeChat ID: {vp['wechat']}
-"""
-    
-    # Meeting information
-    text += f"""
-MEETING SCHEDULE
-- Frequency: {form_data['meeting_frequency']}
-- Day and Time: {form_data['meeting_day_time']}
-- Location: {form_data['meeting_location']}
-
-REQUIREMENTS
-"""
-    
-    for i, req in enumerate(form_data['requirements']):
-        if req.strip():
-            text += f"- {req}\n"
-    
-    text += f"""
-LEARNING OBJECTIVES
-"""
-    
-    for i, obj in enumerate(form_data['learning_objectives']):
-        if obj.strip():
-            text += f"- {obj}\n"
-    
-    text += f"""
-FOR WHOM
-"""
-    
-    for i, whom in enumerate(form_data['for_whom']):
-        if whom.strip():
-            text += f"- {whom}\n"
-    
-    text += f"""
-EXAMPLES OF PAST ACTIVITIES/PROJECTS
-"""
-    
-    for i, activity in enumerate(form_data['past_activities']):
-        if activity.strip():
-            text += f"- {activity}\n"
-    
-    text += f"""
-BENEFITS OF JOINING
-"""
-    
-    for i, benefit in enumerate(form_data['benefits']):
-        if benefit.strip():
-            text += f"{i+1}. {benefit}\n"
-    
-    return text
+def refresh_catalog():
+    """Bring the static catalog up to date in the background; only clubs whose content changed are rewritten"""
+    catalog = get_catalog()
+    if catalog is not None:
+        catalog.refresh_in_background(get_store().records)
+
+@st.cache_resource
+def get_club_index():
+    """Shared fuzzy lookup index of known clubs, built from the store in the background"""
+    return ClubIndex()
+
+def refresh_club_index():
+    """Return the club index, starting a background rebuild if it is missing or stale"""
+    index = get_club_index()
+    index.rebuild_in_background(get_store().records, max_age=CLUB_INDEX_REFRESH)
+    index.catch_up(get_store().records, every=CLUB_INDEX_CATCH_UP)
+    return index
+
+def digest_mode_enabled():
+    """Whether submissions are batched into digest emails (DIGEST_MODE secret)"""
+    return truthy(st.secrets["DIGEST_MODE"]) if "DIGEST_MODE" in st.secrets else False
+
+def shared_state_path():
+    """The SQLite file replicas share rate limits and recent submissions through, or None to keep them per process"""
+    return st.secrets["SHARED_STATE_PATH"] if "SHARED_STATE_PATH" in st.secrets else SHARED_STATE_PATH
+
+@st.cache_resource
+def get_rate_limiters():
+    """Shared per-session and per-IP submission rate limits for every session in this process, or every replica"""
+    limits = {
+        "session": dict(
+            burst=int(st.secrets["SUBMIT_SESSION_BURST"]) if "SUBMIT_SESSION_BURST" in st.secrets else SUBMIT_SESSION_BURST,
+            interval=float(st.secrets["SUBMIT_SESSION_INTERVAL"]) if "SUBMIT_SESSION_INTERVAL" in st.secrets else SUBMIT_SESSION_INTERVAL
+        ),
+        "ip": dict(
+            burst=int(st.secrets["SUBMIT_IP_BURST"]) if "SUBMIT_IP_BURST" in st.secrets else SUBMIT_IP_BURST,
+            interval=float(st.secrets["SUBMIT_IP_INTERVAL"]) if "SUBMIT_IP_INTERVAL" in st.secrets else SUBMIT_IP_INTERVAL
+        )
+    }
+    path = shared_state_path()
+    if path:
+        return {kind: SharedRateLimiter(path, kind, **limit) for kind, limit in limits.items()}
+    return {kind: RateLimiter(**limit) for kind, limit in limits.items()}
+
+@st.cache_resource
+def get_submission_gate():
+    """Shared cap on submissions being processed at once in this process"""
+    return ConcurrencyGate(
+        max_in_flight=int(st.secrets["MAX_IN_FLIGHT_SUBMISSIONS"]) if "MAX_IN_FLIGHT_SUBMISSIONS" in st.secrets else MAX_IN_FLIGHT_SUBMISSIONS,
+        max_waiting=int(st.secrets["MAX_WAITING_SUBMISSIONS"]) if "MAX_WAITING_SUBMISSIONS" in st.secrets else MAX_WAITING_SUBMISSIONS,
+        timeout=float(st.secrets["SUBMIT_QUEUE_TIMEOUT"]) if "SUBMIT_QUEUE_TIMEOUT" in st.secrets else SUBMIT_QUEUE_TIMEOUT
+    )
+
+@st.cache_resource
+def get_idempotency_cache():
+    """Shared results of recent submissions by fingerprint, across all sessions and the API (and replicas)"""
+    ttl = float(st.secrets["IDEMPOTENCY_WINDOW"]) if "IDEMPOTENCY_WINDOW" in st.secrets else IDEMPOTENCY_WINDOW
+    max_entries = int(st.secrets["IDEMPOTENCY_MAX_ENTRIES"]) if "IDEMPOTENCY_MAX_ENTRIES" in st.secrets else IDEMPOTENCY_MAX_ENTRIES
+    path = shared_state_path()
+    if path:
+        return SharedIdempotencyCache(path, ttl, max_entries=max_entries)
+    return IdempotencyCache(ttl, max_entries=max_entries)
+
+def submit_once(kind, data, image, submit):
+    """Run ``submit()`` unless the same submission succeeded within IDEMPOTENCY_WINDOW; return (success, message, job_id)
+
+    A repeat, such as a double click on "Submit", gets the first submission's
+    result and job id, and nothing is sent or recorded again.
+    """
+    key = fingerprint(kind, data, image.digest if image is not None else None)
+    (success, message, job_id), repeated = get_idempotency_cache().run(key, submit, keep=lambda result: result[0])
+    if repeated:
+        waive_submission_cost()
+        message = f"{message} (This was already submitted moments ago, so it was not sent again.)"
+    return success, message, job_id
+
+# Rate-limit tokens taken by the submission admitted on this thread, for waive_submission_cost
+_admission = threading.local()
+
+@contextlib.contextmanager
+def admit_submission(session_key=None, client_ip=None):
+    """Run one submission under the per-session and per-IP rate limits and the in-flight cap.
+
+    Raises SubmissionRejected, with a message for the user, instead of running
+    the block; tokens taken for a rejected submission are given back, as are
+    those of a submission that turns out to be a repeat or a no-op.
+    """
+    limiters = get_rate_limiters()
+    taken = []
+    _admission.taken = taken
+    try:
+        for kind, key in (("session", session_key), ("ip", client_ip)):
+            if key is None:
+                continue
+            wait = limiters[kind].acquire(key)
+            if wait:
+                raise SubmissionRejected(
+                    f"You're submitting too quickly, so nothing was sent. Please wait {math.ceil(wait)} seconds and try again.",
+                    wait, "rate_limited"
+                )
+            taken.append((kind, key))
+        with get_submission_gate().slot():
+            yield
+    except SubmissionRejected:
+        waive_submission_cost()
+        raise
+    finally:
+        _admission.taken = None
+
+def waive_submission_cost():
+    """Give back the rate-limit tokens of the submission admitted on this thread, once"""
+    taken = getattr(_admission, "taken", None)
+    if taken:
+        limiters = get_rate_limiters()
+        for kind, key in taken:
+            limiters[kind].refund(key)
+        taken.clear()
+
+def client_keys():
+    """(session key, client IP) of the current browser session for ``admit_submission``"""
+    return st.session_state.session_key, st.context.ip_address
+
+@st.cache_resource
+def get_profiler():
+    """Process-wide span timings, switched on by the PROFILING environment variable or secret
+
+    While on, they are exported to METRICS_PATH for the API's /metrics.
+    """
+    try:
+        if "PROFILING" in st.secrets and truthy(st.secrets["PROFILING"]):
+            PROFILER.enabled = True
+    except FileNotFoundError:  # no secrets file; the environment variable still applies
+        pass
+    if PROFILER.enabled:
+        PROFILER.export_in_background(metrics_path(), metrics_process())
+    return PROFILER
+
+def metrics_path():
+    """Directory the processes' span timings are exported to"""
+    try:
+        return st.secrets["METRICS_PATH"] if "METRICS_PATH" in st.secrets else METRICS_PATH
+    except FileNotFoundError:
+        return METRICS_PATH
+
+def metrics_process():
+    """Name of this process's span timings export: host and process id"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+@st.cache_resource
+def get_digest():
+    """Shared digest collector and flushing thread for every session in this process"""
+    digest_path = st.secrets["DIGEST_PATH"] if "DIGEST_PATH" in st.secrets else DIGEST_PATH
+    return DigestCollector(
+        digest_path,
+        get_outbox(),
+        window=float(st.secrets["DIGEST_WINDOW"]) if "DIGEST_WINDOW" in st.secrets else DIGEST_WINDOW,
+        max_items=int(st.secrets["DIGEST_MAX_ITEMS"]) if "DIGEST_MAX_ITEMS" in st.secrets else DIGEST_MAX_ITEMS
+    ).start()
+
+@timed()
+def send_email(subject, body, image=None, club=None):
+    """Queue email with the collected information and optional processed image for background delivery
+
+    A picture already attached to an earlier email about the same ``club`` points to that email
+    (subject, date and hash) instead of being attached again.
+    """
+    attachments = []
+    try:
+        if image is not None:
+            earlier = earlier_image_email(image, club) if club else None
+            if earlier is not None:
+                sent_at = datetime.datetime.fromtimestamp(earlier["sent_at"]).strftime("%Y-%m-%d %H:%M")
+                body += (f"\nBackground image: not attached again, same picture as the email "
+                         f"\"{earlier['subject']}\" of {sent_at} (SHA-256 {image.digest[:16]}).\n")
+            else:
+                attachments = [(image.filename, image.data)]
+                body += f"\nBackground image: attached as {image.filename} (SHA-256 {image.digest[:16]}).\n"
+        if digest_mode_enabled():
+            job_id = get_digest().add(subject, body, attachments)
+            message = "Submission recorded! It will be emailed with the next digest."
+        else:
+            job_id = get_outbox().enqueue(subject, body, attachments)
+            message = "Email queued for delivery!"
+        if attachments and club:
+            get_blob_store().set_job(image.digest, name_key(club), job_id, subject)
+        return True, message, job_id
+    except Exception as e:
+        return False, f"Failed to queue email: {str(e)}", None
+
+def get_delivery_status(job_id):
+    """Look up a queued email (or digest item) returned by send_email"""
+    job = get_outbox().status(job_id)
+    if job is None and digest_mode_enabled():
+        job = get_digest().status(job_id)
+    return job
+
+@timed()
+def format_club_info(form_data):
+    """Format the collected club information into plain text"""
+    return get_renderer("text").club_info(form_data)
 
 def format_update_info(club_identifier, update_data):
     """Format the update information for email body."""
-    text = f"""
-CLUB UPDATE REQUEST
-
-Club Identifier: {club_identifier}
-
-Updated Fields:
-"""
-    for key, value in update_data.items():
-        if key == "background_image":
-            text += f"- Background Image: [Attached if present]\n"
-        elif key == "presidents":
-            text += "- Presidents:\n"
-            for i, president in enumerate(value):
-                text += f"  President {i+1}:\n"
-                for k, v in president.items():
-                    text += f"    {k.replace('_', ' ').title()}: {v}\n"
-        elif key == "vice_presidents":
-            text += "- Vice-Presidents:\n"
-            for i, vp in enumerate(value):
-                text += f"  Vice-President {i+1}:\n"
-                for k, v in vp.items():
-                    text += f"    {k.replace('_', ' ').title()}: {v}\n"
-        elif isinstance(value, list):
-            text += f"- {key.replace('_', ' ').title()}:\n"
-            for i, item in enumerate(value):
-                text += f"    {i+1}. {item}\n"
-        else:
-            text += f"- {key.replace('_', ' ').title()}: {value}\n"
-    return text
+    return get_renderer("text").update_info(club_identifier, update_data)
+
+@timed()
+def format_update_delta(club_identifier, update_delta):
+    """Format only the changes an update makes for the email body"""
+    return get_renderer("text").update_delta(club_identifier, update_delta)
+
+@timed()
+def get_update_delta(club_identifier, update_data, image=None):
+    """Compare an update request with the club's stored record, returning only what it changes"""
+    current = get_store().current(club_identifier)
+    update_delta = diff_update(current, update_data)
+    old_image = (current or {}).get("background_image")
+    if image is not None and image.digest != old_image:
+        update_delta["background_image"] = {"old": old_image, "new": image.digest}
+    return update_delta
+
+@timed()
+def validate_club_info(form_data, validator=None):
+    """Check a new-club submission, returning a list of error messages"""
+    return validate_club(form_data, validator)
+
+@timed()
+def validate_update_info(club_identifier, update_data, validator=None):
+    """Check an update request (blank parts already removed), returning a list of error messages"""
+    return validate_update(club_identifier, update_data, validator)
+
+def get_validator():
+    """This session's validator, which re-checks only the fields changed since it last saw them"""
+    if "validator" not in st.session_state:
+        st.session_state.validator = FieldValidator()
+    return st.session_state.validator
+
+def upload_errors(uploaded_file):
+    """Error message for a background picture over the size limit, if it is"""
+    if uploaded_file is not None and uploaded_file.size > MAX_FILE_SIZE:
+        return ["File size exceeds the maximum limit of 30 MB. Please upload a smaller file."]
+    return []
+
+def show_field_problems(record, key_prefix=""):
+    """Warn about values in a section that break a validation rule, as soon as they are entered"""
+    for problem in get_validator().messages(field_checks(record, key_prefix)):
+        st.warning(problem)
+
+@timed()
+def submit_club_info(form_data, image=None):
+    """Format and queue a new-club submission, returning (success, message, job_id); repeats aren't sent again"""
+    return submit_once("new", form_data, image, lambda: queue_club_info(form_data, image))
+
+def queue_club_info(form_data, image=None):
+    email_body = format_club_info(form_data)
+    email_subject = f"New Club Information: {form_data['club_name']}"
+    success, message, job_id = send_email(email_subject, email_body, image, club=form_data["club_name"])
+    if success:
+        def record(store):
+            current = store.current(form_data["club_name"]) or {}
+            record_data = dict(form_data, background_image=image.digest) if image is not None else form_data
+            club_id = store.record_club(record_data, job_id)
+            retain_background_image(current.get("background_image"), record_data.get("background_image"))
+            return club_id
+        message = record_submission(message, record)
+    return success, message, job_id
+
+@timed()
+def submit_update_info(club_identifier, update_data, image=None, update_delta=None):
+    """Queue only the changes of a club update request, returning (success, message, job_id)
 
+    If the update matches the club's stored record nothing is sent and job_id is None.
+    Repeats aren't sent again. Pass ``update_delta`` if the caller already computed it
+    (and showed it), so the email carries exactly that delta.
+    """
+    # The picture is fingerprinted by its digest rather than as an uploaded file
+    data = {key: value for key, value in update_data.items() if key != "background_image"}
+    return submit_once(f"update:{club_identifier.strip()}", data, image,
+                       lambda: queue_update_info(club_identifier, update_data, image, update_delta))
+
+def queue_update_info(club_identifier, update_data, image=None, update_delta=None):
+    if update_delta is None:
+        update_delta = get_update_delta(club_identifier, update_data, image)
+    if not update_delta:
+        waive_submission_cost()
+        return True, "Nothing to update: the submitted details match the club's current record.", None
+    email_body = format_update_delta(club_identifier, update_delta)
+    email_subject = f"Club Update Request: {club_identifier}"
+    success, message, job_id = send_email(email_subject, email_body, image, club=club_identifier)
+    if success:
+        def record(store):
+            club_id = store.record_update(club_identifier, update_delta, job_id)
+            if club_id is not None and "background_image" in update_delta:
+                retain_background_image(update_delta["background_image"]["old"], update_delta["background_image"]["new"])
+            return club_id
+        message = record_submission(message, record)
+    return success, message, job_id
+
+def retain_background_image(old_digest, new_digest):
+    """Move a club's reference from its old picture to its new one in the blob store"""
+    if old_digest == new_digest:
+        return
+    if new_digest:
+        get_blob_store().incref(new_digest)
+    if old_digest:
+        get_blob_store().decref(old_digest)
+
+@timed()
+def record_submission(message, record):
+    """Save a queued submission to the store and club index; the email is already queued, so a failure only adjusts the message"""
+    try:
+        club_id = record(get_store())
+        if club_id is not None:
+            get_club_index().add_club(get_store().get(club_id))
+            refresh_catalog()
+    except Exception as e:
+        return f"{message} (It could not be saved to the club records: {str(e)})"
+    return message
+
+@timed("session_state")
 def initialize_session_state():
     """Initialize session state variables if they don't exist"""
     if 'initialized' not in st.session_state:
         st.session_state.initialized = True
         
-        # Initialize data lists
-        st.session_state.requirements = [""]
-        st.session_state.learning_objectives = [""]
-        st.session_state.for_whom = [""]
-        st.session_state.past_activities = [""]
-        st.session_state.benefits = [""]
-        
-        # Initialize leadership counts
-        st.session_state.num_presidents = 1
-        st.session_state.num_vps = 1
-        
         # Initialize example state
         st.session_state.show_example = False
+        
+        # Outbox jobs queued from this session: (label, job id)
+        st.session_state.outbox_jobs = []
+        
+        # Rate-limit key of this browser session
+        st.session_state.session_key = uuid.uuid4().hex
 
-def update_dynamic_list(key, count):
-    """Update a dynamic list based on the new count"""
-    current_len = len(st.session_state[key])
-    
-    if count > current_len:
-        # Add new empty items
-        st.session_state[key].extend([""] * (count - current_len))
-    elif count < current_len:
-        # Remove items
-        st.session_state[key] = st.session_state[key][:count]
-
-def render_dynamic_inputs(title, key_prefix, help_text=None):
+
+def render_leader_inputs(role, count, key_prefix=""):
+    """Render the name, class and contact inputs for ``count`` leaders of one role"""
+    for i in range(count):
+        heading, left, right = leader_inputs(role, i, key_prefix)
+        st.markdown(heading)
+        for column, inputs in zip(st.columns(2), (left, right)):
+            with column:
+                for _, label, key in inputs:
+                    st.text_input(label, key=key)
+
+def render_dynamic_inputs(key, count, key_prefix="", help_text=None):
     """Render text area inputs for a dynamic section"""
-    data_key = key_prefix
-    items = []
-    
-    for i in range(len(st.session_state[data_key])):
-        item = st.text_area(
-            f"{title} {i+1}", 
-            value=st.session_state[data_key][i],
-            key=f"{key_prefix}_{i}",
-            help=help_text
-        )
-        # Update the value in session state
-        st.session_state[data_key][i] = item
-        items.append(item)
-    
-    return items
+    for label, widget_key in list_inputs(key, count, key_prefix):
+        st.text_area(label, key=widget_key, help=help_text)
+
+def collect_leaders(role, count, key_prefix=""):
+    """Read the leaders of one role back from the widgets' session state"""
+    leaders = []
+    for i in range(count):
+        _, left, right = leader_inputs(role, i, key_prefix)
+        leaders.append({field: st.session_state.get(key, "") for field, _, key in left + right})
+    return leaders
+
+def collect_dynamic_inputs(key, count, key_prefix=""):
+    return [st.session_state.get(widget_key, "") for _, widget_key in list_inputs(key, count, key_prefix)]
+
+def new_club_values(club):
+    """{widget key: value} filling the new-club widgets with a club record, or blanking them for an empty one"""
+    values = {field: club.get(field, "") for field in ("club_name", "club_emoji") + MEETING_FIELDS}
+    values["club_category"] = club.get("club_category", CLUB_CATEGORIES[0])
+    try:
+        values["establishment_date"] = datetime.datetime.strptime(club["establishment_date"], "%B %d, %Y").date()
+    except (KeyError, ValueError):
+        values["establishment_date"] = datetime.date.today()
+    for role, (min_count, max_count) in LEADER_LIMITS.items():
+        leaders = club.get(role) or []
+        values[f"{role}_count"] = max(len(leaders), min_count)
+        for i in range(max_count):
+            _, left, right = leader_inputs(role, i)
+            leader = leaders[i] if i < len(leaders) else {}
+            for field, _, key in left + right:
+                values[key] = leader.get(field, "")
+    for key, max_count in LIST_LIMITS.items():
+        items = club.get(key) or [""]
+        values[f"{key}_count"] = len(items)
+        for i, (_, widget_key) in enumerate(list_inputs(key, max_count)):
+            values[widget_key] = items[i] if i < len(items) else ""
+    return values
+
+def set_new_club_values(club):
+    """Fill the new-club widgets with a club record, or blank them with an empty one.
+
+    Used as a button callback, so the values are in place before any widget is drawn.
+    """
+    for key, value in new_club_values(club).items():
+        st.session_state[key] = value
 
 def load_example():
     """Load example data into the form"""
-    # Update session state with example data
-    st.session_state.num_presidents = len(EXAMPLE_CLUB["presidents"])
-    st.session_state.num_vps = len(EXAMPLE_CLUB["vice_presidents"])
-    
-    # Update dynamic lists
-    st.session_state.requirements = EXAMPLE_CLUB["requirements"]
-    st.session_state.learning_objectives = EXAMPLE_CLUB["learning_objectives"]
-    st.session_state.for_whom = EXAMPLE_CLUB["for_whom"]
-    st.session_state.past_activities = EXAMPLE_CLUB["past_activities"]
-    st.session_state.benefits = EXAMPLE_CLUB["benefits"]
-    
-    # Set example flag
+    set_new_club_values(EXAMPLE_CLUB)
     st.session_state.show_example = True
 
 def clear_example():
     """Clear example data and return to empty form"""
-    # Reset example flag
     st.session_state.show_example = False
-    
-    # Reset all fields
-    st.session_state.num_presidents = 1
-    st.session_state.num_vps = 1
-    st.session_state.requirements = [""]
-    st.session_state.learning_objectives = [""]
-    st.session_state.for_whom = [""]
-    st.session_state.past_activities = [""]
-    st.session_state.benefits = [""]
-    
-    # Force rerun to update the UI immediately
-    st.rerun()
+    set_new_club_values({})
+
+def track_job(label, job_id):
+    """Show a queued email's delivery status on this session's pages; a repeated submission's job is listed once"""
+    if all(job_id != tracked for _, tracked in st.session_state.outbox_jobs):
+        st.session_state.outbox_jobs.append((label, job_id))
 
+@st.fragment(run_every=2)
+@timed("section.delivery_status")
+def render_delivery_status():
+    """Show the delivery status of emails queued from this session"""
+    jobs = st.session_state.get("outbox_jobs", [])
+    if not jobs:
+        return
+    st.markdown("#### Email Delivery Status")
+    for label, job_id in reversed(jobs):
+        job = get_delivery_status(job_id)
+        if job is None:
+            continue
+        if job["status"] == STATUS_BATCHED:
+            st.info(f"{label}: waiting for the next digest email...")
+        elif job["status"] == STATUS_SENT:
+            st.success(f"{label}: email sent.")
+        elif job["status"] == STATUS_FAILED:
+            st.error(f"{label}: email could not be sent ({job['last_error']}).")
+        elif job["attempts"]:
+            st.warning(f"{label}: retrying delivery (attempt {job['attempts'] + 1}).")
+        else:
+            st.info(f"{label}: waiting to be sent...")
+
+# Sections of the forms. Each is a fragment: changing one of its widgets (a count,
+# a checkbox) reruns only that section, not the whole page. Values are read back
+# from session state when the page is submitted.
+
+@st.fragment
+@timed("section.club_details")
+def club_details_section():
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.text_input("Club Name", key="club_name")
+    with col2:
+        st.text_input("Club Emoji", key="club_emoji")
+    show_field_problems({key: st.session_state.get(key, "") for key in ("club_name", "club_emoji")})
+    st.selectbox("Club Category", options=CLUB_CATEGORIES, key="club_category")
+    st.date_input("Date of Establishment", format="YYYY-MM-DD", key="establishment_date")
+
+@st.fragment
+@timed("section.leaders")
+def leader_section(role):
+    """Presidents or vice-presidents, with the number of people at the top"""
+    min_count, max_count = LEADER_LIMITS[role]
+    count = st.number_input(
+        f"Number of {LEADER_LABELS[role][0]}s",
+        min_value=min_count,
+        max_value=max_count,
+        key=f"{role}_count"
+    )
+    render_leader_inputs(role, count)
+    show_field_problems({role: collect_leaders(role, count)})
+
+@st.fragment
+@timed("section.meeting_schedule")
+def meeting_schedule_section():
+    st.subheader("Meeting Schedule")
+    st.text_input("Frequency of Meetings (e.g. Weekly, Bi-weekly, Monthly)", key="meeting_frequency")
+    st.text_input("Day and Time of Meetings (e.g. Tuesday P10)", key="meeting_day_time")
+    st.text_input("Location of Meetings (e.g. Room 213)", key="meeting_location")
+
+@st.fragment
+@timed("section.list")
+def list_section(key):
+    """One dynamic list section, with the number of items at the top"""
+    subheader, _, count_label, help_text = LIST_SECTIONS[key]
+    st.subheader(subheader)
+    count = st.number_input(count_label, min_value=1, max_value=LIST_LIMITS[key], key=f"{key}_count")
+    render_dynamic_inputs(key, count, help_text=help_text)
+    show_field_problems({key: collect_dynamic_inputs(key, count)})
+
+@st.fragment
+@timed("section.background_picture")
+def background_picture_section():
+    st.subheader("Background Picture")
+    st.info(f"Maximum file size: 30 MB")
+    st.file_uploader("Upload a background picture", type=["jpg", "jpeg", "png"], key="background_image")
+
+def collect_club_info():
+    """Build the new-club ``form_data`` from the sections' widgets"""
+    state = st.session_state
+    form_data = {
+        "club_name": state.get("club_name", ""),
+        "club_emoji": state.get("club_emoji", ""),
+        "club_category": state.get("club_category", CLUB_CATEGORIES[0]),
+        "establishment_date": state.get("establishment_date", datetime.date.today()).strftime("%B %d, %Y")
+    }
+    for role in LEADER_LIMITS:
+        form_data[role] = collect_leaders(role, state.get(f"{role}_count", 0))
+    for field in MEETING_FIELDS:
+        form_data[field] = state.get(field, "")
+    for key in LIST_LIMITS:
+        form_data[key] = collect_dynamic_inputs(key, state.get(f"{key}_count", 1))
+    return form_data
+
+@st.fragment
+@timed("section.club_lookup")
+def club_lookup_section():
+    """Club name or ID box with fuzzy matches; the chosen club is kept in ``update_club_identifier``"""
+    club_query = st.text_input("Club Name or Unique Identifier", help="Type part of the club's name, its emoji, a leader's name (Chinese, English or pinyin) or the club ID", key="update_club_query")
+    club_identifier = club_query
+    if club_query.strip():
+        club_index = refresh_club_index()
+        matches = club_index.search(club_query, limit=8)
+        if matches:
+            labels = {match.club_id: f"{match.label} · {match.category}" for match in matches}
+            chosen_club = st.selectbox(
+                "Matching clubs",
+                options=list(labels) + [None],
+                format_func=lambda club_id: labels[club_id] if club_id else f"None of these, use \"{club_query}\" as typed",
+                key="update_club_match"
+            )
+            if chosen_club:
+                club_identifier = next(match.name for match in matches if match.club_id == chosen_club)
+                st.caption(f"Club ID `{chosen_club}`")
+        elif club_index.ready.is_set():
+            st.caption("No club with this name or ID is on record yet; the update will still be sent.")
+    st.session_state.update_club_identifier = club_identifier
+
+@st.fragment
+@timed("section.update")
+def update_section(section):
+    """One "Select Sections to Update" checkbox and, when ticked, the inputs for that section"""
+    if not st.checkbox(UPDATE_SECTIONS[section], key=f"update_section_{section}"):
+        return
+    if section == "club_category":
+        st.selectbox("New Club Category", options=CLUB_CATEGORIES, key="update_club_category")
+    elif section == "establishment_date":
+        st.date_input("New Date of Establishment", format="YYYY-MM-DD", key="update_establishment_date")
+    elif section in LEADER_LIMITS:
+        count = st.number_input(
+            f"Number of {LEADER_LABELS[section][0]}s to Update",
+            min_value=1,
+            max_value=LEADER_LIMITS[section][1],
+            key=f"update_{section}_count"
+        )
+        render_leader_inputs(section, count, "update_")
+        show_field_problems({section: collect_leaders(section, count, "update_")}, "update_")
+    elif section in LIST_LIMITS:
+        count = st.number_input(
+            f"{LIST_SECTIONS[section][2]} to Update",
+            min_value=1,
+            max_value=LIST_LIMITS[section],
+            key=f"update_{section}_count"
+        )
+        render_dynamic_inputs(section, count, "update_")
+        show_field_problems({section: collect_dynamic_inputs(section, count, "update_")}, "update_")
+    elif section == "background_image":
+        st.info(f"Maximum file size: 30 MB")
+        st.file_uploader("Upload a new background picture", type=["jpg", "jpeg", "png"], key="update_background_image")
+    else:
+        fields = MEETING_FIELDS if section == "meeting_schedule" else (section,)
+        for field in fields:
+            st.text_input(UPDATE_TEXT_LABELS[field], key=f"update_{field}")
+        show_field_problems({field: st.session_state.get(f"update_{field}", "") for field in fields}, "update_")
+
+def collect_update_info():
+    """Return (selected sections, ``update_data``) from the update page's widgets"""
+    state = st.session_state
+    selected = [section for section in UPDATE_SECTIONS if state.get(f"update_section_{section}")]
+    update_data = {}
+    for section in selected:
+        if section in LEADER_LIMITS:
+            update_data[section] = collect_leaders(section, state.get(f"update_{section}_count", 1), "update_")
+        elif section in LIST_LIMITS:
+            update_data[section] = collect_dynamic_inputs(section, state.get(f"update_{section}_count", 1), "update_")
+        elif section == "meeting_schedule":
+            for field in MEETING_FIELDS:
+                update_data[field] = state.get(f"update_{field}", "")
+        else:
+            update_data[section] = state.get(f"update_{section}")
+    return selected, update_data
+
+def render_submission_stats():
+    """Club and submission statistics, read from the store's maintained counters rather than its history"""
+    stats = get_store().stats(days=ADMIN_STATS_DAYS, listed=ADMIN_GAPS_LISTED)
+    submissions = stats["submissions"]
+    col_clubs, col_new, col_update, col_ratio = st.columns(4)
+    col_clubs.metric("Clubs", stats["clubs"])
+    col_new.metric("New-club submissions", submissions["new"])
+    col_update.metric("Update requests", submissions["update"])
+    col_ratio.metric("Updates per new club", f"{submissions['update'] / submissions['new']:.2f}" if submissions["new"] else "–")
+
+    categories = stats["categories"]
+    other = sum(count for category, count in categories.items() if category not in CLUB_CATEGORIES)
+    rows = [{"category": category, "clubs": categories.get(category, 0)} for category in CLUB_CATEGORIES]
+    if other:
+        rows.append({"category": "Other", "clubs": other})
+    st.markdown("#### Clubs per category")
+    st.bar_chart(rows, x="category", y="clubs", horizontal=True)
+
+    st.markdown(f"#### Submissions per day (last {ADMIN_STATS_DAYS} days)")
+    st.bar_chart(
+        [{"day": day, "new club": counts["new"], "update": counts["update"]} for day, counts in stats["daily"]],
+        x="day", y=["new club", "update"]
+    )
+
+    for gap, label in (("vice_presidents", "vice-presidents"), ("background_image", "a background picture")):
+        count, names = stats["gaps"][gap]
+        with st.expander(f"Clubs without {label}: {count}"):
+            if names:
+                st.write(", ".join(names) + (f" and {count - len(names)} more" if count > len(names) else ""))
+            else:
+                st.write("None.")
+
+def render_admin_page():
+    """Submission statistics and this process's span timings, reached only through ?page=admin&token=<ADMIN_TOKEN>"""
+    token = st.secrets["ADMIN_TOKEN"] if "ADMIN_TOKEN" in st.secrets else None
+    # Without a configured token the page doesn't exist: it names clubs and can reset the timings
+    if not token or not hmac.compare_digest(st.query_params.get("token", ""), str(token)):
+        st.error("Not found.")
+        return
+    profiler = get_profiler()
+    st.title("Admin")
+    render_submission_stats()
+    st.header("Performance")
+    gate = get_submission_gate().stats()
+    st.caption(f"Submissions in progress: {gate['in_flight']}, queued: {gate['waiting']}, turned away as busy: {gate['rejected']}")
+    lease = get_outbox().lease
+    worker = "this process" if lease.held() else (lease.owner() or "none (taking over)")
+    st.caption(f"Delivery worker: {worker}. Process: {lease.holder}.")
+    catalog = get_catalog()
+    if catalog is not None and catalog.last_error is not None:
+        st.warning(f"The club catalog could not be refreshed: {catalog.last_error}")
+    elif catalog is not None and catalog.last_export is not None:
+        export = catalog.last_export
+        st.caption(f"Club catalog: {export['clubs']} clubs, last refresh wrote {export['written']} files "
+                   f"in {export['seconds'] * 1000:.0f} ms.")
+    if not profiler.enabled:
+        st.info("Profiling is off. Set the PROFILING environment variable or secret to true and restart the app to collect timings.")
+        return
+    uptime = datetime.timedelta(seconds=int(time.time() - profiler.started_at))
+    st.caption(f"Timings since {uptime} ago; percentiles cover the last {profiler.window} calls of each span.")
+    snapshot = profiler.snapshot()
+    if snapshot:
+        st.dataframe(
+            [{"span": name, **{k: round(v, 3) for k, v in row.items()}} for name, row in snapshot.items()],
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.info("No timings recorded yet.")
+    col_json, col_prometheus, col_reset = st.columns(3)
+    with col_json:
+        st.download_button("Download JSON", json.dumps(snapshot, indent=2), file_name="spans.json", mime="application/json")
+    with col_prometheus:
+        st.download_button("Download Prometheus", profiler.prometheus(), file_name="spans.prom", mime="text/plain")
+    with col_reset:
+        if st.button("Reset timings"):
+            profiler.reset()
+            st.rerun()
+
+@timed("rerun")
 def main():
     st.set_page_config(
         page_title="Club Information Collector", 
         layout="wide"
     )
     
+    get_profiler()
+
+    # Hidden admin page
+    if st.query_params.get("page") == ADMIN_PAGE:
+        render_admin_page()
+        st.stop()
+
     # Initialize session state
     initialize_session_state()
     
@@ -349,249 +943,91 @@ def main():
         To update an existing club, please enter the club's name or unique identifier below.
         Select which sections you want to update. Only the selected sections will be included in the update.
         """)
-        club_identifier = st.text_input("Club Name or Unique Identifier")
+        club_lookup_section()
         st.divider()
         st.subheader("Select Sections to Update")
-        update_sections = {
-            "club_name": st.checkbox("Club Name"),
-            "club_emoji": st.checkbox("Club Emoji"),
-            "club_category": st.checkbox("Club Category"),
-            "establishment_date": st.checkbox("Date of Establishment"),
-            "presidents": st.checkbox("Presidents"),
-            "vice_presidents": st.checkbox("Vice-Presidents"),
-            "meeting_schedule": st.checkbox("Meeting Schedule"),
-            "requirements": st.checkbox("Requirements"),
-            "learning_objectives": st.checkbox("Learning Objectives"),
-            "for_whom": st.checkbox("For Whom"),
-            "past_activities": st.checkbox("Past Activities/Projects"),
-            "benefits": st.checkbox("Benefits of Joining"),
-            "background_image": st.checkbox("Background Picture")
-        }
-        st.divider()
-        update_data = {}
-        # Render input fields for checked sections
-        if update_sections["club_name"]:
-            update_data["club_name"] = st.text_input("New Club Name (leave blank to keep unchanged)")
-        if update_sections["club_emoji"]:
-            update_data["club_emoji"] = st.text_input("New Club Emoji (leave blank to keep unchanged)")
-        if update_sections["club_category"]:
-            update_data["club_category"] = st.selectbox("New Club Category", options=CLUB_CATEGORIES)
-        if update_sections["establishment_date"]:
-            update_data["establishment_date"] = st.date_input("New Date of Establishment", datetime.date.today(), format="YYYY-MM-DD")
-        if update_sections["presidents"]:
-            num_presidents = st.number_input("Number of Presidents to Update", min_value=1, max_value=5, value=1, key="update_num_presidents")
-            presidents = []
-            for i in range(num_presidents):
-                st.markdown(f"#### President {i+1}")
-                p_col1, p_col2 = st.columns(2)
-                with p_col1:
-                    p_chinese_name = st.text_input(f"Chinese Name (President {i+1})", key=f"update_president_cn_{i}")
-                    p_english_name = st.text_input(f"English Name (President {i+1})", key=f"update_president_en_{i}")
-                    p_class = st.text_input(f"Class [Grade/Class] (President {i+1})", key=f"update_president_class_{i}")
-                with p_col2:
-                    p_email = st.text_input(f"Email Address (President {i+1})", key=f"update_president_email_{i}")
-                    p_wechat = st.text_input(f"WeChat ID (President {i+1})", key=f"update_president_wechat_{i}")
-                presidents.append({
-                    "chinese_name": p_chinese_name,
-                    "english_name": p_english_name,
-                    "class": p_class,
-                    "email": p_email,
-                    "wechat": p_wechat
-                })
-            update_data["presidents"] = presidents
-        if update_sections["vice_presidents"]:
-            num_vps = st.number_input("Number of Vice-Presidents to Update", min_value=1, max_value=5, value=1, key="update_num_vps")
-            vice_presidents = []
-            for i in range(num_vps):
-                st.markdown(f"#### Vice-President {i+1}")
-                vp_col1, vp_col2 = st.columns(2)
-                with vp_col1:
-                    vp_chinese_name = st.text_input(f"Chinese Name (VP {i+1})", key=f"update_vp_cn_{i}")
-                    vp_english_name = st.text_input(f"English Name (VP {i+1})", key=f"update_vp_en_{i}")
-                    vp_class = st.text_input(f"Class [Grade/Class] (VP {i+1})", key=f"update_vp_class_{i}")
-                with vp_col2:
-                    vp_email = st.text_input(f"Email Address (VP {i+1})", key=f"update_vp_email_{i}")
-                    vp_wechat = st.text_input(f"WeChat ID (VP {i+1})", key=f"update_vp_wechat_{i}")
-                vice_presidents.append({
-                    "chinese_name": vp_chinese_name,
-                    "english_name": vp_english_name,
-                    "class": vp_class,
-                    "email": vp_email,
-                    "wechat": vp_wechat
-                })
-            update_data["vice_presidents"] = vice_presidents
-        if update_sections["meeting_schedule"]:
-            meeting_frequency = st.text_input("New Frequency of Meetings (leave blank to keep unchanged)")
-            meeting_day_time = st.text_input("New Day and Time of Meetings (leave blank to keep unchanged)")
-            meeting_location = st.text_input("New Location of Meetings (leave blank to keep unchanged)")
-            update_data["meeting_frequency"] = meeting_frequency
-            update_data["meeting_day_time"] = meeting_day_time
-            update_data["meeting_location"] = meeting_location
-        if update_sections["requirements"]:
-            req_count = st.number_input("Number of Requirements to Update", min_value=1, max_value=10, value=1, key="update_req_count")
-            requirements = []
-            for i in range(req_count):
-                requirements.append(st.text_area(f"Requirement {i+1}", key=f"update_req_{i}"))
-            update_data["requirements"] = requirements
-        if update_sections["learning_objectives"]:
-            obj_count = st.number_input("Number of Learning Objectives to Update", min_value=1, max_value=10, value=1, key="update_obj_count")
-            learning_objectives = []
-            for i in range(obj_count):
-                learning_objectives.append(st.text_area(f"Learning Objective {i+1}", key=f"update_obj_{i}"))
-            update_data["learning_objectives"] = learning_objectives
-        if update_sections["for_whom"]:
-            whom_count = st.number_input("Number of For Whom Items to Update", min_value=1, max_value=5, value=1, key="update_whom_count")
-            for_whom = []
-            for i in range(whom_count):
-                for_whom.append(st.text_area(f"For Whom {i+1}", key=f"update_whom_{i}"))
-            update_data["for_whom"] = for_whom
-        if update_sections["past_activities"]:
-            act_count = st.number_input("Number of Past Activities to Update", min_value=1, max_value=10, value=1, key="update_act_count")
-            past_activities = []
-            for i in range(act_count):
-                past_activities.append(st.text_area(f"Activity {i+1}", key=f"update_act_{i}"))
-            update_data["past_activities"] = past_activities
-        if update_sections["benefits"]:
-            ben_count = st.number_input("Number of Benefits to Update", min_value=1, max_value=10, value=1, key="update_ben_count")
-            benefits = []
-            for i in range(ben_count):
-                benefits.append(st.text_area(f"Benefit {i+1}", key=f"update_ben_{i}"))
-            update_data["benefits"] = benefits
-        if update_sections["background_image"]:
-            st.info(f"Maximum file size: 30 MB")
-            background_image = st.file_uploader("Upload a new background picture", type=["jpg", "jpeg", "png"], key="update_bg_img")
-            update_data["background_image"] = background_image
+        for section in UPDATE_SECTIONS:
+            update_section(section)
         st.divider()
         col_submit, col_back = st.columns([2,1])
         with col_submit:
             if st.button("Submit Update", use_container_width=True):
+                club_identifier = st.session_state.get("update_club_identifier", "")
+                update_sections, update_data = collect_update_info()
+                # Blank fields, list items and leaders mean "leave unchanged"
+                filtered_update = clean_update(update_data)
+                problems = validate_update_info(club_identifier, filtered_update, get_validator()) if filtered_update else []
+                problems += upload_errors(filtered_update.get("background_image"))
                 if not club_identifier.strip():
                     st.error("Please enter the club's name or unique identifier.")
-                elif not any(update_sections.values()):
+                elif not update_sections:
                     st.error("Please select at least one section to update.")
+                elif problems:
+                    for problem in problems:
+                        st.error(problem)
                 else:
-                    # Only collect non-empty fields
-                    filtered_update = {k: v for k, v in update_data.items() if v}
-                    email_body = format_update_info(club_identifier, filtered_update)
-                    email_subject = f"Club Update Request: {club_identifier}"
-                    # Handle background image
-                    image_data = None
-                    if filtered_update.get("background_image") is not None:
-                        bg_file = filtered_update["background_image"]
-                        if bg_file is not None:
-                            image_data = bg_file.getvalue()
-                    EMAIL_USER, EMAIL_PASSWORD, RECIPIENT_EMAIL = get_email_config()
-                    if EMAIL_USER and EMAIL_PASSWORD:
-                        with st.spinner("Sending update email..."):
-                            success, message = send_email(email_subject, email_body, image_data)
-                            if success:
-                                st.success(f"Update submitted for club: {club_identifier}. Email sent!")
+                    try:
+                        with admit_submission(*client_keys()):
+                            # Handle background image
+                            with st.spinner("Processing background image..."):
+                                image, image_error = process_background_image(filtered_update.get("background_image"))
+                            if image is not None:
+                                st.image(image.thumbnail, caption="New Background Image")
+                            update_delta = get_update_delta(club_identifier, filtered_update, image)
+                            if image_error:
+                                st.error(image_error)
+                            elif not update_delta:
+                                waive_submission_cost()
+                                st.info("Nothing to update: the submitted details match the club's current record, so no email was sent.")
+                            elif delivery_configured():
+                                with st.spinner("Queueing update email..."):
+                                    success, message, job_id = submit_update_info(
+                                        club_identifier, filtered_update, image, update_delta
+                                    )
+                                    if success:
+                                        if job_id:
+                                            track_job(f"Update for {club_identifier}", job_id)
+                                        st.success(f"Update submitted for club: {club_identifier}. {message}")
+                                    else:
+                                        st.error(message)
                             else:
-                                st.error(message)
-                    else:
-                        st.warning("Email credentials not found. Please set EMAIL_USER and EMAIL_PASSWORD in Streamlit secrets.")
-                        st.info("Preview of the update email content:")
-                        st.code(email_body)
-                        if image_data is not None:
-                            st.info("Background image would be included in the email as an attachment.")
-                    # For demo: show the JSON as well
-                    st.json(filtered_update)
+                                st.warning("Email credentials not found. Please set EMAIL_USER and EMAIL_PASSWORD in Streamlit secrets.")
+                                st.info("Preview of the update email content:")
+                                st.code(format_update_delta(club_identifier, update_delta))
+                                if image is not None:
+                                    st.info("Background image would be included in the email as an attachment.")
+                            # For demo: show the changes as JSON as well
+                            st.json(update_delta)
+                    except SubmissionRejected as e:
+                        st.warning(str(e))
         with col_back:
             if st.button("Back", use_container_width=True, key="update_back_btn"):
                 go_to('landing')
+        render_delivery_status()
         st.stop()
 
-    # New Club page (existing form logic)
+    # New Club page
     if st.session_state.page == 'new_club':
+        # Starting number of leaders; the widgets fall back to these after leaving the page
+        for role in LEADER_LIMITS:
+            st.session_state.setdefault(f"{role}_count", LEADER_LIMITS[role][0])
+
         # Sidebar controls - cannot be collapsed
-        st.sidebar.title("Form Controls")
-        
-        # Example button in sidebar - correct logic
-        if st.session_state.show_example:
-            if st.sidebar.button("Clear Example", key="clear_example", use_container_width=True):
-                clear_example()
-            st.sidebar.warning("⚠️ Submit button is disabled in example mode. Clear example data to enable submission.")
-        else:
-            if st.sidebar.button("Load Example", key="load_example", use_container_width=True):
-                load_example()
-                st.success("Example data loaded! Scroll down to see the form filled with example data.")
-                st.rerun()  # Force a rerun to update the UI immediately after loading example
-        
-        # Leadership controls in sidebar
-        with st.sidebar.expander("Leadership", expanded=True):
-            num_presidents = st.number_input(
-                "Number of Presidents", 
-                min_value=1, 
-                max_value=5, 
-                value=st.session_state.num_presidents,
-                key="sidebar_num_presidents"
-            )
-            st.session_state.num_presidents = num_presidents
+        with span("sidebar"):
+            st.sidebar.title("Form Controls")
             
-            num_vps = st.number_input(
-                "Number of Vice-Presidents", 
-                min_value=0, 
-                max_value=5, 
-                value=st.session_state.num_vps,
-                key="sidebar_num_vps"
-            )
-            st.session_state.num_vps = num_vps
-        
-        # Dynamic sections management in sidebar
-        with st.sidebar.expander("Requirements", expanded=True):
-            req_count = st.number_input(
-                "Number of Requirements", 
-                min_value=1, 
-                max_value=10, 
-                value=len(st.session_state.requirements),
-                key="req_count"
-            )
-            update_dynamic_list("requirements", req_count)
-        
-        with st.sidebar.expander("Learning Objectives", expanded=True):
-            obj_count = st.number_input(
-                "Number of Learning Objectives", 
-                min_value=1, 
-                max_value=10, 
-                value=len(st.session_state.learning_objectives),
-                key="obj_count"
-            )
-            update_dynamic_list("learning_objectives", obj_count)
-        
-        with st.sidebar.expander("For Whom", expanded=True):
-            whom_count = st.number_input(
-                "Number of For Whom Items", 
-                min_value=1, 
-                max_value=5, 
-                value=len(st.session_state.for_whom),
-                key="whom_count"
-            )
-            update_dynamic_list("for_whom", whom_count)
-        
-        with st.sidebar.expander("Past Activities", expanded=True):
-            act_count = st.number_input(
-                "Number of Past Activities", 
-                min_value=1, 
-                max_value=10, 
-                value=len(st.session_state.past_activities),
-                key="act_count"
-            )
-            update_dynamic_list("past_activities", act_count)
-        
-        with st.sidebar.expander("Benefits", expanded=True):
-            ben_count = st.number_input(
-                "Number of Benefits", 
-                min_value=1, 
-                max_value=10, 
-                value=len(st.session_state.benefits),
-                key="ben_count"
-            )
-            update_dynamic_list("benefits", ben_count)
+            # Example buttons fill or clear the widgets in a callback, before they are drawn
+            if st.session_state.show_example:
+                st.sidebar.button("Clear Example", key="clear_example", use_container_width=True, on_click=clear_example)
+                st.sidebar.warning("⚠️ Submit button is disabled in example mode. Clear example data to enable submission.")
+            else:
+                if st.sidebar.button("Load Example", key="load_example", use_container_width=True, on_click=load_example):
+                    st.success("Example data loaded! Scroll down to see the form filled with example data.")
         
         # Main content area
         st.title("Club Information Collector")
         st.markdown("Fill in the form below to submit information about your club.")
-        st.info("Use the sidebar to control the number of fields for each section")
+        st.info("Set the number of leaders and items at the top of each section")
         
         # Example data preview
         if st.session_state.show_example:
@@ -602,245 +1038,72 @@ def main():
                 st.markdown("This is an example of a completed club form. The form below has been pre-filled with this example data.")
                 st.warning("⚠️ You are in example mode. The submit button is disabled. To submit your own club information, click 'Clear Example' in the sidebar first.")
         
-        # Main form
-        with st.form("club_info_form"):
-            col1, col2 = st.columns([3, 1])
-            
-            with col1:
-                club_name = st.text_input("Club Name", value=EXAMPLE_CLUB["club_name"] if st.session_state.show_example else "")
-            
-            with col2:
-                club_emoji = st.text_input("Club Emoji", value=EXAMPLE_CLUB["club_emoji"] if st.session_state.show_example else "")
-            
-            club_category = st.selectbox(
-                "Club Category", 
-                options=CLUB_CATEGORIES,
-                index=CLUB_CATEGORIES.index(EXAMPLE_CLUB["club_category"]) if st.session_state.show_example else 0
-            )
-            
-            # Date selector for establishment date
-            default_date = datetime.date.today()
-            if st.session_state.show_example:
+        # Form sections, each rerun on its own as its widgets change
+        club_details_section()
+        st.subheader("Leadership")
+        for role in LEADER_LIMITS:
+            leader_section(role)
+        meeting_schedule_section()
+        for key in LIST_SECTIONS:
+            list_section(key)
+        background_picture_section()
+        
+        # Submit button - disabled in example mode
+        if st.session_state.show_example:
+            st.warning("⚠️ You are in example mode. Please click 'Clear Example' in the sidebar to enable submission.")
+            st.button("Submit", disabled=True)
+            submitted = False
+        else:
+            submitted = st.button("Submit")
+        
+        if submitted:
+            form_data = collect_club_info()
+            club_name = form_data["club_name"]
+            background_image = st.session_state.get("background_image")
+            problems = validate_club_info(form_data, get_validator()) + upload_errors(background_image)
+            if problems:
+                for problem in problems:
+                    st.error(problem)
+            else:
                 try:
-                    # Try to parse the example date
-                    default_date = datetime.datetime.strptime(EXAMPLE_CLUB["establishment_date"], "%B %d, %Y").date()
-                except:
-                    pass
-                    
-            establishment_date = st.date_input(
-                "Date of Establishment",
-                default_date,
-                format="YYYY-MM-DD"
-            )
-            
-            st.subheader("Leadership")
-            
-            # Presidents - using count from sidebar
-            presidents = []
-            for i in range(st.session_state.num_presidents):
-                st.markdown(f"#### President {i+1}")
-                p_col1, p_col2 = st.columns(2)
-                
-                # Get example data if available
-                example_president = {}
-                if st.session_state.show_example and i < len(EXAMPLE_CLUB["presidents"]):
-                    example_president = EXAMPLE_CLUB["presidents"][i]
-                
-                with p_col1:
-                    p_chinese_name = st.text_input(
-                        f"Chinese Name (President {i+1})",
-                        value=example_president.get("chinese_name", "") if st.session_state.show_example else ""
-                    )
-                    p_english_name = st.text_input(
-                        f"English Name (President {i+1})",
-                        value=example_president.get("english_name", "") if st.session_state.show_example else ""
-                    )
-                    p_class = st.text_input(
-                        f"Class [Grade/Class] (President {i+1})",
-                        value=example_president.get("class", "") if st.session_state.show_example else ""
-                    )
-                
-                with p_col2:
-                    p_email = st.text_input(
-                        f"Email Address (President {i+1})",
-                        value=example_president.get("email", "") if st.session_state.show_example else ""
-                    )
-                    p_wechat = st.text_input(
-                        f"WeChat ID (President {i+1})",
-                        value=example_president.get("wechat", "") if st.session_state.show_example else ""
-                    )
-                
-                presidents.append({
-                    "chinese_name": p_chinese_name,
-                    "english_name": p_english_name,
-                    "class": p_class,
-                    "email": p_email,
-                    "wechat": p_wechat
-                })
-            
-            # Vice Presidents - using count from sidebar
-            vice_presidents = []
-            for i in range(st.session_state.num_vps):
-                st.markdown(f"#### Vice-President {i+1}")
-                vp_col1, vp_col2 = st.columns(2)
-                
-                # Get example data if available
-                example_vp = {}
-                if st.session_state.show_example and i < len(EXAMPLE_CLUB["vice_presidents"]):
-                    example_vp = EXAMPLE_CLUB["vice_presidents"][i]
+                    with admit_submission(*client_keys()):
+                        # Format the email content
+                        email_body = format_club_info(form_data)
                 
-                with vp_col1:
-                    vp_chinese_name = st.text_input(
-                        f"Chinese Name (VP {i+1})",
-                        value=example_vp.get("chinese_name", "") if st.session_state.show_example else ""
-                    )
-                    vp_english_name = st.text_input(
-                        f"English Name (VP {i+1})",
-                        value=example_vp.get("english_name", "") if st.session_state.show_example else ""
-                    )
-                    vp_class = st.text_input(
-                        f"Class [Grade/Class] (VP {i+1})",
-                        value=example_vp.get("class", "") if st.session_state.show_example else ""
-                    )
+                        # Process background image if uploaded
+                        with st.spinner("Processing background image..."):
+                            image, image_error = process_background_image(background_image)
+                        if image is not None:
+                            # Display the preview thumbnail in the app
+                            st.image(
+                                image.thumbnail,
+                                caption=f"Uploaded Background Image ({image.original_bytes // 1024} KB → {image.output_bytes // 1024} KB)"
+                            )
                 
-                with vp_col2:
-                    vp_email = st.text_input(
-                        f"Email Address (VP {i+1})",
-                        value=example_vp.get("email", "") if st.session_state.show_example else ""
-                    )
-                    vp_wechat = st.text_input(
-                        f"WeChat ID (VP {i+1})",
-                        value=example_vp.get("wechat", "") if st.session_state.show_example else ""
-                    )
-                
-                vice_presidents.append({
-                    "chinese_name": vp_chinese_name,
-                    "english_name": vp_english_name,
-                    "class": vp_class,
-                    "email": vp_email,
-                    "wechat": vp_wechat
-                })
-            
-            st.subheader("Meeting Schedule")
-            meeting_frequency = st.text_input(
-                "Frequency of Meetings (e.g. Weekly, Bi-weekly, Monthly)",
-                value=EXAMPLE_CLUB["meeting_frequency"] if st.session_state.show_example else ""
-            )
-            meeting_day_time = st.text_input(
-                "Day and Time of Meetings (e.g. Tuesday P10)",
-                value=EXAMPLE_CLUB["meeting_day_time"] if st.session_state.show_example else ""
-            )
-            meeting_location = st.text_input(
-                "Location of Meetings (e.g. Room 213)",
-                value=EXAMPLE_CLUB["meeting_location"] if st.session_state.show_example else ""
-            )
-            
-            # Dynamic sections rendering (inside the form)
-            st.subheader("Requirements")
-            requirements = render_dynamic_inputs(
-                "Requirement", 
-                "requirements", 
-                help_text="e.g. No prerequisite / all students can join / Students with a GPA of > 3.8"
-            )
-            
-            st.subheader("Learning Objectives")
-            learning_objectives = render_dynamic_inputs(
-                "Learning Objective", 
-                "learning_objectives", 
-                help_text="e.g. Learn about image processing"
-            )
-            
-            st.subheader("For Whom")
-            for_whom = render_dynamic_inputs(
-                "For Whom", 
-                "for_whom", 
-                help_text="Ideal for students who: (e.g. love math, are passionate about art, enjoy outdoor activities, etc.)"
-            )
-            
-            st.subheader("Examples of Past Activities/Projects")
-            past_activities = render_dynamic_inputs(
-                "Activity", 
-                "past_activities", 
-                help_text="Please write in full sentences."
-            )
-            
-            st.subheader("Benefits of Joining")
-            benefits = render_dynamic_inputs(
-                "Benefit", 
-                "benefits", 
-                help_text="Please write in full sentences."
-            )
-            
-            st.subheader("Background Picture")
-            st.info(f"Maximum file size: 30 MB")
-            background_image = st.file_uploader("Upload a background picture", type=["jpg", "jpeg", "png"])
-            
-            # Submit button - disabled in example mode
-            if st.session_state.show_example:
-                st.warning("⚠️ You are in example mode. Please click 'Clear Example' in the sidebar to enable submission.")
-                submitted = st.form_submit_button("Submit", disabled=True)
-                submitted = False  # Ensure it's always False in example mode
-            else:
-                submitted = st.form_submit_button("Submit")
-            
-            if submitted:
-                if not club_name:
-                    st.error("Club Name is required.")
-                elif background_image is not None and background_image.size > MAX_FILE_SIZE:
-                    st.error(f"File size exceeds the maximum limit of 30 MB. Please upload a smaller file.")
-                else:
-                    # Format the establishment date as a string
-                    establishment_date_str = establishment_date.strftime("%B %d, %Y")
+                        if image_error:
+                            st.error(image_error)
+                        elif delivery_configured():
+                            with st.spinner("Queueing email..."):
+                                success, message, job_id = submit_club_info(form_data, image)
+                                if success:
+                                    track_job(f"New club {club_name}", job_id)
+                                    st.success(message)
+                                else:
+                                    st.error(message)
+                        else:
+                            st.warning("Email credentials not found. Please set EMAIL_USER and EMAIL_PASSWORD in Streamlit secrets.")
+                            st.info("Preview of the email content:")
+                            st.code(email_body)
                     
-                    # Collect all form data
-                    form_data = {
-                        "club_name": club_name,
-                        "club_emoji": club_emoji,
-                        "club_category": club_category,
-                        "establishment_date": establishment_date_str,
-                        "presidents": presidents,
-                        "vice_presidents": vice_presidents,
-                        "meeting_frequency": meeting_frequency,
-                        "meeting_day_time": meeting_day_time,
-                        "meeting_location": meeting_location,
-                        "requirements": requirements,
-                        "learning_objectives": learning_objectives,
-                        "for_whom": for_whom,
-                        "past_activities": past_activities,
-                        "benefits": benefits
-                    }
-                    
-                    # Format the email content
-                    email_body = format_club_info(form_data)
-                    email_subject = f"New Club Information: {club_name}"
-                    
-                    # Process background image if uploaded
-                    image_data = None
-                    if background_image is not None:
-                        image_bytes = background_image.getvalue()
-                        image_data = image_bytes
-                        
-                        # Display the image in the app
-                        st.image(image_bytes, caption="Uploaded Background Image", use_column_width=True)
-                    
-                    EMAIL_USER, EMAIL_PASSWORD, RECIPIENT_EMAIL = get_email_config()
-                    if EMAIL_USER and EMAIL_PASSWORD:
-                        with st.spinner("Sending email..."):
-                            success, message = send_email(email_subject, email_body, image_data)
-                            if success:
-                                st.success(message)
-                            else:
-                                st.error(message)
-                    else:
-                        st.warning("Email credentials not found. Please set EMAIL_USER and EMAIL_PASSWORD in Streamlit secrets.")
-                        st.info("Preview of the email content:")
-                        st.code(email_body)
-                        
-                        if background_image is not None:
-                            st.info("Background image would be included in the email as an attachment.")
-            # Add a Back button
-            if st.form_submit_button("Back", use_container_width=True):
-                go_to('landing')
+                            if background_image is not None:
+                                st.info("Background image would be included in the email as an attachment.")
+                except SubmissionRejected as e:
+                    st.warning(str(e))
+        # Add a Back button
+        if st.button("Back", use_container_width=True, key="new_club_back_btn"):
+            go_to('landing')
+        
+        render_delivery_status()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,132 @@
+import base64
+import io
+import mimetypes
+import re
+import smtplib
+import uuid
+from email.header import Header
+from email.utils import formatdate, make_msgid
+
+# Raw bytes read per step; a multiple of 57 so every chunk encodes to whole 76-character lines
+CHUNK_SIZE = 57 * 1024
+LINE_LENGTH = 76
+
+# Small pieces are coalesced into writes of about this size before hitting the socket
+WRITE_SIZE = 64 * 1024
+
+
+# CR, LF and the other control characters; in a header value they would end the header (or the message)
+_CONTROL = re.compile(r"[\x00-\x1f\x7f]+")
+# Start of a line beginning with "."; SMTP reads "." alone on a line as the end of DATA (RFC 5321 4.5.2)
+_LEADING_DOT = re.compile(rb"^\.", re.MULTILINE)
+
+
+def _header(name, value):
+    # Submitted text ends up in headers (club names in subjects), so it must never add header lines
+    value = _CONTROL.sub(" ", value)
+    if value.isascii() and len(value) < 900:
+        return f"{name}: {value}\r\n".encode("ascii")
+    encoded = Header(value, "utf-8", header_name=name).encode(linesep="\r\n")
+    return f"{name}: {encoded}\r\n".encode("ascii")
+
+
+def _quote(value):
+    """``value`` as the inside of a quoted header parameter"""
+    return _CONTROL.sub(" ", value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def iter_base64_lines(f, chunk_size=CHUNK_SIZE):
+    """Read a binary file object chunk by chunk and yield CRLF-terminated base64 lines"""
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            return
+        encoded = base64.b64encode(data)
+        yield b"".join(
+            encoded[i:i + LINE_LENGTH] + b"\r\n" for i in range(0, len(encoded), LINE_LENGTH)
+        )
+
+
+def iter_message(sender, recipient, subject, body, attachments=()):
+    """Yield a multipart email as CRLF-terminated byte chunks without building it in memory.
+
+    ``attachments`` is a list of ``(filename, path)`` pairs. Each file is read
+    and base64-encoded ``CHUNK_SIZE`` bytes at a time, so memory use does not
+    grow with the attachment size.
+    """
+    boundary = f"=============={uuid.uuid4().hex}=="
+    yield b"".join([
+        _header("From", sender or ""),
+        _header("To", recipient),
+        _header("Subject", subject),
+        _header("Date", formatdate(localtime=True)),
+        # Passing the domain avoids a reverse DNS lookup (socket.getfqdn) per message
+        _header("Message-ID", make_msgid(domain=(sender or "").rpartition("@")[2] or "localhost")),
+        b"MIME-Version: 1.0\r\n",
+        f'Content-Type: multipart/mixed; boundary="{boundary}"\r\n\r\n'.encode("ascii"),
+    ])
+
+    yield b"".join([
+        f"--{boundary}\r\n".encode("ascii"),
+        b'Content-Type: text/plain; charset="utf-8"\r\n',
+        b"Content-Transfer-Encoding: base64\r\n\r\n",
+    ])
+    yield from iter_base64_lines(io.BytesIO(body.encode("utf-8")))
+
+    for filename, path in attachments:
+        mime_type, _ = mimetypes.guess_type(filename)
+        yield b"".join([
+            f"\r\n--{boundary}\r\n".encode("ascii"),
+            f"Content-Type: {mime_type or 'application/octet-stream'}\r\n".encode("ascii"),
+            b"Content-Transfer-Encoding: base64\r\n",
+            f'Content-Disposition: attachment; filename="{_quote(filename)}"\r\n'.encode("utf-8"),
+            b"\r\n",
+        ])
+        with open(path, "rb") as f:
+            yield from iter_base64_lines(f)
+
+    yield f"\r\n--{boundary}--\r\n".encode("ascii")
+
+
+def send_streamed(server, sender, recipients, chunks):
+    """Run one SMTP transaction on ``server``, writing the DATA section chunk by chunk.
+
+    Each chunk must end with CRLF (``iter_message`` chunks do), so every chunk
+    starts a line. Lines starting with "." are dot-stuffed as the protocol
+    requires, whatever produced them.
+    """
+    server.ehlo_or_helo_if_needed()
+    code, resp = server.mail(sender or "")
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPSenderRefused(code, resp, sender)
+    refused = {}
+    for recipient in recipients:
+        code, resp = server.rcpt(recipient)
+        if code not in (250, 251):
+            refused[recipient] = (code, resp)
+    if len(refused) == len(recipients):
+        server.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    code, resp = server.docmd("data")
+    if code != 354:
+        raise smtplib.SMTPDataError(code, resp)
+    buffered = []
+    buffered_size = 0
+    for chunk in chunks:
+        if b"\n." in chunk or chunk.startswith(b"."):
+            chunk = _LEADING_DOT.sub(b"..", chunk)
+        buffered.append(chunk)
+        buffered_size += len(chunk)
+        if buffered_size >= WRITE_SIZE:
+            server.send(b"".join(buffered))
+            buffered = []
+            buffered_size = 0
+    # Send the terminator with the tail so the last write isn't a tiny separate packet
+    buffered.append(b".\r\n")
+    server.send(b"".join(buffered))
+    code, resp = server.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
@@ -0,0 +1,301 @@
+import datetime
+import json
+import sys
+
+from delta import LEADER_ROLES
+from schema import LEADER_FIELDS, LIST_LIMITS, MEETING_FIELDS, UPDATE_SECTIONS
+
+# List sections of a club, in form order
+LIST_KEYS = tuple(LIST_LIMITS)
+
+# Order of the keys of an update delta, as the update page lists its sections
+_DELTA_ORDER = {
+    key: n for n, key in enumerate(
+        field for section in UPDATE_SECTIONS
+        for field in (MEETING_FIELDS if section == "meeting_schedule" else (section,))
+    )
+}
+
+
+def _text(value):
+    """A text field as the form writes it: dates as 'September 15, 2022', None as blank"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%B %d, %Y")
+    return "" if value is None else str(value)
+
+
+def _intern(value):
+    """Share one copy of short values repeated across many records (categories, classes, frequencies)"""
+    return sys.intern(value) if len(value) <= 64 else value
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("msgpack serialization needs the msgpack package: pip install msgpack") from None
+    return msgpack
+
+
+class _Model:
+    """Shared serialization: ``pack`` gives a compact positional form of plain lists and strings"""
+
+    __slots__ = ()
+
+    def pack(self):
+        raise NotImplementedError
+
+    @classmethod
+    def unpack(cls, packed):
+        raise NotImplementedError
+
+    def to_json(self):
+        return json.dumps(self.pack(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.unpack(json.loads(text))
+
+    def to_msgpack(self):
+        return _msgpack().packb(self.pack())
+
+    @classmethod
+    def from_msgpack(cls, data):
+        return cls.unpack(_msgpack().unpackb(data))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Leader(_Model):
+    """A president or vice-president; ``to_dict`` gives the form's leader dict"""
+
+    __slots__ = ("chinese_name", "english_name", "class_name", "email", "wechat")
+
+    def __init__(self, chinese_name="", english_name="", class_name="", email="", wechat=""):
+        self.chinese_name = chinese_name
+        self.english_name = english_name
+        self.class_name = _intern(class_name)
+        self.email = email
+        self.wechat = wechat
+
+    @classmethod
+    def from_dict(cls, leader):
+        return cls(*(_text(leader.get(field)) for field in LEADER_FIELDS))
+
+    def to_dict(self):
+        return dict(zip(LEADER_FIELDS, self.pack()))
+
+    def pack(self):
+        return [self.chinese_name, self.english_name, self.class_name, self.email, self.wechat]
+
+    @classmethod
+    def unpack(cls, packed):
+        return cls(*packed)
+
+
+class MeetingSchedule(_Model):
+    """When and where a club meets"""
+
+    __slots__ = ("frequency", "day_time", "location")
+
+    def __init__(self, frequency="", day_time="", location=""):
+        self.frequency = _intern(frequency)
+        self.day_time = _intern(day_time)
+        self.location = location
+
+    @classmethod
+    def from_dict(cls, form_data):
+        """Read the ``meeting_*`` fields of a ``form_data`` dict"""
+        return cls(*(_text(form_data.get(field)) for field in MEETING_FIELDS))
+
+    def to_dict(self):
+        return dict(zip(MEETING_FIELDS, self.pack()))
+
+    def pack(self):
+        return [self.frequency, self.day_time, self.location]
+
+    @classmethod
+    def unpack(cls, packed):
+        return cls(*packed)
+
+
+class Club(_Model):
+    """A club record with typed fields, for holding many clubs in memory.
+
+    Converts to and from the ``form_data`` dict the form, API, formatters and
+    store use. Lists are tuples and leaders are ``Leader`` objects, so a record
+    carries no per-item dict keys, and repeated short strings are shared.
+    Keys outside the form's schema are dropped.
+    """
+
+    __slots__ = ("name", "emoji", "category", "established", "presidents", "vice_presidents", "meeting",
+                 "requirements", "learning_objectives", "for_whom", "past_activities", "benefits",
+                 "background_image")
+
+    def __init__(self, name="", emoji="", category="", established="", presidents=(), vice_presidents=(),
+                 meeting=None, requirements=(), learning_objectives=(), for_whom=(), past_activities=(),
+                 benefits=(), background_image=None):
+        self.name = name
+        self.emoji = _intern(emoji)
+        self.category = _intern(category)
+        self.established = established
+        self.presidents = tuple(presidents)
+        self.vice_presidents = tuple(vice_presidents)
+        self.meeting = meeting if meeting is not None else MeetingSchedule()
+        self.requirements = tuple(requirements)
+        self.learning_objectives = tuple(learning_objectives)
+        self.for_whom = tuple(for_whom)
+        self.past_activities = tuple(past_activities)
+        self.benefits = tuple(benefits)
+        self.background_image = background_image  # digest of the processed picture, if any
+
+    @classmethod
+    def from_dict(cls, form_data):
+        image = form_data.get("background_image")
+        return cls(
+            _text(form_data.get("club_name")),
+            _text(form_data.get("club_emoji")),
+            _text(form_data.get("club_category")),
+            _text(form_data.get("establishment_date")),
+            *([Leader.from_dict(leader) for leader in form_data.get(role) or ()] for role in LEADER_ROLES),
+            MeetingSchedule.from_dict(form_data),
+            *([_text(item) for item in form_data.get(key) or ()] for key in LIST_KEYS),
+            background_image=image if isinstance(image, str) and image else None
+        )
+
+    def to_dict(self):
+        """The ``form_data`` dict, as ``format_club_info`` and the store take it"""
+        form_data = {
+            "club_name": self.name,
+            "club_emoji": self.emoji,
+            "club_category": self.category,
+            "establishment_date": self.established,
+            "presidents": [leader.to_dict() for leader in self.presidents],
+            "vice_presidents": [leader.to_dict() for leader in self.vice_presidents],
+        }
+        form_data.update(self.meeting.to_dict())
+        for key in LIST_KEYS:
+            form_data[key] = list(getattr(self, key))
+        if self.background_image:
+            form_data["background_image"] = self.background_image
+        return form_data
+
+    def pack(self):
+        return [
+            self.name, self.emoji, self.category, self.established,
+            [leader.pack() for leader in self.presidents],
+            [leader.pack() for leader in self.vice_presidents],
+            self.meeting.pack(),
+            *(list(getattr(self, key)) for key in LIST_KEYS),
+            self.background_image,
+        ]
+
+    @classmethod
+    def unpack(cls, packed):
+        name, emoji, category, established, presidents, vice_presidents, meeting, *lists, image = packed
+        return cls(
+            name, emoji, category, established,
+            [Leader.unpack(leader) for leader in presidents],
+            [Leader.unpack(leader) for leader in vice_presidents],
+            MeetingSchedule.unpack(meeting),
+            *lists,
+            background_image=image
+        )
+
+
+class UpdateDelta(_Model):
+    """The changes of an update request, as ``delta.diff_update`` computes them.
+
+    ``fields`` maps each changed text field (and ``background_image``) to
+    (old, new); ``lists`` maps a list section to (removed, added), each a tuple
+    of (index, item); ``leaders`` maps a role to (removed, added, changed) with
+    ``Leader`` items, where ``changed`` holds (index, {field: (old, new)}).
+    ``to_dict`` lists the keys in the update page's section order.
+    """
+
+    __slots__ = ("fields", "lists", "leaders")
+
+    def __init__(self, fields=None, lists=None, leaders=None):
+        self.fields = fields or {}
+        self.lists = lists or {}
+        self.leaders = leaders or {}
+
+    def __bool__(self):
+        return bool(self.fields or self.lists or self.leaders)
+
+    @classmethod
+    def from_dict(cls, delta):
+        fields, lists, leaders = {}, {}, {}
+        for key, change in delta.items():
+            if "new" in change:
+                fields[key] = (change.get("old"), change["new"])
+            elif key in LEADER_ROLES:
+                leaders[key] = (
+                    tuple((i, Leader.from_dict(leader)) for i, leader in change.get("removed", ())),
+                    tuple((j, Leader.from_dict(leader)) for j, leader in change.get("added", ())),
+                    tuple(
+                        (j, {field: (values.get("old"), values["new"]) for field, values in changed.items()})
+                        for j, changed in change.get("changed", ())
+                    ),
+                )
+            else:
+                lists[key] = (tuple((i, item) for i, item in change.get("removed", ())),
+                              tuple((j, item) for j, item in change.get("added", ())))
+        return cls(fields, lists, leaders)
+
+    def to_dict(self):
+        """The delta dict, as ``format_update_delta`` and ``SubmissionStore.record_update`` take it"""
+        delta = {key: {"old": old, "new": new} for key, (old, new) in self.fields.items()}
+        for key, (removed, added) in self.lists.items():
+            change = {"removed": [[i, item] for i, item in removed], "added": [[j, item] for j, item in added]}
+            delta[key] = {k: v for k, v in change.items() if v}
+        for role, (removed, added, changed) in self.leaders.items():
+            change = {
+                "removed": [[i, leader.to_dict()] for i, leader in removed],
+                "added": [[j, leader.to_dict()] for j, leader in added],
+                "changed": [
+                    [j, {field: {"old": old, "new": new} for field, (old, new) in fields.items()}]
+                    for j, fields in changed
+                ],
+            }
+            delta[role] = {k: v for k, v in change.items() if v}
+        return dict(sorted(delta.items(), key=lambda item: _DELTA_ORDER.get(item[0], len(_DELTA_ORDER))))
+
+    def pack(self):
+        return [
+            {key: [old, new] for key, (old, new) in self.fields.items()},
+            {key: [[list(pair) for pair in removed], [list(pair) for pair in added]]
+             for key, (removed, added) in self.lists.items()},
+            {
+                role: [
+                    [[i, leader.pack()] for i, leader in removed],
+                    [[j, leader.pack()] for j, leader in added],
+                    [[j, {field: list(values) for field, values in fields.items()}] for j, fields in changed],
+                ]
+                for role, (removed, added, changed) in self.leaders.items()
+            },
+        ]
+
+    @classmethod
+    def unpack(cls, packed):
+        fields, lists, leaders = packed
+        return cls(
+            {key: tuple(values) for key, values in fields.items()},
+            {key: (tuple(map(tuple, removed)), tuple(map(tuple, added))) for key, (removed, added) in lists.items()},
+            {
+                role: (
+                    tuple((i, Leader.unpack(leader)) for i, leader in removed),
+                    tuple((j, Leader.unpack(leader)) for j, leader in added),
+                    tuple((j, {field: tuple(values) for field, values in changed_fields.items()})
+                          for j, changed_fields in changed),
+                )
+                for role, (removed, added, changed) in leaders.items()
+            },
+        )
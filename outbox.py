@@ -0,0 +1,276 @@
+import atexit
+import contextlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from coordination import Lease
+
+# Job states
+STATUS_QUEUED = "queued"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+# Spool files no job refers to are removed once they are this old (a crash between spooling and the INSERT)
+ORPHAN_SPOOL_AGE = 3600
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """Durable on-disk email queue drained by a background worker thread.
+
+    Messages are written to a SQLite table and attachments are spooled to files
+    next to the database, so ``enqueue`` returns as soon as the data is on disk.
+    The worker calls ``deliver(subject, body, attachments)`` where attachments is
+    a list of ``(filename, path)`` pairs, retrying failures with exponential
+    backoff until ``max_attempts`` is reached.
+
+    Several processes may share one outbox (replicas of the app on one host):
+    any of them can enqueue, but only the holder of the outbox's worker lease
+    delivers, so each message goes out once over one set of SMTP sessions. If
+    that process dies, another takes the lease within ``lease_ttl`` seconds
+    and requeues the jobs it left mid-send.
+    """
+
+    def __init__(self, path, deliver, max_attempts=5, base_delay=2.0, max_delay=300.0, poll_interval=1.0,
+                 lease_ttl=15.0):
+        self.path = path
+        self.spool_dir = path + ".spool"
+        self.deliver = deliver
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._keeper = None
+        self._local = threading.local()
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id TEXT PRIMARY KEY,
+                    subject TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    attachments TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    sent_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+        self.lease = Lease(path, "outbox-worker", ttl=lease_ttl, on_acquire=self._requeue_abandoned)
+
+    def _requeue_abandoned(self, conn):
+        # Taking the lease means the last worker is gone: anything it left mid-send goes back on the queue
+        conn.execute("UPDATE outbox SET status = ? WHERE status = ?", (STATUS_QUEUED, STATUS_SENDING))
+        self._remove_orphans(conn)
+
+    def _remove_orphans(self, conn):
+        """Delete old spool files that no job refers to, left by a crash before the job row was inserted"""
+        referenced = set()
+        for (attachments,) in conn.execute("SELECT attachments FROM outbox WHERE status IN (?, ?)",
+                                           (STATUS_QUEUED, STATUS_SENDING)):
+            referenced.update(spool_path for _, spool_path in json.loads(attachments))
+        cutoff = time.time() - ORPHAN_SPOOL_AGE
+        with os.scandir(self.spool_dir) as entries:
+            for entry in entries:
+                with contextlib.suppress(OSError):
+                    if entry.path not in referenced and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Yield this thread's connection, kept open so each call skips connect and WAL checkpoint costs"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def enqueue(self, subject, body, attachments=None):
+        """Persist a message and its attachments, returning the job id"""
+        job_id = uuid.uuid4().hex
+        spooled = []
+        try:
+            for n, (filename, data) in enumerate(attachments or []):
+                spool_path = os.path.join(self.spool_dir, f"{job_id}-{n}")
+                self._spool(spool_path, data)
+                spooled.append([filename, spool_path])
+
+            now = time.time()
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO outbox (id, subject, body, attachments, status, created_at, next_attempt_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, subject, body, json.dumps(spooled), STATUS_QUEUED, now, now)
+                )
+        except BaseException:
+            self._remove_spool(spooled)
+            raise
+        self._wakeup.set()
+        return job_id
+
+    @staticmethod
+    def _spool(spool_path, data):
+        """Write an attachment under a temporary name, fsync it and rename it into place, so a job never sees half a file"""
+        temp_path = spool_path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, spool_path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+    def status(self, job_id):
+        """Return the delivery status of a job as a dict, or None if unknown"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, subject, status, attempts, last_error, created_at, next_attempt_at, sent_at "
+                "FROM outbox WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def counts(self):
+        """Return the number of jobs in each state"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def start(self):
+        """Start the background delivery worker if it isn't running yet; it delivers while this process holds the lease"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._keeper = threading.Thread(target=self._keep_lease, name="outbox-lease", daemon=True)
+            self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+            self._keeper.start()
+            self._thread.start()
+            # Hand the lease over straight away on a clean exit rather than after it lapses
+            atexit.register(self.lease.release)
+        return self
+
+    def stop(self, timeout=None):
+        """Ask the worker to finish its current job and exit, then give up the lease"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in (self._thread, self._keeper):
+            if thread is not None:
+                thread.join(timeout)
+        self.lease.release()
+
+    def _keep_lease(self):
+        """Take the worker lease, or renew it, every third of its lifetime; a send may outlast the lease otherwise"""
+        while not self._stopping.is_set():
+            try:
+                if self.lease.acquire():
+                    self._wakeup.set()
+            except sqlite3.Error:
+                pass
+            self._stopping.wait(self.lease.ttl / 3)
+
+    def _claim_next(self):
+        """Atomically mark the oldest due job as sending and return it, if this process still holds the lease"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if not self.lease.holds(conn):
+                conn.execute("COMMIT")
+                return None
+            row = conn.execute(
+                "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (STATUS_QUEUED, time.time())
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE outbox SET status = ? WHERE id = ?", (STATUS_SENDING, row["id"]))
+            conn.execute("COMMIT")
+        return row
+
+    def _backoff(self, attempts):
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _process(self, row):
+        attachments = [tuple(item) for item in json.loads(row["attachments"])]
+        attempts = row["attempts"] + 1
+        try:
+            self.deliver(row["subject"], row["body"], attachments)
+        except Exception as e:
+            if attempts >= self.max_attempts:
+                status, next_attempt_at = STATUS_FAILED, row["next_attempt_at"]
+            else:
+                status, next_attempt_at = STATUS_QUEUED, time.time() + self._backoff(attempts)
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                    (status, attempts, str(e), next_attempt_at, row["id"])
+                )
+            if status == STATUS_FAILED:
+                self._remove_spool(attachments)
+            return
+
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = NULL, sent_at = ? WHERE id = ?",
+                (STATUS_SENT, attempts, time.time(), row["id"])
+            )
+        self._remove_spool(attachments)
+
+    def _release(self, row):
+        """Put a claimed job back on the queue after its processing broke off, so it isn't stuck as sending"""
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE outbox SET status = ?, next_attempt_at = ? WHERE id = ? AND status = ?",
+                    (STATUS_QUEUED, time.time() + self._backoff(row["attempts"] + 1), row["id"], STATUS_SENDING)
+                )
+        except Exception:
+            logger.exception("outbox worker: could not requeue job %s", row["id"])
+
+    def _remove_spool(self, attachments):
+        for _, spool_path in attachments:
+            try:
+                os.remove(spool_path)
+            except FileNotFoundError:
+                pass
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # The worker is started once per process, so nothing may end this loop but stop()
+            row = None
+            try:
+                row = self._claim_next() if self.lease.held() else None
+                if row is not None:
+                    self._process(row)
+                    continue
+            except Exception:
+                logger.exception("outbox worker: processing the queue failed, retrying")
+                if row is not None:
+                    self._release(row)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
@@ -0,0 +1,228 @@
+import atexit
+import collections
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+# Most recent timings kept per span for the percentiles
+WINDOW = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Seconds between the exports other processes read (see Profiler.export), and the age after
+# which an export counts as left behind by a process that is gone
+EXPORT_INTERVAL = 10.0
+EXPORT_MAX_AGE = 60.0
+
+
+def truthy(value):
+    """Whether a setting (string or TOML value) means "on": 1, true, yes or on"""
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+class _NullSpan:
+    """Span returned while profiling is off; entering and leaving it does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Stats:
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=window)
+
+
+def _quantile(ordered, q):
+    """Nearest-rank quantile of a sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Profiler:
+    """Wall-time spans by name, with totals and percentiles over a rolling window.
+
+    ``span(name)`` is a context manager and ``timed(name)`` a decorator. While
+    ``enabled`` is false both skip timing entirely: ``span`` returns a shared
+    do-nothing object and a ``timed`` function costs one attribute check, so
+    instrumentation can stay in the hot paths.
+    """
+
+    def __init__(self, enabled=False, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.started_at = time.time()
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._exporter = None
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def timed(self, name=None):
+        """Decorator recording each call of a function as a span (named after the function by default)"""
+        def decorate(fn):
+            span_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(span_name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _Stats(self.window)
+            stats.count += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.recent.append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """{span: {count, total_s, mean_ms, max_ms, p50_ms, p90_ms, p99_ms}}, slowest total first"""
+        with self._lock:
+            copied = [(name, s.count, s.total, s.max, sorted(s.recent)) for name, s in self._stats.items()]
+        result = {}
+        for name, count, total, longest, recent in sorted(copied, key=lambda row: -row[2]):
+            row = {"count": count, "total_s": total, "mean_ms": total / count * 1000, "max_ms": longest * 1000}
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}_ms"] = _quantile(recent, q) * 1000
+            result[name] = row
+        return result
+
+    def prometheus(self, prefix="club", process=None, others=None):
+        """The snapshot in Prometheus text exposition format, as a summary metric in seconds.
+
+        With ``process``, every sample carries a ``process`` label, and
+        ``others`` (``read_exports`` output) adds the timings other processes exported.
+        """
+        processes = {process: {"enabled": self.enabled, "spans": self.snapshot()}}
+        processes.update(others or {})
+        metric = f"{prefix}_span_seconds"
+        lines = [
+            f"# HELP {prefix}_profiling_enabled Whether span timing is switched on",
+            f"# TYPE {prefix}_profiling_enabled gauge",
+        ]
+        for name, export in processes.items():
+            labels = f'{{process="{_label(name)}"}}' if name is not None else ""
+            lines.append(f"{prefix}_profiling_enabled{labels} {int(bool(export['enabled']))}")
+        lines += [
+            f"# HELP {metric} Wall time of instrumented spans; quantiles over the last {self.window} calls",
+            f"# TYPE {metric} summary",
+        ]
+        for name, export in processes.items():
+            for span_name, row in export["spans"].items():
+                label = f'span="{_label(span_name)}"' + (f',process="{_label(name)}"' if name is not None else "")
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{label},quantile="{q}"}} {row[f"p{int(q * 100)}_ms"] / 1000:.9f}')
+                lines.append(f"{metric}_sum{{{label}}} {row['total_s']:.9f}")
+                lines.append(f"{metric}_count{{{label}}} {row['count']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, process):
+        """Write the snapshot to ``<path>/<process>.json``, where ``read_exports`` in another process finds it"""
+        os.makedirs(path, exist_ok=True)
+        data = {"enabled": self.enabled, "started_at": self.started_at, "updated_at": time.time(),
+                "spans": self.snapshot()}
+        target = os.path.join(path, f"{process}.json")
+        temp_path = f"{target}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, target)
+
+    def export_in_background(self, path, process, interval=EXPORT_INTERVAL):
+        """Export every ``interval`` seconds from a daemon thread while profiling is on; the file goes at exit"""
+        with self._lock:
+            if self._exporter is not None:
+                return
+            self._exporter = threading.Thread(target=self._export_loop, args=(path, process, interval),
+                                              name="profiler-export", daemon=True)
+        self._exporter.start()
+        atexit.register(_remove_export, path, process)
+
+    def _export_loop(self, path, process, interval):
+        while True:
+            if self.enabled:
+                with contextlib.suppress(OSError):
+                    self.export(path, process)
+            time.sleep(interval)
+
+
+def _remove_export(path, process):
+    with contextlib.suppress(OSError):
+        os.remove(os.path.join(path, f"{process}.json"))
+
+
+def read_exports(path, exclude=None, max_age=EXPORT_MAX_AGE):
+    """{process: export} for every process that exported timings to ``path`` in the last ``max_age`` seconds"""
+    exports = {}
+    try:
+        names = os.listdir(path)
+    except FileNotFoundError:
+        return exports
+    for name in sorted(names):
+        process, extension = os.path.splitext(name)
+        if extension != ".json" or process == exclude:
+            continue
+        try:
+            with open(os.path.join(path, name), encoding="utf-8") as f:
+                export = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if time.time() - export.get("updated_at", 0) <= max_age:
+            exports[process] = export
+    return exports
+
+
+# Process-wide profiler; main switches it on from the PROFILING secret as well
+PROFILER = Profiler(enabled=truthy(os.environ.get("PROFILING", "")))
+span = PROFILER.span
+timed = PROFILER.timed
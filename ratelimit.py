@@ -0,0 +1,105 @@
+import collections
+import contextlib
+import threading
+import time
+
+
+class SubmissionRejected(Exception):
+    """A submission turned away by admission control; the message is shown to the user as is"""
+
+    def __init__(self, message, retry_after, reason):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason  # "rate_limited" or "busy"
+
+
+class RateLimiter:
+    """Token buckets by key: each key may spend ``burst`` tokens at once, refilled at one per ``interval`` seconds.
+
+    Buckets are created on first use. Only the ``max_keys`` most recently used
+    are kept; a dropped bucket would have refilled by then anyway, unless the
+    limiter is under a flood of new keys, which is what the cap is for.
+    """
+
+    def __init__(self, burst, interval, max_keys=10000):
+        self.burst = burst
+        self.interval = interval
+        self.max_keys = max_keys
+        self._buckets = collections.OrderedDict()  # key -> (tokens, updated at)
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) / self.interval)
+
+    def acquire(self, key, cost=1):
+        """Take ``cost`` tokens from ``key``'s bucket; return 0 on success, else the seconds until there are enough"""
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens < cost:
+                return (cost - tokens) * self.interval
+            self._buckets[key] = (tokens - cost, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0
+
+    def refund(self, key, cost=1):
+        """Give back tokens taken by ``acquire`` for a request that was turned away later"""
+        now = time.monotonic()
+        with self._lock:
+            if key in self._buckets:
+                self._buckets[key] = (min(self.burst, self._tokens(key, now) + cost), now)
+
+
+class ConcurrencyGate:
+    """Caps how many submissions are processed at once.
+
+    Up to ``max_in_flight`` callers hold a slot; up to ``max_waiting`` more
+    queue for one, for at most ``timeout`` seconds each. Anyone else is turned
+    away straight away, so a spike can't pile up uploads in memory.
+    """
+
+    def __init__(self, max_in_flight, max_waiting, timeout):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold a processing slot for the duration of the ``with`` block, raising SubmissionRejected if none frees up"""
+        with self._cond:
+            if self.in_flight >= self.max_in_flight:
+                if self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise SubmissionRejected(
+                        "The server is busy with other submissions right now, so nothing was sent. "
+                        "Please try again in a minute.", self.timeout, "busy"
+                    )
+                self.waiting += 1
+                try:
+                    free = self._cond.wait_for(lambda: self.in_flight < self.max_in_flight, self.timeout)
+                finally:
+                    self.waiting -= 1
+                if not free:
+                    self.rejected += 1
+                    raise SubmissionRejected(
+                        "The server is still busy with other submissions, so nothing was sent. "
+                        "Please try again in a minute.", self.timeout, "busy"
+                    )
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {"in_flight": self.in_flight, "waiting": self.waiting, "rejected": self.rejected}
@@ -0,0 +1,353 @@
+import functools
+import html
+
+# Section layout of a new-club submission, shared by every output target.
+# Each entry is (kind, ...) and is compiled once per target into a list of
+# pre-rendered strings and small emitter functions.
+LEADER_FIELDS = (
+    ("Chinese Name", "chinese_name"),
+    ("English Name", "english_name"),
+    ("Class", "class"),
+    ("Email", "email"),
+    ("WeChat ID", "wechat"),
+)
+
+CLUB_INFO_LAYOUT = (
+    ("title", "CLUB INFORMATION"),
+    ("field", "Name", ("club_name", "club_emoji")),
+    ("field", "Category", ("club_category",)),
+    ("field", "Date of Establishment", ("establishment_date",)),
+    ("section", "LEADERSHIP"),
+    ("leaders", "presidents", "President"),
+    ("leaders", "vice_presidents", "Vice-President"),
+    ("section", "MEETING SCHEDULE"),
+    ("details", (
+        ("Frequency", "meeting_frequency"),
+        ("Day and Time", "meeting_day_time"),
+        ("Location", "meeting_location"),
+    )),
+    ("section", "REQUIREMENTS"),
+    ("bullets", "requirements"),
+    ("section", "LEARNING OBJECTIVES"),
+    ("bullets", "learning_objectives"),
+    ("section", "FOR WHOM"),
+    ("bullets", "for_whom"),
+    ("section", "EXAMPLES OF PAST ACTIVITIES/PROJECTS"),
+    ("bullets", "past_activities"),
+    ("section", "BENEFITS OF JOINING"),
+    ("numbered", "benefits"),
+)
+
+# Update keys that hold lists of leader dicts: (section label, label of each entry)
+UPDATE_LEADER_KEYS = {
+    "presidents": ("Presidents", "President"),
+    "vice_presidents": ("Vice-Presidents", "Vice-President"),
+}
+
+# Output targets. Every role is a format string whose last "{}" receives the
+# runtime value; any earlier "{}" receive labels known when compiling.
+TEXT = {
+    "title": "\n{}\n\n",
+    "section": "\n{}\n",
+    "field": "{}: {}\n",
+    "details_open": "",
+    "detail": "- {}: {}\n",
+    "details_close": "",
+    "leader_open": "\n{} {}:\n",
+    "leader_field": "- {}: {}\n",
+    "leader_close": "",
+    "list_open": "",
+    "bullet": "- {}\n",
+    "numbered": "{}. {}\n",
+    "list_close": "",
+    "group_open": "- {}:\n",
+    "group_leader_open": "  {} {}:\n",
+    "group_leader_field": "    {}: {}\n",
+    "group_leader_close": "",
+    "group_item": "    {}. {}\n",
+    "group_close": "",
+}
+
+HTML = {
+    "title": "<h1>{}</h1>\n",
+    "section": "<h2>{}</h2>\n",
+    "field": "<p><strong>{}:</strong> {}</p>\n",
+    "details_open": "<ul>\n",
+    "detail": "<li><strong>{}:</strong> {}</li>\n",
+    "details_close": "</ul>\n",
+    "leader_open": "<h3>{} {}</h3>\n<ul>\n",
+    "leader_field": "<li><strong>{}:</strong> {}</li>\n",
+    "leader_close": "</ul>\n",
+    "list_open": "<ul>\n",
+    "bullet": "<li>{}</li>\n",
+    "numbered": "<li value=\"{}\">{}</li>\n",
+    "list_close": "</ul>\n",
+    "group_open": "<li><strong>{}:</strong>\n<ul>\n",
+    "group_leader_open": "<li>{} {}\n<ul>\n",
+    "group_leader_field": "<li>{}: {}</li>\n",
+    "group_leader_close": "</ul></li>\n",
+    "group_item": "<li value=\"{}\">{}</li>\n",
+    "group_close": "</ul></li>\n",
+}
+
+MARKDOWN = {
+    "title": "# {}\n\n",
+    "section": "\n## {}\n",
+    "field": "**{}:** {}  \n",
+    "details_open": "\n",
+    "detail": "- **{}:** {}\n",
+    "details_close": "",
+    "leader_open": "\n### {} {}\n\n",
+    "leader_field": "- **{}:** {}\n",
+    "leader_close": "",
+    "list_open": "\n",
+    "bullet": "- {}\n",
+    "numbered": "{}. {}\n",
+    "list_close": "",
+    "group_open": "- **{}:**\n",
+    "group_leader_open": "  - {} {}:\n",
+    "group_leader_field": "    - {}: {}\n",
+    "group_leader_close": "",
+    "group_item": "    {}. {}\n",
+    "group_close": "",
+}
+
+# Placeholder used to split a role around its runtime value at compile time
+_GAP = "\x00"
+
+
+@functools.lru_cache(maxsize=None)
+def field_label(key):
+    """Human-readable label for a form key, e.g. 'meeting_day_time' -> 'Meeting Day Time'"""
+    return key.replace('_', ' ').title()
+
+
+class Renderer:
+    """Renders club submissions for one output target from precompiled templates.
+
+    The new-club layout is compiled once into a single Python function: static
+    text (headings, labels, separators) becomes string constants and every
+    list section becomes one comprehension, so rendering costs one pass over
+    the values and a single join. Update requests keep the order of the
+    submitted keys, so their pieces are pre-rendered per key and cached.
+    """
+
+    def __init__(self, roles, escape=None):
+        self.roles = roles
+        self.escape = escape
+        self._splits = {}
+        self.source = self._generate(CLUB_INFO_LAYOUT)
+        namespace = {}
+        exec(compile(self.source, f"<renderer {id(self):x}>", "exec"), {"esc": escape}, namespace)
+        self._club_info = namespace["render"]
+
+        self._update_head = (
+            self._split("title", "CLUB UPDATE REQUEST")[0] + self._split("field", "Club Identifier")[0],
+            self._split("field", "Club Identifier")[1]
+            + self._split("section", "Updated Fields:")[0]
+            + roles["details_open"]
+        )
+        self._update_tail = roles["details_close"]
+        self._background_line = self._format("detail", "Background Image", "[Attached if present]")
+        self._leader_groups = {
+            key: (self._split("group_open", group_label)[0],) + self._split("group_leader_open", entry_label)
+            for key, (group_label, entry_label) in UPDATE_LEADER_KEYS.items()
+        }
+        self._group_item = tuple(roles["group_item"].format(_GAP, _GAP).split(_GAP))
+        # Per-key pieces for update requests, filled in the first time a key is seen
+        self._detail_parts = _PartsCache(lambda key: self._split("detail", field_label(key)))
+        self._group_open = _PartsCache(lambda key: self._split("group_open", field_label(key))[0])
+        self._leader_field_parts = _PartsCache(lambda key: self._split("group_leader_field", field_label(key)))
+
+    def _escape(self, value):
+        return self.escape(value) if self.escape is not None else format(value)
+
+    def _format(self, role, label, value):
+        prefix, suffix = self._split(role, label)
+        return prefix + self._escape(value) + suffix
+
+    def _split(self, role, *labels):
+        """Pre-render a role with its static labels, returning (prefix, suffix) around the value"""
+        cache_key = (role,) + labels
+        if cache_key not in self._splits:
+            escaped = [self._escape(label) for label in labels]
+            if self.roles[role].count("{}") == len(labels):
+                self._splits[cache_key] = (self.roles[role].format(*escaped), "")
+            else:
+                self._splits[cache_key] = tuple(self.roles[role].format(*escaped, _GAP).split(_GAP))
+        return self._splits[cache_key]
+
+    # Code generation for the new-club layout
+
+    def _value(self, expr):
+        """Source for one interpolated value, escaped if the target needs it"""
+        return f'f"{{esc({expr})}}"' if self.escape is not None else f'f"{{{expr}}}"'
+
+    def _concat(self, *pieces):
+        """Source that concatenates literals and values into one string at compile time"""
+        return " ".join(piece if isinstance(piece, _Source) else repr(piece) for piece in pieces if piece != "")
+
+    def _generate(self, layout):
+        parts = []
+        for kind, *args in layout:
+            if kind in ("title", "section"):
+                parts.append(self._concat(self._split(kind, args[0])[0]))
+            elif kind == "field":
+                label, keys = args
+                prefix, suffix = self._split("field", label)
+                values = []
+                for n, key in enumerate(keys):
+                    if n:
+                        values.append(" ")
+                    values.append(_Source(self._value(f"data[{key!r}]")))
+                parts.append(self._concat(prefix, *values, suffix))
+            elif kind == "details":
+                pieces = [self.roles["details_open"]]
+                for label, key in args[0]:
+                    prefix, suffix = self._split("detail", label)
+                    pieces += [prefix, _Source(self._value(f"data[{key!r}]")), suffix]
+                pieces.append(self.roles["details_close"])
+                parts.append(self._concat(*pieces))
+            elif kind == "leaders":
+                key, label = args
+                open_prefix, open_suffix = self._split("leader_open", label)
+                pieces = [open_prefix, _Source('f"{i}"'), open_suffix]
+                for field_name, field_key in LEADER_FIELDS:
+                    prefix, suffix = self._split("leader_field", field_name)
+                    pieces += [prefix, _Source(self._value(f"leader[{field_key!r}]")), suffix]
+                pieces.append(self.roles["leader_close"])
+                parts.append(f'"".join([{self._concat(*pieces)} for i, leader in enumerate(data[{key!r}], 1)])')
+            elif kind == "bullets":
+                prefix, suffix = self._split("bullet")
+                item = self._concat(prefix, _Source(self._value("item")), suffix)
+                parts.append(self._concat(self.roles["list_open"]) or "''")
+                parts.append(f'"".join([{item} for item in data[{args[0]!r}] if item.strip()])')
+                parts.append(self._concat(self.roles["list_close"]) or "''")
+            elif kind == "numbered":
+                prefix, middle, suffix = self.roles["numbered"].format(_GAP, _GAP).split(_GAP)
+                item = self._concat(prefix, _Source('f"{i}"'), middle, _Source(self._value("item")), suffix)
+                parts.append(self._concat(self.roles["list_open"]) or "''")
+                parts.append(f'"".join([{item} for i, item in enumerate(data[{args[0]!r}], 1) if item.strip()])')
+                parts.append(self._concat(self.roles["list_close"]) or "''")
+            else:
+                raise ValueError(f"Unknown layout entry: {kind}")
+        parts = [part for part in parts if part not in ("", "''")]
+        body = ",\n        ".join(parts)
+        return f"def render(data):\n    return \"\".join((\n        {body},\n    ))\n"
+
+    def club_info(self, form_data):
+        """Render a new-club submission"""
+        return self._club_info(form_data)
+
+    def update_info(self, club_identifier, update_data):
+        """Render an update request; sections appear in the order of ``update_data``"""
+        escape = self.escape or format
+        roles = self.roles
+        detail_parts = self._detail_parts
+        leader_field_parts = self._leader_field_parts
+        item_prefix, item_middle, item_suffix = self._group_item
+
+        out = [self._update_head[0], escape(club_identifier), self._update_head[1]]
+        append = out.append
+        for key, value in update_data.items():
+            if key == "background_image":
+                append(self._background_line)
+            elif key in self._leader_groups:
+                group_open, entry_prefix, entry_suffix = self._leader_groups[key]
+                append(group_open)
+                for i, leader in enumerate(value, 1):
+                    append(f"{entry_prefix}{i}{entry_suffix}")
+                    for k, v in leader.items():
+                        prefix, suffix = leader_field_parts[k]
+                        append(f"{prefix}{escape(v)}{suffix}")
+                    append(roles["group_leader_close"])
+                append(roles["group_close"])
+            elif isinstance(value, list):
+                append(self._group_open[key])
+                append("".join([f"{item_prefix}{i}{item_middle}{escape(item)}{item_suffix}" for i, item in enumerate(value, 1)]))
+                append(roles["group_close"])
+            else:
+                prefix, suffix = detail_parts[key]
+                append(f"{prefix}{escape(value)}{suffix}")
+        append(self._update_tail)
+        return "".join(out)
+
+    def update_delta(self, club_identifier, delta):
+        """Render only what an update changes, given a delta from ``delta.diff_update``"""
+        escape = self.escape or format
+        out = [self._update_head[0], escape(club_identifier), self._update_head[1]]
+        append = out.append
+        for key, change in delta.items():
+            if key == "background_image":
+                append(self._background_line)
+            elif "new" in change:
+                prefix, suffix = self._detail_parts[key]
+                append(f"{prefix}{escape(_changed_value(change['old'], change['new']))}{suffix}")
+            else:
+                append(self._group_open[key])
+                for label, value in _change_lines(key, change):
+                    prefix, suffix = self._split("group_leader_field", label)
+                    append(f"{prefix}{escape(value)}{suffix}")
+                append(self.roles["group_close"])
+        append(self._update_tail)
+        return "".join(out)
+
+
+def _changed_value(old, new):
+    return f"{new} (was {old})" if old not in (None, "") else new
+
+
+def _leader_summary(leader):
+    return ", ".join(str(leader[key]) for _, key in LEADER_FIELDS if leader.get(key))
+
+
+def _change_lines(key, change):
+    """(label, text) lines describing the list or leader changes of one delta entry"""
+    if key in UPDATE_LEADER_KEYS:
+        entry_label = UPDATE_LEADER_KEYS[key][1]
+        field_names = dict((field_key, name) for name, field_key in LEADER_FIELDS)
+        for i, leader in change.get("removed", ()):
+            yield f"Removed {entry_label} {i + 1}", _leader_summary(leader)
+        for j, leader in change.get("added", ()):
+            yield f"Added {entry_label} {j + 1}", _leader_summary(leader)
+        for j, fields in change.get("changed", ()):
+            for field, values in fields.items():
+                yield (f"{entry_label} {j + 1} {field_names.get(field, field_label(field))}",
+                       _changed_value(values["old"], values["new"]))
+    else:
+        for i, item in change.get("removed", ()):
+            yield f"Removed #{i + 1}", item
+        for j, item in change.get("added", ()):
+            yield f"Added #{j + 1}", item
+
+
+class _PartsCache(dict):
+    """Dict that computes and remembers missing entries with a factory function"""
+
+    def __init__(self, factory):
+        super().__init__()
+        self.factory = factory
+
+    def __missing__(self, key):
+        value = self[key] = self.factory(key)
+        return value
+
+
+class _Source(str):
+    """A fragment of generated Python source, as opposed to a literal to be quoted"""
+
+
+def _escape_html(value):
+    return html.escape(format(value))
+
+
+RENDERERS = {
+    "text": Renderer(TEXT),
+    "html": Renderer(HTML, escape=_escape_html),
+    "markdown": Renderer(MARKDOWN),
+}
+
+
+def get_renderer(fmt="text"):
+    """Return the shared renderer for 'text', 'html' or 'markdown'"""
+    return RENDERERS[fmt]
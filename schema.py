@@ -0,0 +1,154 @@
+"""Shape of a club submission and the widget scaffolding of the form pages.
+
+Streamlit executes ``main.py`` afresh on every rerun, so anything defined
+there is rebuilt for every click. The constants and cached helpers here live
+in an imported module instead and are built once per process; ``main``
+re-exports them.
+"""
+import functools
+
+# Club categories
+CLUB_CATEGORIES = [
+    "Academic clubs",
+    "Arts and creative clubs",
+    "Community Service & Volunteering clubs",
+    "Cultural & Diversity clubs",
+    "Sport & fitness clubs",
+    "Language clubs",
+    "School Teams",
+    "Test Catgory"
+]
+
+# Shape of a club submission, shared by the form and programmatic submissions
+CLUB_TEXT_FIELDS = (
+    "club_name", "club_emoji", "club_category", "establishment_date",
+    "meeting_frequency", "meeting_day_time", "meeting_location"
+)
+LEADER_FIELDS = ("chinese_name", "english_name", "class", "email", "wechat")
+LEADER_LIMITS = {"presidents": (1, 5), "vice_presidents": (0, 5)}  # (min, max) people
+LIST_LIMITS = {
+    "requirements": 10,
+    "learning_objectives": 10,
+    "for_whom": 5,
+    "past_activities": 10,
+    "benefits": 10
+}
+
+# Widget scaffolding for the leader and list sections of both pages
+LEADER_LABELS = {"presidents": ("President", "President"), "vice_presidents": ("Vice-President", "VP")}  # (heading, label)
+LEADER_FIELD_LABELS = {
+    "chinese_name": "Chinese Name",
+    "english_name": "English Name",
+    "class": "Class [Grade/Class]",
+    "email": "Email Address",
+    "wechat": "WeChat ID"
+}
+LIST_SECTIONS = {  # key: (subheader, item title, count label, help text)
+    "requirements": ("Requirements", "Requirement", "Number of Requirements",
+                     "e.g. No prerequisite / all students can join / Students with a GPA of > 3.8"),
+    "learning_objectives": ("Learning Objectives", "Learning Objective", "Number of Learning Objectives",
+                            "e.g. Learn about image processing"),
+    "for_whom": ("For Whom", "For Whom", "Number of For Whom Items",
+                 "Ideal for students who: (e.g. love math, are passionate about art, enjoy outdoor activities, etc.)"),
+    "past_activities": ("Examples of Past Activities/Projects", "Activity", "Number of Past Activities",
+                        "Please write in full sentences."),
+    "benefits": ("Benefits of Joining", "Benefit", "Number of Benefits", "Please write in full sentences.")
+}
+MEETING_FIELDS = ("meeting_frequency", "meeting_day_time", "meeting_location")
+
+# Sections of the update page: key -> checkbox label
+UPDATE_SECTIONS = {
+    "club_name": "Club Name",
+    "club_emoji": "Club Emoji",
+    "club_category": "Club Category",
+    "establishment_date": "Date of Establishment",
+    "presidents": "Presidents",
+    "vice_presidents": "Vice-Presidents",
+    "meeting_schedule": "Meeting Schedule",
+    "requirements": "Requirements",
+    "learning_objectives": "Learning Objectives",
+    "for_whom": "For Whom",
+    "past_activities": "Past Activities/Projects",
+    "benefits": "Benefits of Joining",
+    "background_image": "Background Picture"
+}
+UPDATE_TEXT_LABELS = {
+    "club_name": "New Club Name (leave blank to keep unchanged)",
+    "club_emoji": "New Club Emoji (leave blank to keep unchanged)",
+    "meeting_frequency": "New Frequency of Meetings (leave blank to keep unchanged)",
+    "meeting_day_time": "New Day and Time of Meetings (leave blank to keep unchanged)",
+    "meeting_location": "New Location of Meetings (leave blank to keep unchanged)"
+}
+
+# Example club data
+EXAMPLE_CLUB = {
+    "club_name": "Coding Club",
+    "club_emoji": "💻",
+    "club_category": "Academic clubs",
+    "establishment_date": "September 15, 2022",
+    "presidents": [
+        {
+            "chinese_name": "张明",
+            "english_name": "Ming Zhang",
+            "class": "G12.1",
+            "email": "ming.zhang@example.com",
+            "wechat": "mingz2022"
+        }
+    ],
+    "vice_presidents": [
+        {
+            "chinese_name": "李华",
+            "english_name": "Hua Li",
+            "class": "G11.1",
+            "email": "hua.li@example.com",
+            "wechat": "huali_code"
+        }
+    ],
+    "meeting_frequency": "Weekly",
+    "meeting_day_time": "Wednesday P8",
+    "meeting_location": "Computer Lab 2",
+    "requirements": [
+        "Basic programming knowledge is helpful but not required",
+        "Interest in learning to code",
+        "Commitment to attend regular meetings"
+    ],
+    "learning_objectives": [
+        "Learn programming fundamentals in Python and JavaScript",
+        "Build web applications and games",
+        "Understand software development principles"
+    ],
+    "for_whom": [
+        "Students interested in computer science and programming",
+        "Those who want to pursue careers in technology",
+        "Creative problem solvers who enjoy logical thinking"
+    ],
+    "past_activities": [
+        "Developed a school event management app",
+        "Participated in the regional coding competition",
+        "Hosted a workshop on building personal websites"
+    ],
+    "benefits": [
+        "Gain valuable programming skills relevant to many careers",
+        "Build an impressive portfolio of coding projects",
+        "Connect with like-minded peers and industry professionals"
+    ]
+}
+
+
+@functools.lru_cache(maxsize=None)
+def leader_inputs(role, index, key_prefix=""):
+    """Heading and (field, label, widget key) of each input for one leader, split into the two columns"""
+    heading, label = LEADER_LABELS[role]
+    inputs = tuple(
+        (field, f"{LEADER_FIELD_LABELS[field]} ({label} {index+1})", f"{key_prefix}{role}_{index}_{field}")
+        for field in LEADER_FIELDS
+    )
+    return f"#### {heading} {index+1}", inputs[:3], inputs[3:]
+
+
+@functools.lru_cache(maxsize=None)
+def list_inputs(key, count, key_prefix=""):
+    """(label, widget key) of each text area in a list section"""
+    title = LIST_SECTIONS[key][1]
+    return tuple((f"{title} {i+1}", f"{key_prefix}{key}_{i}") for i in range(count))
+
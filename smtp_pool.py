@@ -0,0 +1,166 @@
+import collections
+import contextlib
+import smtplib
+import threading
+import time
+
+
+class _SMTP(smtplib.SMTP):
+    """``smtplib.SMTP`` that notes when a DATA command was sent, so a lost connection can be told apart from a sent message"""
+
+    data_sent = False
+
+    def putcmd(self, cmd, args=""):
+        if cmd.lower() == "data":
+            self.data_sent = True
+        super().putcmd(cmd, args)
+
+
+class _PooledConnection:
+    """An authenticated SMTP session plus the bookkeeping the pool needs"""
+
+    def __init__(self, server):
+        self.server = server
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """Process-wide pool of logged-in SMTP sessions shared by every sender.
+
+    Connections are handed out most-recently-used first. A connection that sat
+    idle longer than ``max_idle`` seconds, or that already carried
+    ``max_messages`` messages, is closed instead of reused, and idle
+    connections are checked with NOOP before being handed out. ``stats()``
+    reports hits (reused sessions) and misses (fresh connect + login) so the
+    pool can be sized.
+    """
+
+    def __init__(self, host, port, user, password, size=4, max_idle=60.0, max_messages=100,
+                 noop_after=5.0, timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self.noop_after = noop_after
+        self.timeout = timeout
+
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._counters = collections.Counter()
+
+    def _count(self, key):
+        with self._lock:
+            self._counters[key] += 1
+
+    def _open(self):
+        server = _SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        return _PooledConnection(server)
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _is_alive(self, conn):
+        try:
+            return conn.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self):
+        """Take a usable connection from the idle list, or open a new one"""
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                break
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for > self.max_idle:
+                self._count("expired")
+                self._close(conn.server)
+                continue
+            if idle_for > self.noop_after and not self._is_alive(conn):
+                self._count("reconnects")
+                conn.server.close()
+                continue
+            self._count("hits")
+            conn.server.data_sent = False
+            return conn
+        self._count("misses")
+        return self._open()
+
+    def _checkin(self, conn):
+        conn.messages += 1
+        conn.last_used = time.monotonic()
+        if conn.messages >= self.max_messages:
+            self._count("retired")
+            self._close(conn.server)
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow an authenticated ``smtplib.SMTP`` for one message"""
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                yield conn.server
+            except Exception:
+                # The session may be mid-transaction or dead, so never reuse it
+                self._count("discarded")
+                conn.server.close()
+                raise
+            self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def run(self, fn):
+        """Call ``fn(server)`` on a pooled session, retrying once on a fresh session if the server hung up.
+
+        Only a hang-up before DATA is retried: once the message went out the
+        server may have accepted it, and sending it again would deliver it twice.
+        """
+        used = None
+        try:
+            with self.connection() as server:
+                used = server
+                return fn(server)
+        except smtplib.SMTPServerDisconnected:
+            if used is not None and used.data_sent:
+                raise
+            self._count("reconnects")
+            with self.connection() as server:
+                return fn(server)
+
+    def send_message(self, msg):
+        """Send an ``email.message.Message`` on a pooled session"""
+        return self.run(lambda server: server.send_message(msg))
+
+    def stats(self):
+        """Return pool counters and current idle connection count"""
+        with self._lock:
+            stats = {key: self._counters[key] for key in ("hits", "misses", "reconnects", "expired", "retired", "discarded")}
+            stats["idle"] = len(self._idle)
+        stats["size"] = self.size
+        return stats
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = list(self._idle), collections.deque()
+        for conn in idle:
+            self._close(conn.server)
@@ -0,0 +1,482 @@
+import contextlib
+import datetime
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from delta import LEADER_ROLES, apply_delta
+from models import Club
+
+# Submission kinds
+KIND_NEW = "new"
+KIND_UPDATE = "update"
+
+# Things a club's current record can lack, tracked for the admin page
+GAP_VICE_PRESIDENTS = "vice_presidents"
+GAP_BACKGROUND_IMAGE = "background_image"
+GAPS = (GAP_VICE_PRESIDENTS, GAP_BACKGROUND_IMAGE)
+
+
+def name_key(name):
+    """Case- and whitespace-insensitive form of a club name used for lookups"""
+    return " ".join(str(name).split()).casefold()
+
+
+def _json_default(value):
+    """Store dates as the form writes them and anything else (an uploaded file) as a flag"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime("%B %d, %Y")
+    return True
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _day(timestamp):
+    """Local calendar day of a timestamp, as SQLite's date(..., 'unixepoch', 'localtime') writes it"""
+    return datetime.date.fromtimestamp(timestamp).isoformat()
+
+
+def club_gaps(data):
+    """The GAPS a club record has: no vice-president filled in, no background picture"""
+    gaps = []
+    if not any(any(str(value).strip() for value in leader.values())
+               for leader in data.get("vice_presidents") or [] if isinstance(leader, dict)):
+        gaps.append(GAP_VICE_PRESIDENTS)
+    if not data.get("background_image"):
+        gaps.append(GAP_BACKGROUND_IMAGE)
+    return gaps
+
+
+def _counter_keys(category, gaps):
+    """The counters one club adds to: the club total, its category and each gap it has"""
+    return {"clubs", f"category:{category or ''}"} | {f"missing:{gap}" for gap in gaps}
+
+
+class _Write:
+    """One queued write: a function run inside the batch transaction, plus its outcome"""
+
+    __slots__ = ("apply", "result", "error", "done")
+
+    def __init__(self, apply):
+        self.apply = apply
+        self.result = None
+        self.error = None
+        self.done = False
+
+
+class SubmissionStore:
+    """Persistent record of every club submission and the current state of each club.
+
+    Each club gets a stable id on its first new-club submission; later
+    submissions under the same name (or any earlier name after a rename) and
+    update requests naming the club or its id attach to that id. The
+    ``clubs`` table keeps the current merged record, so "current state of club
+    X" is one primary-key or index lookup however long the history grows.
+
+    Writes use group commit: concurrent callers queue their writes and
+    whichever arrives first commits everything queued in a single
+    transaction, each write in its own savepoint so one bad record can't
+    roll back the rest.
+
+    The same transactions keep the admin statistics up to date: counters of
+    clubs per category, of clubs with each gap and of submissions per kind,
+    and submissions per kind per day. Reading them costs the same however
+    long the history grows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._pending = []
+        self._committing = False
+
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS clubs (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    name_key TEXT NOT NULL,
+                    emoji TEXT,
+                    category TEXT,
+                    data TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS clubs_name ON clubs (name_key);
+                CREATE INDEX IF NOT EXISTS clubs_category ON clubs (category, name_key);
+                CREATE INDEX IF NOT EXISTS clubs_updated ON clubs (updated_at);
+
+                -- Every name a club has been submitted under, so renamed clubs still resolve
+                CREATE TABLE IF NOT EXISTS club_names (
+                    name_key TEXT PRIMARY KEY,
+                    club_id TEXT NOT NULL
+                );
+
+                -- Current leaders of each club, one row per person
+                CREATE TABLE IF NOT EXISTS club_leaders (
+                    club_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    email_key TEXT NOT NULL,
+                    PRIMARY KEY (club_id, role, position)
+                );
+                CREATE INDEX IF NOT EXISTS club_leaders_email ON club_leaders (email_key);
+
+                CREATE TABLE IF NOT EXISTS submissions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    club_id TEXT,
+                    kind TEXT NOT NULL,
+                    club_identifier TEXT,
+                    data TEXT NOT NULL,
+                    job_id TEXT,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS submissions_club ON submissions (club_id, id);
+
+                -- Statistics, maintained by every write
+                CREATE TABLE IF NOT EXISTS stats_counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS stats_daily (
+                    day TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (day, kind)
+                );
+                CREATE TABLE IF NOT EXISTS club_gaps (
+                    gap TEXT NOT NULL,
+                    club_id TEXT NOT NULL,
+                    name_key TEXT NOT NULL,
+                    PRIMARY KEY (gap, club_id)
+                );
+                CREATE INDEX IF NOT EXISTS club_gaps_name ON club_gaps (gap, name_key);
+                CREATE INDEX IF NOT EXISTS club_gaps_club ON club_gaps (club_id);
+            """)
+            conn.execute("BEGIN IMMEDIATE")
+            # A database written before the statistics existed gets them from one full scan
+            if conn.execute("SELECT 1 FROM stats_counters WHERE name = 'built'").fetchone() is None:
+                self._build_stats(conn)
+            conn.execute("COMMIT")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Yield this thread's connection, kept open so each call skips connect and WAL checkpoint costs"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    # Writes
+
+    def _write(self, functions):
+        """Run write functions in the next batch transaction and return their results"""
+        writes = [_Write(fn) for fn in functions]
+        with self._cond:
+            self._pending.extend(writes)
+            while self._committing and not all(w.done for w in writes):
+                self._cond.wait()
+            if not all(w.done for w in writes):
+                self._committing = True
+                batch, self._pending = self._pending, []
+            else:
+                batch = None
+        if batch is not None:
+            try:
+                self._commit(batch)
+            finally:
+                with self._cond:
+                    self._committing = False
+                    self._cond.notify_all()
+        for w in writes:
+            if w.error is not None:
+                raise w.error
+        return [w.result for w in writes]
+
+    def _commit(self, batch):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for w in batch:
+                    conn.execute("SAVEPOINT write")
+                    try:
+                        w.result = w.apply(conn, now)
+                        conn.execute("RELEASE write")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write")
+                        conn.execute("RELEASE write")
+                        w.error = e
+                conn.execute("COMMIT")
+        except Exception as e:
+            for w in batch:
+                w.error = w.error or e
+        for w in batch:
+            w.done = True
+
+    def _resolve(self, conn, identifier):
+        if not isinstance(identifier, str) or not identifier.strip():
+            return None
+        row = conn.execute("SELECT id FROM clubs WHERE id = ?", (identifier.strip(),)).fetchone()
+        if row is None:
+            row = conn.execute("SELECT club_id FROM club_names WHERE name_key = ?", (name_key(identifier),)).fetchone()
+        return row[0] if row else None
+
+    def _save_club(self, conn, club_id, data, text, now):
+        """Write the current record of a club (``text`` is ``data`` as JSON) and refresh its name and leader indexes"""
+        key = name_key(data.get("club_name", ""))
+        self._track_gaps(conn, club_id, key, data.get("club_category"), club_gaps(data))
+        conn.execute(
+            "INSERT INTO clubs (id, name, name_key, emoji, category, data, version, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET name = excluded.name, name_key = excluded.name_key, "
+            "emoji = excluded.emoji, category = excluded.category, data = excluded.data, "
+            "version = clubs.version + 1, updated_at = excluded.updated_at",
+            (club_id, data.get("club_name", ""), key, data.get("club_emoji"), data.get("club_category"),
+             text, now, now)
+        )
+        if key:
+            conn.execute("INSERT OR REPLACE INTO club_names (name_key, club_id) VALUES (?, ?)", (key, club_id))
+        conn.execute("DELETE FROM club_leaders WHERE club_id = ?", (club_id,))
+        conn.executemany(
+            "INSERT INTO club_leaders (club_id, role, position, email_key) VALUES (?, ?, ?, ?)",
+            [
+                (club_id, role, position, leader.get("email", "").strip().casefold())
+                for role in LEADER_ROLES
+                for position, leader in enumerate(data.get(role) or [])
+            ]
+        )
+
+    def _log(self, conn, club_id, kind, club_identifier, text, job_id, now):
+        conn.execute(
+            "INSERT INTO submissions (club_id, kind, club_identifier, data, job_id, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (club_id, kind, club_identifier, text, job_id, now)
+        )
+        self._count(conn, {f"submissions:{kind}": 1})
+        conn.execute(
+            "INSERT INTO stats_daily (day, kind, count) VALUES (?, ?, 1) "
+            "ON CONFLICT (day, kind) DO UPDATE SET count = count + 1",
+            (_day(now), kind)
+        )
+
+    @staticmethod
+    def _count(conn, changes):
+        conn.executemany(
+            "INSERT INTO stats_counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            [(name, amount) for name, amount in changes.items() if amount]
+        )
+
+    def _track_gaps(self, conn, club_id, key, category, gaps):
+        """Move a club's contribution to the counters from its previous record to this one"""
+        old = conn.execute("SELECT category FROM clubs WHERE id = ?", (club_id,)).fetchone()
+        old_keys = set()
+        if old is not None:
+            old_gaps = [row[0] for row in conn.execute("SELECT gap FROM club_gaps WHERE club_id = ?", (club_id,))]
+            old_keys = _counter_keys(old["category"], old_gaps)
+        new_keys = _counter_keys(category, gaps)
+        self._count(conn, {**{name: -1 for name in old_keys - new_keys}, **{name: 1 for name in new_keys - old_keys}})
+        conn.execute("DELETE FROM club_gaps WHERE club_id = ?", (club_id,))
+        conn.executemany(
+            "INSERT INTO club_gaps (gap, club_id, name_key) VALUES (?, ?, ?)", [(gap, club_id, key) for gap in gaps]
+        )
+
+    def _build_stats(self, conn):
+        """Compute every statistic from the clubs and submissions tables"""
+        conn.execute("DELETE FROM stats_counters")
+        conn.execute("DELETE FROM stats_daily")
+        conn.execute("DELETE FROM club_gaps")
+        counters = {"built": 1}
+        for club_id, key, category, text in conn.execute("SELECT id, name_key, category, data FROM clubs").fetchall():
+            gaps = club_gaps(json.loads(text))
+            for name in _counter_keys(category, gaps):
+                counters[name] = counters.get(name, 0) + 1
+            conn.executemany(
+                "INSERT INTO club_gaps (gap, club_id, name_key) VALUES (?, ?, ?)", [(gap, club_id, key) for gap in gaps]
+            )
+        for kind, count in conn.execute("SELECT kind, COUNT(*) FROM submissions GROUP BY kind"):
+            counters[f"submissions:{kind}"] = count
+        self._count(conn, counters)
+        conn.execute(
+            "INSERT INTO stats_daily (day, kind, count) "
+            "SELECT date(created_at, 'unixepoch', 'localtime'), kind, COUNT(*) FROM submissions GROUP BY 1, 2"
+        )
+
+    def _new_club_write(self, form_data, job_id):
+        # Encode outside the transaction so the batch holds the write lock for less time
+        text = _dumps(form_data)
+
+        def apply(conn, now):
+            club_id = self._resolve(conn, form_data.get("club_name")) or uuid.uuid4().hex[:12]
+            self._save_club(conn, club_id, form_data, text, now)
+            self._log(conn, club_id, KIND_NEW, form_data.get("club_name"), text, job_id, now)
+            return club_id
+        return apply
+
+    def _update_write(self, club_identifier, delta, job_id):
+        text = _dumps(delta)
+        data = json.loads(text)
+
+        def apply(conn, now):
+            club_id = self._resolve(conn, club_identifier)
+            if club_id is not None:
+                row = conn.execute("SELECT data FROM clubs WHERE id = ?", (club_id,)).fetchone()
+                merged = apply_delta(json.loads(row["data"]), data)
+                self._save_club(conn, club_id, merged, _dumps(merged), now)
+            self._log(conn, club_id, KIND_UPDATE, club_identifier, text, job_id, now)
+            return club_id
+        return apply
+
+    def record_club(self, form_data, job_id=None):
+        """Store a new-club submission and return the club's stable id"""
+        return self._write([self._new_club_write(form_data, job_id)])[0]
+
+    def record_update(self, club_identifier, delta, job_id=None):
+        """Store an update request as a delta from ``delta.diff_update`` and apply it to the club.
+
+        Returns the club id, or None if the club is unknown (the request is still logged).
+        """
+        return self._write([self._update_write(club_identifier, delta, job_id)])[0]
+
+    def record_clubs(self, submissions):
+        """Store many new-club submissions, given as (form_data, job_id) pairs, in one transaction"""
+        return self._write([self._new_club_write(form_data, job_id) for form_data, job_id in submissions])
+
+    # Reads
+
+    def resolve(self, identifier):
+        """Return the club id for a club id or any name the club has had, or None"""
+        with self._connect() as conn:
+            return self._resolve(conn, identifier)
+
+    def get(self, club_id):
+        """Return the current record of a club as a dict with id, version and data, or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM clubs WHERE id = ?", (club_id,)).fetchone()
+        if row is None:
+            return None
+        club = dict(row)
+        club["data"] = json.loads(club["data"])
+        del club["name_key"]
+        return club
+
+    def records(self, since=None):
+        """Yield the current record of every club, as ``get`` returns them, or of those written at or after ``since``"""
+        sql = "SELECT id, name, emoji, category, data, version, created_at, updated_at FROM clubs"
+        with self._connect() as conn:
+            if since is None:
+                rows = conn.execute(sql).fetchall()
+            else:
+                rows = conn.execute(sql + " WHERE updated_at >= ?", (since,)).fetchall()
+        for row in rows:
+            yield dict(row, data=json.loads(row["data"]))
+
+    def load_clubs(self):
+        """Return {club id: models.Club} for every club, compact enough to keep thousands in memory"""
+        return {club["id"]: Club.from_dict(club["data"]) for club in self.records()}
+
+    def current(self, identifier):
+        """Return the current ``form_data`` of the club named or identified by ``identifier``, or None"""
+        club = self.get(self.resolve(identifier))
+        return club["data"] if club else None
+
+    def _summaries(self, sql, params=()):
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(
+                "SELECT id, name, emoji, category, version, updated_at FROM clubs " + sql, params
+            )]
+
+    def clubs(self):
+        """Summaries (id, name, emoji, category, version, updated_at) of every club, by name"""
+        return self._summaries("ORDER BY name_key")
+
+    def find_by_name(self, name):
+        """Clubs currently or previously called ``name``"""
+        club_id = self.resolve(name)
+        return self._summaries("WHERE id = ?", (club_id,)) if club_id else []
+
+    def find_by_category(self, category):
+        return self._summaries("WHERE category = ? ORDER BY name_key", (category,))
+
+    def find_by_leader_email(self, email):
+        """Clubs that currently list a leader with this email address"""
+        return self._summaries(
+            "WHERE id IN (SELECT club_id FROM club_leaders WHERE email_key = ?) ORDER BY name_key",
+            (email.strip().casefold(),)
+        )
+
+    def history(self, club_id, limit=50):
+        """Most recent submissions for a club, newest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM submissions WHERE club_id = ? ORDER BY id DESC LIMIT ?", (club_id, limit)
+            ).fetchall()
+        return [dict(row, data=json.loads(row["data"])) for row in rows]
+
+    def _counters(self, conn):
+        return {name: value for name, value in conn.execute("SELECT name, value FROM stats_counters")}
+
+    def counts(self):
+        """Number of clubs and of stored submissions"""
+        with self._connect() as conn:
+            counters = self._counters(conn)
+        return {
+            "clubs": counters.get("clubs", 0),
+            "submissions": counters.get(f"submissions:{KIND_NEW}", 0) + counters.get(f"submissions:{KIND_UPDATE}", 0),
+        }
+
+    def stats(self, days=30, listed=50, today=None):
+        """Statistics for the admin page, read from the maintained aggregates.
+
+        Returns a dict with ``clubs``, ``categories`` ({category: clubs}),
+        ``submissions`` ({kind: count}), ``daily`` (one (day, {kind: count})
+        pair for each of the last ``days`` days, oldest first) and ``gaps``
+        ({gap: (number of clubs, names of the first ``listed`` by name)}).
+        """
+        today = today or datetime.date.today()
+        first = today - datetime.timedelta(days=days - 1)
+        with self._connect() as conn:
+            counters = self._counters(conn)
+            per_day = {}
+            for day, kind, count in conn.execute(
+                "SELECT day, kind, count FROM stats_daily WHERE day >= ? AND day <= ?",
+                (first.isoformat(), today.isoformat())
+            ):
+                per_day.setdefault(day, {})[kind] = count
+            gaps = {
+                gap: (counters.get(f"missing:{gap}", 0), [row[0] for row in conn.execute(
+                    "SELECT clubs.name FROM club_gaps JOIN clubs ON clubs.id = club_gaps.club_id "
+                    "WHERE club_gaps.gap = ? ORDER BY club_gaps.name_key LIMIT ?", (gap, listed)
+                )])
+                for gap in GAPS
+            }
+        daily = []
+        for n in range(days):
+            day = (first + datetime.timedelta(days=n)).isoformat()
+            daily.append((day, {kind: per_day.get(day, {}).get(kind, 0) for kind in (KIND_NEW, KIND_UPDATE)}))
+        return {
+            "clubs": counters.get("clubs", 0),
+            "categories": {
+                name[len("category:"):]: value for name, value in counters.items()
+                if name.startswith("category:") and value
+            },
+            "submissions": {kind: counters.get(f"submissions:{kind}", 0) for kind in (KIND_NEW, KIND_UPDATE)},
+            "daily": daily,
+            "gaps": gaps,
+        }
+
@@ -0,0 +1,292 @@
+import re
+import unicodedata
+
+from delta import LEADER_ROLES
+from renderer import field_label
+from schema import (
+    CLUB_CATEGORIES,
+    CLUB_TEXT_FIELDS,
+    LEADER_FIELDS,
+    LEADER_LABELS,
+    LEADER_LIMITS,
+    LIST_LIMITS,
+    LIST_SECTIONS,
+)
+
+# Longest accepted list item and club name, in characters
+LIST_ITEM_MAX_LENGTH = 500
+CLUB_NAME_MAX_LENGTH = 100
+
+_EMAIL = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s.]{2,}")
+# Grade 6-12, then the class number, as in EXAMPLE_CLUB ("G12.1"); "G12/1" is accepted too
+_CLASS = re.compile(r"G(?:[6-9]|1[0-2])[./]\d{1,2}", re.IGNORECASE)
+# WeChat IDs are 6-20 letters, digits, "_" or "-" starting with a letter; a phone number also finds an account
+_WECHAT = re.compile(r"[A-Za-z][-_A-Za-z0-9]{5,19}|\+?\d{6,15}")
+# An emoji is symbols plus joiners, variation selectors and skin-tone modifiers
+_EMOJI_CATEGORIES = frozenset({"So", "Sk", "Mn", "Me", "Cf"})
+# Line breaks and other control characters; single-line fields end up in email headers
+_CONTROL = re.compile(r"[\x00-\x1f\x7f]")
+
+
+def _is_emoji(value):
+    return len(value) <= 16 and any(unicodedata.category(c) == "So" for c in value) \
+        and all(unicodedata.category(c) in _EMOJI_CATEGORIES for c in value)
+
+
+# Rules checked on single non-blank values: kind -> (check, message template)
+RULES = {
+    "email": (_EMAIL.fullmatch, "{label}: '{value}' is not a valid email address."),
+    "class": (_CLASS.fullmatch, "{label}: class '{value}' should look like G12.1 (grade, then class number)."),
+    "wechat": (_WECHAT.fullmatch,
+               "{label}: '{value}' is not a WeChat ID (6-20 letters, digits, _ or -, starting with a letter) "
+               "or phone number."),
+    "emoji": (_is_emoji, "{label}: '{value}' should be an emoji, e.g. 💻."),
+    "club_name": (lambda value: len(value) <= CLUB_NAME_MAX_LENGTH,
+                  f"{{label}}: keep it to {CLUB_NAME_MAX_LENGTH} characters or fewer."),
+    "list_item": (lambda value: len(value) <= LIST_ITEM_MAX_LENGTH,
+                  f"{{label}}: keep it to {LIST_ITEM_MAX_LENGTH} characters or fewer."),
+    "single_line": (lambda value: not _CONTROL.search(value),
+                    "{label}: remove the line breaks and other control characters."),
+}
+# The pattern rules inverted, to pick every failing line out of a newline-joined column at once
+_INVALID_LINES = {
+    kind: re.compile(rf"^(?!(?:{pattern.pattern})$).*$", re.MULTILINE | pattern.flags)
+    for kind, pattern in (("email", _EMAIL), ("class", _CLASS), ("wechat", _WECHAT))
+}
+# Leader fields with a rule, and how messages name them
+LEADER_RULES = {"email": "email", "class": "class", "wechat": "wechat"}
+LEADER_RULE_LABELS = {"email": "Email", "class": "Class", "wechat": "WeChat ID",
+                      "chinese_name": "Chinese Name", "english_name": "English Name"}
+# Fields typed on one line; club_category is checked against CLUB_CATEGORIES instead
+SINGLE_LINE_FIELDS = tuple(key for key in CLUB_TEXT_FIELDS if key != "club_category")
+
+
+def check(kind, value):
+    """Whether a non-blank value passes the rule ``kind``"""
+    return bool(RULES[kind][0](value))
+
+
+def message(kind, label, value):
+    return RULES[kind][1].format(label=label, value=value)
+
+
+def leader_label(role, index):
+    return f"{LEADER_LABELS[role][0]} {index + 1}"
+
+
+def _values(record):
+    """(kind, value, where) for every non-blank value of a record that a rule applies to.
+
+    ``where`` is (section, index, field) and is only turned into a key or
+    label when needed.
+    """
+    for key in SINGLE_LINE_FIELDS:
+        value = record.get(key)
+        if isinstance(value, str) and value.strip():
+            # Unstripped, so a trailing line break counts too
+            yield "single_line", value, (key, None, None)
+    for key, kind in (("club_name", "club_name"), ("club_emoji", "emoji")):
+        value = record.get(key)
+        if isinstance(value, str) and value.strip():
+            yield kind, value.strip(), (key, None, None)
+    for role in LEADER_ROLES:
+        leaders = record.get(role)
+        if not isinstance(leaders, list):
+            continue
+        for i, leader in enumerate(leaders):
+            if not isinstance(leader, dict):
+                continue
+            for field in LEADER_FIELDS:
+                value = leader.get(field)
+                if isinstance(value, str) and value.strip():
+                    yield "single_line", value, (role, i, field)
+            for field, kind in LEADER_RULES.items():
+                value = leader.get(field)
+                if isinstance(value, str) and value.strip():
+                    yield kind, value.strip(), (role, i, field)
+    for key in LIST_LIMITS:
+        items = record.get(key)
+        if not isinstance(items, list):
+            continue
+        for i, item in enumerate(items):
+            if isinstance(item, str) and item.strip():
+                yield "list_item", item.strip(), (key, i, None)
+
+
+def _key(where, key_prefix=""):
+    section, index, field = where
+    if index is None:
+        return key_prefix + section
+    return f"{key_prefix}{section}_{index}_{field}" if field else f"{key_prefix}{section}_{index}"
+
+
+def _label(where):
+    section, index, field = where
+    if section in LEADER_ROLES:
+        return f"{leader_label(section, index)} {LEADER_RULE_LABELS[field]}"
+    if index is None:
+        return field_label(section)
+    return f"{LIST_SECTIONS[section][1]} {index + 1}"
+
+
+def field_checks(record, key_prefix=""):
+    """(key, kind, value, label) for every non-blank value of a record that a rule applies to.
+
+    Keys are the form pages' widget keys (``presidents_0_email``,
+    ``update_benefits_2``), so a validator can remember each widget's last result.
+    """
+    return [(_key(where, key_prefix), kind, value, _label(where)) for kind, value, where in _values(record)]
+
+
+class FieldValidator:
+    """Remembers the last value and result of each field, so a rerun only re-checks what changed.
+
+    Keep one per browser session: the form pages re-validate on every
+    section rerun and submit, and most fields are unchanged each time.
+    """
+
+    def __init__(self):
+        self._last = {}  # (key, kind) -> (value, passed)
+        self.checked = 0
+        self.reused = 0
+
+    def check(self, key, kind, value):
+        last = self._last.get((key, kind))
+        if last is not None and last[0] == value:
+            self.reused += 1
+            return last[1]
+        self.checked += 1
+        passed = check(kind, value)
+        self._last[key, kind] = (value, passed)
+        return passed
+
+    def messages(self, checks):
+        """Messages for the failing entries of ``field_checks`` output"""
+        return [message(kind, label, value) for key, kind, value, label in checks if not self.check(key, kind, value)]
+
+
+def _leaders_shape(key, leaders, min_count, max_count):
+    if not isinstance(leaders, list) or not min_count <= len(leaders) <= max_count:
+        return [f"'{key}' must be a list of {min_count} to {max_count} people."]
+    errors = []
+    for i, leader in enumerate(leaders):
+        if not isinstance(leader, dict) or any(not isinstance(leader.get(k), str) for k in LEADER_FIELDS):
+            errors.append(f"'{key}' entry {i+1} must have string fields: {', '.join(LEADER_FIELDS)}.")
+    return errors
+
+
+def _text_list_shape(key, items, max_count):
+    if not isinstance(items, list) or len(items) > max_count or any(not isinstance(item, str) for item in items):
+        return [f"'{key}' must be a list of at most {max_count} strings."]
+    return []
+
+
+def _leader_rows(role, leaders):
+    """A leader row left blank, or filled in without a name, is almost always a mistake"""
+    errors = []
+    for i, leader in enumerate(leaders):
+        if not any(leader[field].strip() for field in LEADER_FIELDS):
+            errors.append(f"{leader_label(role, i)} is empty: fill it in or lower the number of {LEADER_LABELS[role][0]}s.")
+        elif not (leader["chinese_name"].strip() or leader["english_name"].strip()):
+            errors.append(f"{leader_label(role, i)}: enter a Chinese or English name.")
+    return errors
+
+
+def club_structure(form_data):
+    """Errors in the shape of a new-club submission: types, required fields, counts and blank leader rows"""
+    errors = []
+    for key in CLUB_TEXT_FIELDS:
+        if not isinstance(form_data.get(key), str):
+            errors.append(f"'{key}' must be a string.")
+    if isinstance(form_data.get("club_name"), str) and not form_data["club_name"].strip():
+        errors.append("Club Name is required.")
+    if form_data.get("club_category") not in CLUB_CATEGORIES:
+        errors.append(f"'club_category' must be one of: {', '.join(CLUB_CATEGORIES)}.")
+    for key, (min_count, max_count) in LEADER_LIMITS.items():
+        shape = _leaders_shape(key, form_data.get(key), min_count, max_count)
+        errors.extend(shape or _leader_rows(key, form_data[key]))
+    for key, max_count in LIST_LIMITS.items():
+        errors.extend(_text_list_shape(key, form_data.get(key), max_count))
+    return errors
+
+
+def update_structure(club_identifier, update_data):
+    """Errors in the shape of an update request (blank parts already mean "leave unchanged")"""
+    errors = []
+    if not isinstance(club_identifier, str) or not club_identifier.strip():
+        errors.append("Please enter the club's name or unique identifier.")
+    elif not check("single_line", club_identifier):
+        errors.append(message("single_line", "Club Name or Unique Identifier", club_identifier))
+    if not isinstance(update_data, dict) or not update_data:
+        return errors + ["Please select at least one section to update."]
+    for key, value in update_data.items():
+        if key in LEADER_LIMITS:
+            errors.extend(_leaders_shape(key, value, 1, LEADER_LIMITS[key][1]))
+        elif key in LIST_LIMITS:
+            errors.extend(_text_list_shape(key, value, LIST_LIMITS[key]))
+        elif key == "club_category":
+            if value not in CLUB_CATEGORIES:
+                errors.append(f"'club_category' must be one of: {', '.join(CLUB_CATEGORIES)}.")
+        elif key in CLUB_TEXT_FIELDS:
+            if not isinstance(value, str):
+                errors.append(f"'{key}' must be a string.")
+        elif key != "background_image":
+            errors.append(f"Unknown section '{key}'.")
+    return errors
+
+
+def validate_club(form_data, validator=None):
+    """Every error in a new-club submission; pass a session's ``FieldValidator`` to skip unchanged fields"""
+    if not isinstance(form_data, dict):
+        return ["The club data must be a JSON object."]
+    validator = validator or FieldValidator()
+    return club_structure(form_data) + validator.messages(field_checks(form_data))
+
+
+def validate_update(club_identifier, update_data, validator=None):
+    """Every error in an update request"""
+    errors = update_structure(club_identifier, update_data)
+    if isinstance(update_data, dict):
+        validator = validator or FieldValidator()
+        errors += validator.messages(field_checks(update_data, key_prefix="update_"))
+    return errors
+
+
+def _failing(kind, values):
+    """The values in a set that break rule ``kind``.
+
+    Pattern rules check the whole column in one regex scan over the values
+    joined by newlines; values containing a newline can't match them anyway.
+    """
+    pattern = _INVALID_LINES.get(kind)
+    if pattern is None:
+        check = RULES[kind][0]
+        return {value for value in values if not check(value)}
+    multiline = {value for value in values if "\n" in value}
+    column = "\n".join(value for value in values if "\n" not in value)
+    return set(pattern.findall(column)) | multiline
+
+
+def validate_batch(records):
+    """Validate many new-club submissions at once, returning a list of errors per record.
+
+    Values are gathered column by column across the whole batch, and each
+    column's distinct values are checked in one pass, so repeated classes,
+    emojis and list items cost nothing extra. Results match ``validate_club``.
+    """
+    errors = [club_structure(record) if isinstance(record, dict) else ["The club data must be a JSON object."]
+              for record in records]
+    columns = {kind: [] for kind in RULES}  # kind -> [(value, record number, position in record, where)]
+    for n, record in enumerate(records):
+        if isinstance(record, dict):
+            for position, (kind, value, where) in enumerate(_values(record)):
+                columns[kind].append((value, n, position, where))
+    found = []
+    for kind, entries in columns.items():
+        failing = _failing(kind, {entry[0] for entry in entries}) if entries else ()
+        if failing:
+            found += [(n, position, message(kind, _label(where), value))
+                      for value, n, position, where in entries if value in failing]
+    for n, _, text in sorted(found):
+        errors[n].append(text)
+    return errors